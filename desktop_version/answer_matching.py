@@ -0,0 +1,140 @@
+import unicodedata
+
+from typing import Iterable, Union
+
+
+class AnswerNormalizer:
+    """Brings the answers and the words they are checked against to the same form, so that
+    answers which only differ in the way they were typed are accepted.
+
+    The text is composed (NFC, so a letter with a combining mark equals the precomposed letter),
+    the characters are replaced by the rules of the language, the case is folded if asked for and
+    the whitespace is stripped and collapsed. The rules are compiled into a translation table once
+    per language."""
+
+    ignore_case_key = "IGNORE_CASE"
+
+    # applied to the answers in every language
+    common_rules = {"’": "'", "‘": "'", "`": "'", "“": '"', "”": '"', "„": '"'}
+    # by narration language
+    language_rules = {
+        "de": {"ß": "ss", "ẞ": "SS"},
+        "ru": {"ё": "е", "Ё": "Е"},
+    }
+
+    _normalizers: dict[tuple[str, bool], "AnswerNormalizer"] = {}
+
+    def __init__(self, language: str = "", ignore_case: bool = False) -> None:
+        self.language = language
+        self.ignore_case = ignore_case
+        self.table = str.maketrans({**self.common_rules, **self.language_rules.get(language, {})})
+
+    @classmethod
+    def get(cls, narration_language: str = "", ignore_case: bool = False) -> "AnswerNormalizer":
+        """The normalizer of the language ("de", "zh-CN", ...), shared by all the words in it."""
+        language = str(narration_language or "").split("-")[0].lower()
+        normalizer = cls._normalizers.get((language, ignore_case))
+        if normalizer is None:
+            normalizer = cls._normalizers[(language, ignore_case)] = cls(language, ignore_case)
+        return normalizer
+
+    def normalize(self, text: str) -> str:
+        text = unicodedata.normalize("NFC", text).translate(self.table)
+        if self.ignore_case:
+            text = text.casefold()
+        return " ".join(text.split())
+
+
+class EditDistance:
+    typo_tolerance_key = "TYPO_TOLERANCE"
+    default_typo_tolerance = 1
+
+    @staticmethod
+    def bounded(first: str, second: str, limit: int) -> int:
+        """The Levenshtein distance between the strings if it is at most `limit`, `limit + 1` otherwise.
+
+        Only the cells of the table at most `limit` away from its diagonal are computed, and the
+        computation stops as soon as a whole row of them is over the limit."""
+        if abs(len(first) - len(second)) > limit:
+            return limit + 1
+        # the common beginning and end do not change the distance, a typo usually leaves little else
+        start = 0
+        while start < len(first) and start < len(second) and first[start] == second[start]:
+            start += 1
+        end = 0
+        while end < len(first) - start and end < len(second) - start and first[-1 - end] == second[-1 - end]:
+            end += 1
+        first, second = first[start:len(first) - end], second[start:len(second) - end]
+        if len(first) > len(second):
+            first, second = second, first
+        over = limit + 1
+        previous = [j if j <= limit else over for j in range(len(second) + 1)]
+        for i in range(1, len(first) + 1):
+            current = [over] * (len(second) + 1)
+            if i <= limit:
+                current[0] = i
+            row_minimum = current[0]
+            for j in range(max(1, i - limit), min(len(second), i + limit) + 1):
+                cost = 0 if first[i - 1] == second[j - 1] else 1
+                value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                current[j] = value if value < over else over
+                if current[j] < row_minimum:
+                    row_minimum = current[j]
+            if row_minimum > limit:
+                return over
+            previous = current
+        return previous[len(second)]
+
+
+class AnswerTrie:
+    """The normalized variations of a word in a prefix tree: a node is a dict of the next characters,
+    with the `end` key in the nodes where a variation ends."""
+
+    end = ""
+
+    def __init__(self, variations: Iterable[str]) -> None:
+        self.root: dict = {}
+        for variation in variations:
+            node = self.root
+            for character in variation:
+                node = node.setdefault(character, {})
+            node[self.end] = True
+
+
+class TypingState:
+    ON_TRACK = 0
+    DIVERGED = 1
+    # the input is a whole variation that no other variation continues
+    COMPLETE = 2
+
+
+class IncrementalAnswerChecker:
+    """Follows the answer while it is typed: the node of the trie the input has reached is kept,
+    so a typed character is checked with a single step from it. The trie is only walked from its
+    root again when the input was changed elsewhere than at its end."""
+
+    check_as_you_type_key = "CHECK_AS_YOU_TYPE"
+
+    def __init__(self, trie: AnswerTrie, normalizer: AnswerNormalizer) -> None:
+        self.trie = trie
+        self.normalizer = normalizer
+        self.typed = ""
+        self.node: Union[dict, None] = trie.root
+
+    def feed(self, text: str) -> int:
+        text = self.normalizer.normalize(text)
+        if text.startswith(self.typed):
+            added, node = text[len(self.typed):], self.node
+        else:
+            added, node = text, self.trie.root
+        for character in added:
+            if node is None:
+                break
+            node = node.get(character)
+        self.typed, self.node = text, node
+
+        if node is None:
+            return TypingState.DIVERGED
+        if AnswerTrie.end in node and len(node) == 1:
+            return TypingState.COMPLETE
+        return TypingState.ON_TRACK
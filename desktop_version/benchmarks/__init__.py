@@ -0,0 +1,2 @@
+"""Benchmarks for the desktop app. Run them from the `desktop_version` directory,
+e.g. `python -m benchmarks.startup_benchmark`."""
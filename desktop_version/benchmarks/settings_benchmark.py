@@ -0,0 +1,110 @@
+"""Compares the load and save timings of the settings store with the `settings.txt` file it replaced.
+
+Usage (from the `desktop_version` directory):
+    python -m benchmarks.settings_benchmark [--schemes 10 100 1000] [--repeat 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from ast import literal_eval
+from statistics import median
+from typing import Callable
+
+from user_settings import SettingsStore
+
+
+def make_scheme(index: int) -> dict:
+    return {
+        "sheet_name": f"unit {index}",
+        "translation_column_index": 0,
+        "status_column_index": 1,
+        "narration_language": "de",
+        "to_check": [{"comment": "Singular", "spelling": 2, "info": 3},
+                     {"comment": "Plural", "spelling": 4, "info": None}],
+    }
+
+
+def make_settings(schemes_amount: int) -> dict:
+    return {
+        "PATH_TO_VOCABULARY": "C:/Users/user/Documents/vocabulary.xlsx",
+        "APP_LANGUAGE": "english",
+        "schemes": {f"scheme {i}": make_scheme(i) for i in range(schemes_amount)},
+    }
+
+
+def timed(function: Callable, repeat: int) -> float:
+    """Returns the median time of a call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return median(timings)
+
+
+def benchmark_legacy(directory: str, settings: dict, repeat: int) -> dict[str, float]:
+    filename = os.path.join(directory, "settings.txt")
+    with open(filename, mode="w", encoding="utf-8") as file:
+        file.write(str(settings))
+
+    def load():
+        with open(filename, mode="r", encoding="utf-8") as file:
+            literal_eval(file.read())
+
+    def save():
+        settings["schemes"]["new scheme"] = make_scheme(-1)
+        with open(filename, mode="w", encoding="utf-8") as file:
+            file.write(str(settings))
+
+    return {"load": timed(load, repeat), "save": timed(save, repeat)}
+
+
+def benchmark_store(directory: str, settings: dict, repeat: int) -> dict[str, float]:
+    store = SettingsStore(os.path.join(directory, "settings.db"))
+    settings = dict(settings)
+    for name, scheme in settings.pop("schemes").items():
+        store.put(store.schemes_table, name, scheme)
+    for key, value in settings.items():
+        store.put(store.settings_table, key, value)
+    store.flush()
+
+    def load():
+        store.load(store.settings_table)
+        store.load(store.schemes_table)
+
+    def save():
+        store.put(store.schemes_table, "new scheme", make_scheme(-1))
+        store.flush()
+
+    def coalesced_save():
+        for i in range(100):
+            store.put(store.settings_table, "PATH_TO_VOCABULARY", f"vocabulary {i}.xlsx")
+        store.flush()
+
+    return {"load": timed(load, repeat), "save": timed(save, repeat),
+            "100 coalesced saves": timed(coalesced_save, repeat)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Settings load/save benchmark.")
+    parser.add_argument("--schemes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'schemes':>8} {'backend':>13} {'operation':>20} {'median ms':>10}")
+    for schemes_amount in args.schemes:
+        settings = make_settings(schemes_amount)
+        with tempfile.TemporaryDirectory() as directory:
+            results = {
+                "settings.txt": benchmark_legacy(directory, settings, args.repeat),
+                "settings.db": benchmark_store(directory, settings, args.repeat),
+            }
+        for backend, timings in results.items():
+            for operation, timing in timings.items():
+                print(f"{schemes_amount:>8} {backend:>13} {operation:>20} {timing:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Measures the cold start of the app: the time from the interpreter start to the first `page.update()`
+made by `MainPage`. Every measurement is made in a fresh interpreter, so nothing is imported beforehand.
+
+The benchmark fails (exit code 1) when the median start time exceeds the budget or when one of the
+heavy dependencies, which must only be imported when the feature that needs them is used, is
+imported during the start.
+
+Usage (from the `desktop_version` directory):
+    python -m benchmarks.startup_benchmark [--budget-ms 1500] [--runs 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+
+DEFAULT_BUDGET_MS = 1500
+DEFAULT_RUNS = 5
+
+# modules that must not be imported before the first frame is drawn
+DEFERRED_MODULES = ["numpy", "pandas", "openpyxl", "gtts", "pygame", "pywintypes", "pythoncom", "win32com"]
+
+
+class StartupProbePage:
+    """Stands in for `ft.Page` during the measurement: it records the moment of the first update
+    instead of sending the controls to a Flet client."""
+
+    def __init__(self, width: int = 1280, height: int = 720) -> None:
+        self.width = width
+        self.height = height
+        self.window_width = width
+        self.window_height = height
+        self.window_max_width = width
+        self.window_max_height = height
+        self.window_resizable = True
+        self.scroll = None
+        self.theme_mode = None
+        self.on_window_event = None
+        self.on_keyboard_event = None
+        self.controls = []
+        self.first_update_at = None
+
+    def window_center(self) -> None:
+        ...
+
+    def add(self, *controls) -> None:
+        self.controls.extend(controls)
+
+    def update(self, *controls) -> None:
+        if self.first_update_at is None:
+            self.first_update_at = time.perf_counter()
+
+
+def measure_startup() -> dict:
+    """Runs inside the child interpreter."""
+    import main_app
+
+    page = StartupProbePage()
+    main_app.MainPage(page)
+    return {
+        "first_update_ms": page.first_update_at * 1000,
+        "deferred_modules_imported": [i for i in DEFERRED_MODULES if i in sys.modules],
+    }
+
+
+def run_child() -> dict:
+    # perf_counter is monotonic system-wide, so the child's timestamp can be compared with the parent's
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_benchmark", "--child"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["first_update_ms"] -= started * 1000
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold start to the first page.update() benchmark.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_startup()))
+        return 0
+
+    results = [run_child() for _ in range(args.runs)]
+    timings = [i["first_update_ms"] for i in results]
+    imported = sorted({module for i in results for module in i["deferred_modules_imported"]})
+    start_time = median(timings)
+
+    print(f"cold start to first page.update(): median {start_time:.0f} ms "
+          f"(min {min(timings):.0f} ms, max {max(timings):.0f} ms, {args.runs} runs), budget {args.budget_ms:.0f} ms")
+    failed = False
+    if imported:
+        print(f"FAIL: imported during startup: {', '.join(imported)}")
+        failed = True
+    if start_time > args.budget_ms:
+        print("FAIL: startup budget exceeded")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
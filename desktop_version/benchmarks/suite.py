@@ -0,0 +1,275 @@
+"""Times the hot paths of the app on synthetic workbooks: sheet loading, the compatibility check,
+filtering of the words, a simulated dictation, the writeback of the statuses and the vocabulary search. A workbook of several
+sheets is also loaded sheet by sheet and with the bulk loader.
+
+The results are saved as a JSON report. When a baseline report is given, every timing is compared with
+the baseline and the suite fails (exit code 1) if one of them is slower by more than the tolerance.
+
+With `--memory`, the pipeline is run once more under tracemalloc (separately, since tracing the
+allocations slows the timings down) and the peak and retained bytes of every stage are added to the
+report. `--memory-budget STAGE=MIB` makes the suite fail when the peak of the stage exceeds the budget.
+
+Usage (from the `desktop_version` directory):
+    python -m benchmarks.suite [--rows 1000 10000 100000] [--sheets 12] [--sheet-rows 5000]
+                               [--output report.json]
+                               [--baseline baseline.json] [--tolerance 0.25]
+                               [--memory] [--memory-budget get_words=64 ...]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+from statistics import median
+from typing import Callable, Any
+
+from core import SheetScheme, ExcelParser, SheetToSchemeCompatibilityChecker, WordsGetter, Dictation
+from sheet_view import SheetView
+from bulk_loading import BulkLoader, SheetReader, SHEET_CACHE
+from vocabulary_search import VocabularySearch
+from excel_modifier import OpenpyxlExcelModifier, DryRunExcelModifier
+from memory_profiling import MemoryProfiler
+from benchmarks.vocabulary_generator import VocabularyGenerator
+
+
+class BenchmarkReport:
+    def __init__(self, meta: dict[str, Any]) -> None:
+        self.meta = meta
+        self.results: dict[str, dict[str, float]] = {}
+
+    def add(self, case: str, metric: str, value: float) -> None:
+        self.results.setdefault(case, {})[metric] = value
+
+    def save(self, path: str) -> None:
+        with open(path, mode="w", encoding="utf-8") as file:
+            json.dump({"meta": self.meta, "results": self.results}, file, indent=2)
+
+    @staticmethod
+    def load(path: str) -> dict[str, dict[str, float]]:
+        with open(path, mode="r", encoding="utf-8") as file:
+            return json.load(file)["results"]
+
+    def compare(self, baseline: dict[str, dict[str, float]], tolerance: float) -> list[str]:
+        """Returns the descriptions of the metrics that got worse than the baseline allows."""
+        regressions = []
+        for case, metrics in self.results.items():
+            for metric, value in metrics.items():
+                expected = baseline.get(case, {}).get(metric)
+                if expected is not None and value > expected * (1 + tolerance):
+                    regressions.append(f"{case} {metric}: {value:.2f} (baseline {expected:.2f})")
+        return regressions
+
+    def print_table(self) -> None:
+        for case, metrics in self.results.items():
+            print(case)
+            for metric, value in metrics.items():
+                print(f"    {metric:<36} {value:>14.2f}")
+
+
+def timed(function: Callable, repeat: int = 1) -> tuple[float, Any]:
+    """Returns the median time of a call in milliseconds and the result of the last call."""
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return median(timings), result
+
+
+class SimulatedLearner:
+    """Answers every word right, except each `hint_every`-th one, for which the answer is shown first."""
+
+    def __init__(self, hint_every: int = 10) -> None:
+        self.hint_every = hint_every
+
+    def run(self, dictation: Dictation) -> int:
+        """Runs the dictation to its end and returns the amount of answers given."""
+        answers = 0
+        dictation.run()
+        while choice := dictation.get_word():
+            answers += 1
+            answer = choice.words[0].word_variations[0]
+            if answers % self.hint_every == 0:
+                dictation.show_answer()
+                dictation.check_answer(answer, affect_choice=False)
+            else:
+                dictation.check_answer(answer)
+        return answers
+
+
+def get_workbook(directory: str, rows: int, blocks: int, seed: int) -> tuple[str, SheetScheme]:
+    """Generated workbooks are kept, since generating the large ones takes longer than the benchmark."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"vocabulary_{rows}_{blocks}_{seed}.xlsx")
+    generator = VocabularyGenerator(blocks, seed)
+    if not os.path.exists(path):
+        generator.write(path, rows)
+    return path, SheetScheme(generator.scheme("vocabulary"))
+
+
+def run_bulk_case(report: BenchmarkReport, directory: str, sheets: int, rows: int, blocks: int, seed: int) -> None:
+    case = f"sheets={sheets} rows={rows}"
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"vocabulary_{sheets}x{rows}_{blocks}_{seed}.xlsx")
+    sheet_names = tuple(f"unit {i + 1}" for i in range(sheets))
+    if not os.path.exists(path):
+        VocabularyGenerator(blocks, seed).write(path, rows, sheet_names)
+
+    report.add(case, "pandas_sequential_ms",
+               timed(lambda: [ExcelParser.get_sheet_view(i, path) for i in sheet_names])[0])
+    report.add(case, "streaming_sequential_ms", timed(lambda: [SheetReader.read(path, i) for i in sheet_names])[0])
+    loader = BulkLoader()
+    try:
+        # the first load also starts the processes, which the app only does once
+        report.add(case, "bulk_first_ms", timed(lambda: loader.load((path, i) for i in sheet_names))[0])
+        report.add(case, "bulk_ms", timed(lambda: loader.load((path, i) for i in sheet_names))[0])
+    finally:
+        loader.shutdown()
+
+
+def run_case(report: BenchmarkReport, path: str, scheme: SheetScheme, rows: int, repeat: int, seed: int) -> None:
+    case = f"rows={rows}"
+    # the sheet is read the way the app reads it
+    report.add(case, "get_sheet_ms", timed(lambda: SheetReader.read(path, scheme.sheet_name), repeat)[0])
+    sheet = SheetReader.read(path, scheme.sheet_name)
+
+    # a new view every time, since a view keeps the status columns it parsed
+    report.add(case, "compatibility_check_ms",
+               timed(lambda: SheetToSchemeCompatibilityChecker(SheetView(sheet.cells, sheet.null_mask), scheme)
+                     .check_compatibility(), repeat)[0])
+
+    words_range = range(2, sheet.rows + 1)
+    report.add(case, "get_words_ms",
+               timed(lambda: WordsGetter(sheet, scheme, words_range, "all").get_words(), repeat)[0])
+    report.add(case, "get_words_sample_200_ms",
+               timed(lambda: WordsGetter(sheet, scheme, words_range, "all", sample_size=200).get_words(), repeat)[0])
+
+    # the search indexes the sheet the cache already holds, as it does in the app
+    SHEET_CACHE.put(path, scheme.sheet_name, sheet)
+    parameters = SheetScheme.to_scheme((scheme.sheet_name, scheme.translation, scheme.status,
+                                        scheme.narration_language, scheme.to_check))
+    report.add(case, "search_index_ms", timed(lambda: VocabularySearch().refresh(path, {"vocabulary": parameters}))[0])
+    search = VocabularySearch()
+    search.refresh(path, {"vocabulary": parameters})
+    queries = ["k", "ka", "kalo", "haus", "ß", "translation 1", "translation 99", "zzz"]
+    report.add(case, "search_query_us",
+               timed(lambda: [search.search(i) for i in queries], repeat)[0] * 1000 / len(queries))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # the statuses are written to a copy, so every run starts from the same workbook
+        workbook_copy = shutil.copy(path, os.path.join(directory, "vocabulary.xlsx"))
+        random.seed(seed)
+        content = WordsGetter(sheet, scheme, words_range, "all").get_words()
+        dictation = Dictation(content, workbook_copy, OpenpyxlExcelModifier)
+
+        writeback_timings = []
+        update_statuses = dictation.update_statuses
+
+        def timed_update_statuses():
+            writeback_timings.append(timed(update_statuses)[0])
+
+        dictation.update_statuses = timed_update_statuses
+        session_time, answers = timed(lambda: SimulatedLearner().run(dictation))
+
+    report.add(case, "dictation_session_ms", session_time - writeback_timings[0])
+    report.add(case, "dictation_answer_us", (session_time - writeback_timings[0]) * 1000 / max(answers, 1))
+    report.add(case, "status_writeback_ms", writeback_timings[0])
+
+
+def run_memory_case(report: BenchmarkReport, path: str, scheme: SheetScheme, rows: int,
+                    budgets: dict[str, int]) -> list[str]:
+    """Runs the pipeline keeping the same objects alive as the app does during a dictation,
+    returns the exceeded budgets."""
+    profiler = MemoryProfiler()
+    profiler.start()
+    try:
+        with profiler.stage("get_sheet"):
+            sheet = SheetReader.read(path, scheme.sheet_name)
+        with profiler.stage("compatibility_check"):
+            SheetToSchemeCompatibilityChecker(sheet, scheme).check_compatibility()
+        with profiler.stage("get_words"):
+            content = WordsGetter(sheet, scheme, range(2, sheet.rows + 1), "all").get_words()
+        with profiler.stage("dictation"):
+            SimulatedLearner().run(Dictation(content, path, DryRunExcelModifier))
+    finally:
+        profiler.stop()
+
+    words = len(content.words)
+    for metric, value in profiler.as_metrics(words).items():
+        report.add(f"memory rows={rows}", metric, value)
+    print(f"memory rows={rows}")
+    print(profiler.report(words))
+    return profiler.check_budgets(budgets)
+
+
+def parse_budgets(budgets: list[str]) -> dict[str, int]:
+    """Turns `STAGE=MIB` pairs into budgets in bytes."""
+    parsed = {}
+    for i in budgets:
+        stage, _, size = i.partition("=")
+        parsed[stage] = int(float(size) * 2**20)
+    return parsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the dictation pipeline.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--sheet-rows", type=int, default=5000)
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workbooks", default="cache/benchmarks/")
+    parser.add_argument("--output", default="cache/benchmarks/report.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--memory-budget", nargs="*", default=[], metavar="STAGE=MIB")
+    args = parser.parse_args()
+
+    # the heavy imports are made by the first sheet load in the app, they are not part of its timing here
+    import numpy, pandas, openpyxl
+
+    baseline = BenchmarkReport.load(args.baseline) if args.baseline else None
+    report = BenchmarkReport({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "blocks": args.blocks,
+        "seed": args.seed,
+    })
+    budgets = parse_budgets(args.memory_budget)
+    exceeded_budgets = []
+    for rows in args.rows:
+        path, scheme = get_workbook(args.workbooks, rows, args.blocks, args.seed)
+        run_case(report, path, scheme, rows, args.repeat, args.seed)
+        if args.memory or budgets:
+            exceeded_budgets += [f"rows={rows} {i}" for i in run_memory_case(report, path, scheme, rows, budgets)]
+
+    if args.sheets > 1:
+        run_bulk_case(report, args.workbooks, args.sheets, args.sheet_rows, args.blocks, args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    report.save(args.output)
+    report.print_table()
+
+    failed = False
+    for i in exceeded_budgets:
+        print(f"MEMORY BUDGET EXCEEDED: {i}")
+        failed = True
+    if baseline is not None:
+        regressions = report.compare(baseline, args.tolerance)
+        for i in regressions:
+            print(f"REGRESSION: {i}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Generates synthetic vocabulary workbooks for the benchmarks.
+
+The sheet has a translation column, a status column and a pair of columns (spelling, information)
+per test block. Spellings contain `|` separated synonyms and `/` separated variations, statuses are a
+mix of NEW, NORMAL, NEEDS_REVISION and DELAYED with their multipliers.
+
+Usage (from the `desktop_version` directory):
+    python -m benchmarks.vocabulary_generator vocabulary.xlsx --rows 10000 [--blocks 2] [--seed 0]
+"""
+import argparse
+import random
+
+from typing import Union
+
+from core import SheetScheme
+
+
+class VocabularyGenerator:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vi", "zo", "ber", "chen", "dorf", "ein", "fahr",
+                 "gut", "haus", "lich", "sch", "ung", "wald", "ß", "ä", "ö", "ü"]
+    statuses = [("NEW", 2), ("NEW", 1), ("NORMAL", 1), ("NEEDS_REVISION", 2), ("NEEDS_REVISION", 3),
+                ("NEEDS_REVISION", 5), ("DELAYED", 1)]
+    status_weights = [25, 10, 35, 12, 8, 4, 6]
+
+    synonyms_probability = 0.15
+    variations_probability = 0.2
+    empty_spelling_probability = 0.05
+    empty_information_probability = 0.4
+
+    header = ["translation", "status"]
+
+    def __init__(self, to_check_blocks: int = 2, seed: Union[int, None] = 0) -> None:
+        self.to_check_blocks = to_check_blocks
+        self.random = random.Random(seed)
+
+    def word(self) -> str:
+        return "".join(self.random.choices(self.syllables, k=self.random.randint(2, 4)))
+
+    def spelling(self) -> Union[str, None]:
+        if self.random.random() < self.empty_spelling_probability:
+            return None
+        synonyms = self.random.randint(2, 3) if self.random.random() < self.synonyms_probability else 1
+        words = []
+        for _ in range(synonyms):
+            variations = self.random.randint(2, 3) if self.random.random() < self.variations_probability else 1
+            words.append("/".join(self.word() for _ in range(variations)))
+        return "|".join(words)
+
+    def information(self) -> Union[str, None]:
+        if self.random.random() < self.empty_information_probability:
+            return None
+        return self.random.choice(["der", "die", "das", "pl.", "informal", "Austrian"])
+
+    def status(self) -> str:
+        name, multiplier = self.random.choices(self.statuses, weights=self.status_weights)[0]
+        return f"{name}*{multiplier}"
+
+    def row(self, index: int) -> list[Union[str, None]]:
+        row = [f"translation {index}", self.status()]
+        for _ in range(self.to_check_blocks):
+            row += [self.spelling(), self.information()]
+        return row
+
+    def scheme(self, sheet_name: str) -> dict:
+        to_check = [{"comment": f"block {i + 1}", "spelling": 2 + i * 2, "info": 3 + i * 2}
+                    for i in range(self.to_check_blocks)]
+        return SheetScheme.to_scheme((sheet_name, 0, 1, "de", to_check))
+
+    def write(self, path: str, rows: int, sheet_names: tuple[str, ...] = ("vocabulary",)) -> dict[str, dict]:
+        """Writes the workbook and returns the schemes of its sheets."""
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        schemes = {}
+        for sheet_name in sheet_names:
+            worksheet = workbook.create_sheet(sheet_name)
+            header = self.header[:]
+            for i in range(self.to_check_blocks):
+                header += [f"spelling {i + 1}", f"information {i + 1}"]
+            worksheet.append(header)
+            for index in range(rows):
+                worksheet.append(self.row(index))
+            schemes[sheet_name] = self.scheme(sheet_name)
+        workbook.save(path)
+        return schemes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic vocabulary workbook generator.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sheet_names = tuple(f"unit {i + 1}" for i in range(args.sheets))
+    VocabularyGenerator(args.blocks, args.seed).write(args.path, args.rows, sheet_names)
+
+
+if __name__ == "__main__":
+    main()
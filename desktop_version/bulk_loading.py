@@ -0,0 +1,276 @@
+"""Reading of several sheets at once.
+
+The sheets are read in a pool of processes, streaming their rows with openpyxl. Opening a workbook
+(reading its shared strings) often takes longer than reading one of its sheets, so the sheets of a
+workbook are split into one group per process, and each process opens the workbook once. A read sheet is sent back to the app packed: all its cells as strings joined into a single string,
+and its empty cells as a bit mask, which is far cheaper to pickle than an array of separate objects.
+
+The read sheets are kept in a cache, by workbook and sheet, for as long as the workbook is not modified.
+"""
+import os
+import threading
+import multiprocessing
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Union
+
+from sheet_view import SheetView
+
+
+class MissingSheetError(LookupError):
+    pass
+
+
+class SheetReader:
+    # how many rows are read between two calls of the progress function
+    progress_interval = 500
+    separator = "\0"
+
+    @classmethod
+    def read(
+            cls,
+            path: str,
+            sheet_name: str,
+            progress: Union[Callable[[int, Union[int, None]], None], None] = None
+    ) -> SheetView:
+        """Reads the sheet row by row, without loading the whole workbook or making a DataFrame.
+
+        `progress` is called with the amount of rows read and the amount of rows of the sheet
+        (None when the workbook does not tell it) every `progress_interval` rows; the reading is
+        stopped by raising an exception from it."""
+        workbook = cls.open(path)
+        try:
+            return cls.read_worksheet(workbook, sheet_name, progress)
+        finally:
+            workbook.close()
+
+    @classmethod
+    def read_many(cls, path: str, sheet_names: Iterable[str]) -> dict[str, Union[SheetView, Exception]]:
+        """Reads the sheets opening the workbook once, gives the exception instead of the sheet
+        that could not be read."""
+        try:
+            workbook = cls.open(path)
+        except Exception as e:
+            return {i: e for i in sheet_names}
+        results: dict[str, Union[SheetView, Exception]] = {}
+        try:
+            for sheet_name in sheet_names:
+                try:
+                    results[sheet_name] = cls.read_worksheet(workbook, sheet_name)
+                except Exception as e:
+                    results[sheet_name] = e
+        finally:
+            workbook.close()
+        return results
+
+    @staticmethod
+    def sheet_names(path: str) -> list[str]:
+        """The names of the sheets, read from the description of the workbook alone,
+        which is much faster than opening the workbook."""
+        import zipfile
+        from xml.etree import ElementTree
+
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        return [i.get("name") for i in root.iter() if i.tag.rsplit("}", 1)[-1] == "sheet"]
+
+    @staticmethod
+    def open(path: str):
+        import openpyxl
+
+        return openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    @classmethod
+    def read_worksheet(
+            cls,
+            workbook,
+            sheet_name: str,
+            progress: Union[Callable[[int, Union[int, None]], None], None] = None
+    ) -> SheetView:
+        from openpyxl.cell.cell import ERROR_CODES
+
+        if sheet_name not in workbook.sheetnames:
+            raise MissingSheetError(sheet_name)
+        worksheet = workbook[sheet_name]
+        total = worksheet.max_row - 1 if worksheet.max_row else None
+
+        def values(rows):
+            # the cells are converted the way pandas converts them
+            for index, row in enumerate(rows, 1):
+                if progress is not None and index % cls.progress_interval == 0:
+                    progress(index, total)
+                yield tuple(None if i in ERROR_CODES else
+                            int(i) if isinstance(i, float) and i.is_integer() else i for i in row)
+
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        sheet = SheetView.from_rows(values(rows), columns=len(SheetView.trim_row(header)))
+        if progress is not None:
+            progress(sheet.rows, sheet.rows)
+        return sheet
+
+    @classmethod
+    def pack(cls, sheet: SheetView) -> tuple[tuple[int, int], str, bytes]:
+        import numpy as np
+
+        text = cls.separator.join("" if empty else value if isinstance(value, str) else str(value) for value, empty
+                                  in zip(sheet.cells.reshape(-1).tolist(), sheet.null_mask.reshape(-1).tolist()))
+        return sheet.shape, text, np.packbits(sheet.null_mask).tobytes()
+
+    @classmethod
+    def unpack(cls, packed: tuple[tuple[int, int], str, bytes]) -> SheetView:
+        import numpy as np
+
+        shape, text, null_bits = packed
+        cells = np.empty(shape, dtype=object)
+        if cells.size:
+            cells.reshape(-1)[:] = text.split(cls.separator)
+        null_mask = np.unpackbits(np.frombuffer(null_bits, dtype=np.uint8),
+                                  count=cells.size).reshape(shape).astype(bool)
+        cells[null_mask] = None
+        return SheetView(cells, null_mask)
+
+    @classmethod
+    def read_packed(cls, path: str, sheet_names: list[str]) -> dict[str, Union[tuple, Exception]]:
+        """Runs in the processes of the pool."""
+        return {name: sheet if isinstance(sheet, Exception) else cls.pack(sheet)
+                for name, sheet in cls.read_many(path, sheet_names).items()}
+
+
+class BulkLoader:
+    """Reads the sheets in a pool of processes, created the first time several sheets are read."""
+
+    def __init__(self, max_workers: Union[int, None] = None) -> None:
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 8)
+        self._executor: Union[ProcessPoolExecutor, None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # the processes are not forked, since the app has threads of its own running
+                self._executor = ProcessPoolExecutor(self.max_workers, multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def load(
+            self,
+            requests: Iterable[tuple[str, str]],
+            on_loaded: Union[Callable[[tuple[str, str], Union[SheetView, Exception]], None], None] = None
+    ) -> dict[tuple[str, str], Union[SheetView, Exception]]:
+        """Reads the (workbook, sheet) pairs, returns the view of every sheet or the exception raised
+        while reading it. `on_loaded` is called with each of them as soon as it is read."""
+        by_workbook: dict[str, list[str]] = {}
+        for path, sheet_name in dict.fromkeys(requests):
+            by_workbook.setdefault(path, []).append(sheet_name)
+        results: dict[tuple[str, str], Union[SheetView, Exception]] = {}
+
+        def loaded(request: tuple[str, str], result: Union[SheetView, Exception]) -> None:
+            results[request] = result
+            if on_loaded is not None:
+                on_loaded(request, result)
+
+        if sum(len(i) for i in by_workbook.values()) == 1 or self.max_workers == 1:
+            # not worth starting the processes for
+            for path, sheet_names in by_workbook.items():
+                for sheet_name, sheet in SheetReader.read_many(path, sheet_names).items():
+                    loaded((path, sheet_name), sheet)
+            return results
+
+        futures = {}
+        for path, sheet_names in by_workbook.items():
+            groups = min(len(sheet_names), self.max_workers)
+            for group in range(groups):
+                group_names = sheet_names[group::groups]
+                futures[self.executor.submit(SheetReader.read_packed, path, group_names)] = (path, group_names)
+        for future in as_completed(futures):
+            path, sheet_names = futures[future]
+            try:
+                packed_sheets = future.result()
+            except Exception as e:
+                packed_sheets = {i: e for i in sheet_names}
+            for sheet_name, packed in packed_sheets.items():
+                loaded((path, sheet_name), packed if isinstance(packed, Exception) else SheetReader.unpack(packed))
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+class SheetCache:
+    """The read sheets by workbook and sheet name, the least recently used are dropped first.
+    A sheet is read again once its workbook was modified."""
+
+    max_sheets = 16
+
+    def __init__(self, loader: BulkLoader) -> None:
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._sheets: OrderedDict[tuple[str, str], tuple[int, SheetView]] = OrderedDict()
+
+    @staticmethod
+    def key(path: str, sheet_name: str) -> tuple[str, str]:
+        return os.path.normcase(os.path.abspath(path)), sheet_name
+
+    @staticmethod
+    def modification_time(path: str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def get(self, path: str, sheet_name: str) -> Union[SheetView, None]:
+        key = self.key(path, sheet_name)
+        with self._lock:
+            cached = self._sheets.get(key)
+            if cached is None or cached[0] != self.modification_time(path):
+                return None
+            self._sheets.move_to_end(key)
+            return cached[1]
+
+    def put(self, path: str, sheet_name: str, sheet: SheetView, mtime: Union[int, None] = None) -> None:
+        """Keeps the sheet, read when the workbook had the modification time `mtime` (now by default)."""
+        mtime = self.modification_time(path) if mtime is None else mtime
+        with self._lock:
+            self._sheets[self.key(path, sheet_name)] = (mtime, sheet)
+            self._sheets.move_to_end(self.key(path, sheet_name))
+            while len(self._sheets) > self.max_sheets:
+                self._sheets.popitem(last=False)
+
+    def load(
+            self,
+            path: str,
+            sheet_names: Iterable[str],
+            on_loaded: Union[Callable[[str, Union[SheetView, Exception]], None], None] = None
+    ) -> dict[str, Union[SheetView, Exception]]:
+        """The sheets of the workbook, the ones that are not cached are read together."""
+        results: dict[str, Union[SheetView, Exception]] = {}
+        missing = []
+        for sheet_name in dict.fromkeys(sheet_names):
+            sheet = self.get(path, sheet_name)
+            if sheet is None:
+                missing.append(sheet_name)
+                continue
+            results[sheet_name] = sheet
+            if on_loaded is not None:
+                on_loaded(sheet_name, sheet)
+        # taken before reading, so a modification made in the meantime is not hidden
+        mtime = self.modification_time(path)
+
+        def loaded(request: tuple[str, str], result: Union[SheetView, Exception]) -> None:
+            if isinstance(result, SheetView):
+                self.put(path, request[1], result, mtime)
+            results[request[1]] = result
+            if on_loaded is not None:
+                on_loaded(request[1], result)
+
+        self.loader.load([(path, i) for i in missing], loaded)
+        return results
+
+
+BULK_LOADER = BulkLoader()
+SHEET_CACHE = SheetCache(BULK_LOADER)
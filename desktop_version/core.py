@@ -1,23 +1,26 @@
 from io import BytesIO
-from typing import Union, Callable, Generator
-from collections import deque
-from random import shuffle
-import pywintypes
-
-import numpy as np
-import pandas as pd
-from gtts import gTTS
-from gtts.tts import gTTSError
-import pygame
+from typing import Union, Callable, Generator, Iterable, Sequence, TYPE_CHECKING
+from random import shuffle, Random
 
 from user_settings import SETTINGS
 from exceptions import VocabularyFileNotFoundError, SheetNotFoundError, InvalidStatusError, \
     InvalidSchemeError, NoWordsMatchingSettings, ExcelAppOpenedError, NarrationError
 from excel_modifier import ExcelModifier
+from tracing import TRACER
+from session_metrics import SessionMetrics, AnswerOutcome
+from sheet_view import SheetView, StatusColumn
+from bulk_loading import SheetReader, MissingSheetError
+from scheduler import ReviewScheduler
+from reinsertion_queue import ReinsertionQueue
+from answer_matching import AnswerNormalizer, EditDistance, AnswerTrie, IncrementalAnswerChecker
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 
 class CellFillers:
-    empty_cell = "nan"
+    empty_cell = SheetView.empty_cell
     skip_cell = "n-"
 
     @classmethod
@@ -53,6 +56,11 @@ class SheetScheme:
     def get_sheet_name(self) -> bool:
         return self.sheet_name
 
+    @property
+    def word_columns(self) -> list[int]:
+        """The columns that tell the word of a row: its translation and its spellings."""
+        return [self.translation, *(i.get("spelling", 0) for i in self.to_check)]
+
     @classmethod
     def to_scheme(
             cls,
@@ -61,29 +69,84 @@ class SheetScheme:
         return {key: value for key, value in zip(cls.keys, parameters)}
 
 
+class SheetWords(Sequence):
+    """The words of the rows of a sheet, by row index, as the scheduler records them,
+    so it finds the rows again after rows were inserted or deleted. Made one row at a time."""
+
+    separator = "\t"
+
+    def __init__(self, sheet: SheetView, scheme: SheetScheme) -> None:
+        self.sheet = sheet
+        self.columns = scheme.word_columns
+
+    @classmethod
+    def word(cls, cells: Iterable[str]) -> str:
+        return cls.separator.join(cells)
+
+    def __len__(self) -> int:
+        return self.sheet.rows
+
+    def __getitem__(self, row_index: int) -> str:
+        if not 0 <= row_index < self.sheet.rows:
+            raise IndexError(row_index)
+        return self.word(self.sheet.cell(row_index, i) for i in self.columns)
+
+
 class ExcelParser:
     @staticmethod
-    def get_sheet(sheet_name: str) -> pd.DataFrame:
-        if not SETTINGS.vocabulary_path_valid:
-            raise VocabularyFileNotFoundError(SETTINGS.path)
-        file = pd.ExcelFile(SETTINGS.path)
+    def vocabulary_path(path: Union[str, None] = None) -> str:
+        if path is None:
+            if not SETTINGS.vocabulary_path_valid:
+                raise VocabularyFileNotFoundError(SETTINGS.path)
+            path = SETTINGS.path
+        return path
+
+    @classmethod
+    @TRACER.traced
+    def get_sheet(cls, sheet_name: str, path: Union[str, None] = None) -> "pd.DataFrame":
+        """Reads the sheet from the given workbook, or from the vocabulary file set in the settings."""
+        import pandas as pd
+
+        path = cls.vocabulary_path(path)
+        file = pd.ExcelFile(path)
         sheets = file.sheet_names
         if sheet_name not in sheets:
-            raise SheetNotFoundError(sheet_name, SETTINGS.path)
+            raise SheetNotFoundError(sheet_name, path)
         return file.parse(sheet_name=sheet_name)
 
+    @classmethod
+    def get_sheet_view(cls, sheet_name: str, path: Union[str, None] = None) -> SheetView:
+        """Reads the sheet and keeps only its read-only view, the DataFrame is dropped right away."""
+        return SheetView.from_dataframe(cls.get_sheet(sheet_name, path))
+
+    @classmethod
+    @TRACER.traced
+    def read_sheet_view(
+            cls,
+            sheet_name: str,
+            path: Union[str, None] = None,
+            progress: Union[Callable[[int, Union[int, None]], None], None] = None
+    ) -> SheetView:
+        """Streams the rows of the sheet instead of parsing it with pandas, see `SheetReader.read`."""
+        path = cls.vocabulary_path(path)
+        try:
+            return SheetReader.read(path, sheet_name, progress)
+        except MissingSheetError:
+            raise SheetNotFoundError(sheet_name, path)
+
 
 class StaticSettings:
-    available_statuses = ["NEW", "NORMAL", "NEEDS_REVISION", "DELAYED"]
+    available_statuses = StatusColumn.statuses
 
 
 class SheetToSchemeCompatibilityChecker:
-    def __init__(self, sheet: pd.DataFrame, scheme: SheetScheme):
-        self.sheet = np.array(sheet)
+    def __init__(self, sheet: SheetView, scheme: SheetScheme):
+        self.sheet = sheet
         self.scheme = scheme
 
-        self.columns_range = range(0, self.sheet.shape[1])
+        self.columns_range = range(0, self.sheet.columns)
 
+    @TRACER.traced
     def check_compatibility(self) -> None:
         self.check_indexes()
         self.check_status_column()
@@ -98,22 +161,13 @@ class SheetToSchemeCompatibilityChecker:
             self.check_indexes_in_range(spelling_index, info_index)
 
     def check_status_column(self) -> None:
+        """Reports the first line whose status could not be parsed."""
         status_index = self.scheme.status
-        column = self.sheet[:, status_index]
-        for num, content in enumerate(column):
-            self.process_status(content, num + 1)
-
-    def process_status(self, status_string: str, line_index: int) -> None:
-        data_package = (self.scheme.sheet_name, self.scheme.status, status_string, line_index)
-        try:
-            status_name, status_power = status_string.split("*")
-            status_power = int(status_power)
-            if not status_name:
-                raise InvalidStatusError(*data_package)
-        except ValueError:
-            raise InvalidStatusError(*data_package)
-        if status_name not in StaticSettings.available_statuses or (not (1 <= int(status_power) <= 50)):
-            raise InvalidStatusError(*data_package)
+        invalid_rows = self.sheet.status_column(status_index).invalid_rows
+        if invalid_rows.size:
+            line = int(invalid_rows[0])
+            raise InvalidStatusError(self.scheme.sheet_name, status_index,
+                                     self.sheet.cell(line, status_index), line + 1)
 
     def check_indexes_in_range(self, first_index: int, second_index: int) -> bool:
         if first_index not in self.columns_range or second_index not in self.columns_range:
@@ -165,7 +219,14 @@ class Choice:
                             "(The order in which you give answers does not matter)"
     synonyms_left_message = "You still have to provide {} possible translation(s)."
 
-    def __init__(self, translation: str, words_string: str, instructions: str, additional_info_string: str):
+    def __init__(
+            self,
+            translation: str,
+            words_string: str,
+            instructions: str,
+            additional_info_string: str,
+            normalizer: Union[AnswerNormalizer, None] = None
+    ):
         self.is_empty = words_string in CellFillers()
         if self.is_empty:
             return
@@ -189,15 +250,40 @@ class Choice:
 
         self.words = [WordToCheck(w, i) for w, i in zip(self.synonyms, self.additional_info)]
 
+        # every accepted variation of every synonym in its normalized form, with the word and the variation
+        self.normalizer = AnswerNormalizer.get() if normalizer is None else normalizer
+        self.answer_index: dict[str, tuple[WordToCheck, str]] = {}
+        self.index_words(self.words)
+        self._trie: Union[AnswerTrie, None] = None
+
+    def index_words(self, words: list[WordToCheck]) -> None:
+        for word in words:
+            for variation in word.word_variations:
+                self.answer_index.setdefault(self.normalizer.normalize(variation), (word, variation))
+
     def check_answer(self, answer: str, affect_words: bool = True) -> tuple[bool, str, str]:
-        for index, word in enumerate(self.words):
-            result = word.check_answer(answer)
-            if result[0] and affect_words:
-                self.words.pop(index)
-            if result[0]:
-                return result
-        else:
+        found = self.answer_index.get(self.normalizer.normalize(answer))
+        if found is None:
             return False, "", ""
+        word, variation = found
+        if affect_words:
+            self.words.remove(word)
+            self.answer_index = {k: v for k, v in self.answer_index.items() if v[0] is not word}
+            # another synonym may have a variation with the same normalized form
+            self.index_words(self.words)
+            self._trie = None
+        return word.check_answer(variation)
+
+    def typing_checker(self) -> IncrementalAnswerChecker:
+        """Checks the answer as it is typed against the variations not given yet."""
+        if self._trie is None:
+            self._trie = AnswerTrie(self.answer_index)
+        return IncrementalAnswerChecker(self._trie, self.normalizer)
+
+    def is_near_miss(self, answer: str, max_distance: int) -> bool:
+        """Whether the answer is at most `max_distance` edits away from a variation not given yet."""
+        answer = self.normalizer.normalize(answer)
+        return any(EditDistance.bounded(answer, i, max_distance) <= max_distance for i in self.answer_index)
 
     def show_all_translation(self) -> str:
         translations = ""
@@ -226,7 +312,13 @@ class Choice:
 
 
 class RowToCheck:
-    def __init__(self, content: np.ndarray, scheme: SheetScheme) -> None:
+    def __init__(
+            self,
+            content: dict[int, str],
+            scheme: SheetScheme,
+            normalizer: Union[AnswerNormalizer, None] = None
+    ) -> None:
+        # only the cells of the row the scheme uses, as strings, so the row does not keep the sheet alive
         self.content = content
         self.scheme = scheme
 
@@ -243,7 +335,8 @@ class RowToCheck:
                 self.content[self.scheme.translation],
                 content[i.get("spelling", 0)],
                 i.get("comment", ""),
-                info
+                info,
+                normalizer
             )
             if not choice.is_empty:
                 self.row["to_check"].append(choice)
@@ -260,6 +353,11 @@ class RowToCheck:
     def to_check(self) -> list[Choice]:
         return self.row.get("to_check")
 
+    @property
+    def word(self) -> str:
+        """The word of the row, the same as in `SheetWords`."""
+        return SheetWords.word(self.content[i] for i in self.scheme.word_columns)
+
     @property
     def content_row(self) -> dict[str, Union[str, list[Choice]]]:
         return self.row
@@ -278,45 +376,252 @@ class DictationContent:
     def narration_possible(self) -> bool:
         return self.scheme.narration_possible
 
+    @property
+    def sheet_name(self) -> str:
+        return self.scheme.sheet_name
+
+    def locate(self, key: int) -> tuple[Union[str, None], SheetScheme, int]:
+        """The workbook of the word (None for the workbook of the dictation), its scheme and its row index."""
+        return None, self.scheme, key
+
+    @property
+    def sheet_names(self) -> list[str]:
+        """The sheets the words are taken from, when there are several of them."""
+        return []
+
+    def sheet_index(self, key: int) -> int:
+        return 0
+
+
+class CombinedDictationContent(DictationContent):
+    """The words of several sheets, of one workbook or of several, asked in one dictation.
+
+    The words are keyed by (workbook, sheet name, row index), so a row taken by two schemes of the
+    same sheet is asked once."""
+
+    def __init__(
+            self,
+            contents: Iterable[tuple[str, DictationContent]],
+            with_shuffle: bool = True,
+            rng: Union[Random, None] = None
+    ) -> None:
+        self.schemes: dict[tuple[str, str], SheetScheme] = {}
+        words: dict[tuple[str, str, int], RowToCheck] = {}
+        for path, content in contents:
+            self.schemes[(path, content.scheme.sheet_name)] = content.scheme
+            for row, word in content.words.items():
+                words[(path, content.scheme.sheet_name, row)] = word
+        self._sheet_indexes = {sheet: index for index, sheet in enumerate(self.schemes)}
+        if with_shuffle:
+            items = list(words.items())
+            (shuffle if rng is None else rng.shuffle)(items)
+            words = dict(items)
+        super().__init__(words, next(iter(self.schemes.values())))
+
+    @classmethod
+    def from_getters(
+            cls,
+            getters: list[tuple[str, "WordsGetter"]],
+            with_shuffle: bool = True,
+            rng: Union[Random, None] = None,
+            sample_size: Union[int, None] = None
+    ) -> "CombinedDictationContent":
+        """The words of the (workbook, words getter) pairs, the getters without matching words are skipped.
+
+        At most `sample_size` words are taken from all the getters together: the matching rows of all
+        of them are offered to one reservoir, so each sheet gives words in proportion to its weighted rows."""
+        matching = [(path, getter) for path, getter in getters if getter.count()]
+        if not matching:
+            # reported for the first of them, the one the dictation was set up from
+            getters[0][1].get_words()
+        if sample_size is None or sum(getter.count() for _, getter in matching) <= sample_size:
+            return cls([(path, getter.get_words()) for path, getter in matching], with_shuffle, rng)
+        reservoir = WeightedReservoir(sample_size)
+        for source, (_, getter) in enumerate(matching):
+            getter.offer_to(reservoir, source)
+        rows = [reservoir.taken(source) for source in range(len(matching))]
+        return cls([(path, getter.get_words(i)) for (path, getter), i in zip(matching, rows) if i.size],
+                   with_shuffle, rng)
+
+    @property
+    def narration_possible(self) -> bool:
+        # a dictation is narrated in one language
+        return all(i.narration_possible and i.narration_language == self.scheme.narration_language
+                   for i in self.schemes.values())
+
+    @property
+    def sheet_name(self) -> str:
+        return ", ".join(dict.fromkeys(sheet_name for _, sheet_name in self.schemes))
+
+    def locate(self, key: tuple[str, str, int]) -> tuple[Union[str, None], SheetScheme, int]:
+        path, sheet_name, row = key
+        return path, self.schemes[(path, sheet_name)], row
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return [sheet_name for _, sheet_name in self.schemes]
+
+    def sheet_index(self, key: tuple[str, str, int]) -> int:
+        return self._sheet_indexes[key[:2]]
+
+
+class WeightedReservoir:
+    """Weighted sampling without replacement in a single pass (A-Res): every offered row gets the key
+    u ** (1 / weight), with u uniform in [0, 1), and the `size` rows with the largest keys are kept.
+    log(u) / weight is used as the key instead, it has the same order.
+
+    The rows are offered in blocks, with the source (the sheet) they come from; only the rows whose
+    keys beat the smallest kept key are merged into the reservoir."""
+
+    def __init__(self, size: int) -> None:
+        import numpy as np
+
+        self.size = size
+        self.keys = np.empty(0)
+        self.sources = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)
+
+    def offer(self, source: int, rows: "np.ndarray", keys: "np.ndarray") -> None:
+        import numpy as np
+
+        if self.keys.size >= self.size:
+            better = keys > self.keys.min()
+            rows, keys = rows[better], keys[better]
+        if not rows.size:
+            return
+        self.keys = np.concatenate((self.keys, keys))
+        self.sources = np.concatenate((self.sources, np.full(rows.size, source, dtype=np.int64)))
+        self.rows = np.concatenate((self.rows, rows))
+        if self.keys.size > self.size:
+            kept = np.argpartition(self.keys, self.keys.size - self.size)[self.keys.size - self.size:]
+            self.keys, self.sources, self.rows = self.keys[kept], self.sources[kept], self.rows[kept]
+
+    def taken(self, source: int) -> "np.ndarray":
+        """The kept rows of the source, in order."""
+        import numpy as np
+
+        return np.sort(self.rows[self.sources == source])
+
 
 class WordsGetter:
 
     # possible statuses of words. User can specify words with which status he wants to learn
-    targets = {
-        "all": lambda x: True,
-        "NEEDS_REVISION": lambda x: x == "NEEDS_REVISION",
-        "NEW": lambda x: x == "NEW",
-        "NORMAL": lambda x: x == "NORMAL"
-    }
+    targets = ["all", "NEEDS_REVISION", "NEW", "NORMAL", "DELAYED", "DUE"]
+
+    # the weight of a word in a sample is the weight of its status times the multiplier of the status
+    status_weights = {"NEW": 1.0, "NORMAL": 0.5, "NEEDS_REVISION": 2.0, "DELAYED": 0.25}
+    # the rows of the status column sampled at a time
+    block_rows = 1 << 16
 
     def __init__(
             self,
-            sheet: pd.DataFrame,
+            sheet: SheetView,
             scheme: SheetScheme,
             words_range: range,
             target: str = "all",
-            with_shuffle: bool = True
+            with_shuffle: bool = True,
+            rng: Union[Random, None] = None,
+            due_rows: Union[list[int], None] = None,
+            sample_size: Union[int, None] = None,
     ) -> None:
-        self.sheet: np.ndarray = np.array(sheet, dtype=str)
+        self.sheet: SheetView = sheet
         self.scheme: SheetScheme = scheme
         self.words_range: slice = slice(words_range.start-2, words_range.stop-1)
-        self.target_checker: Callable = self.targets.get(target, lambda x: True)
         self.with_shuffle: bool = with_shuffle
+        self.shuffle: Callable = shuffle if rng is None else rng.shuffle
+        self.rng = rng
+        # at most this many words are taken, when given
+        self.sample_size = sample_size
+        # the rows the scheduler gave for the DUE target, the most overdue first; the rows no dictation
+        # has written a status of yet are never due
+        self.due_rows: list[int] = [] if due_rows is None else due_rows
 
         self.target = target
 
-    def get_words(self) -> DictationContent:
-        """Filters words: leaves only those with the right status and in right range."""
-        a = {}
-        c = s if (s := self.words_range.start) else 0
-        for num, val in enumerate(self.sheet[self.words_range]):
-            if self.target_checker(val[self.scheme.status].split("*")[0]):
-                a[num + c] = RowToCheck(val, self.scheme)
-        a = list(a.items())
+    @property
+    def used_columns(self) -> list[int]:
+        columns = {self.scheme.translation, self.scheme.status}
+        for i in self.scheme.to_check:
+            columns.add(i.get("spelling", 0))
+            if (info_index := i.get("info", 0)) is not None:
+                columns.add(info_index)
+        return sorted(columns)
+
+    def counts(self) -> dict[str, int]:
+        """The amount of words in the range for every target, without building the rows."""
+        counts = self.sheet.status_column(self.scheme.status).counts(self.words_range.start, self.words_range.stop)
+        counts["DUE"] = len(self.due_rows_in_range())
+        return counts
+
+    def due_rows_in_range(self) -> list[int]:
+        start, stop, _ = self.words_range.indices(self.sheet.rows)
+        return [i for i in self.due_rows if start <= i < stop]
+
+    def count(self) -> int:
+        counts = self.counts()
+        return counts.get(self.target, counts["all"])
+
+    def matching_rows(self, start: Union[int, None] = None, stop: Union[int, None] = None) -> "np.ndarray":
+        """Indexes of the rows in the range (or in its part from `start` to `stop`) whose status matches the target."""
+        import numpy as np
+
+        range_start, range_stop, _ = self.words_range.indices(self.sheet.rows)
+        start = range_start if start is None else max(start, range_start)
+        stop = range_stop if stop is None else min(stop, range_stop)
+        if self.target == "DUE":
+            return np.array([i for i in self.due_rows if start <= i < stop], dtype=np.int64)
+        if self.target == "all" or self.target not in self.targets:
+            return np.arange(start, max(start, stop))
+        codes = self.sheet.status_column(self.scheme.status).codes[start:stop]
+        return np.flatnonzero(codes == StatusColumn.code(self.target)) + start
+
+    def matching_blocks(self) -> Generator["np.ndarray", None, None]:
+        """The matching rows, `block_rows` rows of the range at a time."""
+        start, stop, _ = self.words_range.indices(self.sheet.rows)
+        for block_start in range(start, stop, self.block_rows):
+            rows = self.matching_rows(block_start, block_start + self.block_rows)
+            if rows.size:
+                yield rows
+
+    def sample_keys(self, rows: "np.ndarray", generator: "np.random.Generator") -> "np.ndarray":
+        """The keys of the rows in the weighted sampling, see `WeightedReservoir`."""
+        import numpy as np
+
+        column = self.sheet.status_column(self.scheme.status)
+        status_weights = np.array([self.status_weights[i] for i in StatusColumn.statuses])
+        weights = status_weights[column.codes[rows]] * column.multipliers[rows]
+        return np.log(generator.random(rows.size)) / weights
+
+    def offer_to(self, reservoir: "WeightedReservoir", source: int = 0) -> None:
+        """Offers the matching rows to the reservoir in a single pass over the status column."""
+        import numpy as np
+
+        generator = np.random.default_rng(None if self.rng is None else self.rng.getrandbits(64))
+        for rows in self.matching_blocks():
+            reservoir.offer(source, rows, self.sample_keys(rows, generator))
+
+    def sample_rows(self) -> "np.ndarray":
+        """The matching rows, or `sample_size` of them weighted by their statuses when there are more."""
+        if self.sample_size is None or self.count() <= self.sample_size:
+            return self.matching_rows()
+        reservoir = WeightedReservoir(self.sample_size)
+        self.offer_to(reservoir)
+        return reservoir.taken(0)
+
+    @TRACER.traced
+    def get_words(self, rows: Union["np.ndarray", None] = None) -> DictationContent:
+        """Filters words: leaves only those with the right status and in right range.
+        The rows can be given, when they were chosen from the matching rows already."""
+        if rows is None:
+            if not self.count():
+                raise NoWordsMatchingSettings(self.target, self.words_range.start+2, self.words_range.stop+1)
+            rows = self.sample_rows()
+        columns = self.used_columns
+        normalizer = AnswerNormalizer.get(self.scheme.narration_language,
+                                          SETTINGS.get(AnswerNormalizer.ignore_case_key, False))
+        a = [(int(i), RowToCheck(self.sheet.row(i, columns), self.scheme, normalizer)) for i in rows]
         if self.with_shuffle:
-            shuffle(a)
-        if not a:
-            raise NoWordsMatchingSettings(self.target, self.words_range.start+2, self.words_range.stop+1)
+            self.shuffle(a)
         return DictationContent(dict(a), self.scheme)
 
 
@@ -327,13 +632,16 @@ class AnswerCheckedResponse:
             with_synonyms: str,
             synonyms_left: str,
             info_to_given_word: str,
-            other_variations: str
+            other_variations: str,
+            is_almost: bool = False
     ):
         self.is_right: bool = is_right
         self.with_synonyms: str = with_synonyms
         self.synonyms_left: str = synonyms_left
         self.info_to_given_word: str = info_to_given_word
         self.other_variations: str = other_variations
+        # the answer was wrong, but only by a typo
+        self.is_almost: bool = is_almost
 
 
 class Dictation:
@@ -341,47 +649,63 @@ class Dictation:
             self,
             dictation_content: DictationContent,
             path_to_vocabulary: str,
+            excel_modifier: Union[type[ExcelModifier], None] = None,
+            rng: Union[Random, None] = None,
+            scheduler: Union[ReviewScheduler, None] = None,
+            reinsertion_distance: tuple[int, int] = ReinsertionQueue.default_distance,
+            typo_tolerance: int = 0,
     ) -> None:
         self.path_to_vocabulary = path_to_vocabulary
+        # wrong answers at most this many edits away from a right one are reported as almost right
+        self.typo_tolerance = typo_tolerance
+        # the due dates are only updated when a scheduler is given
+        self.scheduler = scheduler
+        # the app writes through Excel, the benchmarks and the driver give another modifier
+        self.excel_modifier = ExcelModifier if excel_modifier is None else excel_modifier
+        self.content = dictation_content
         self.scheme = dictation_content.scheme
+        # the rows are keyed by their index, or by (workbook, sheet name, row index) in a combined dictation
         self.words_to_check = dictation_content.words
         self._dictation_running = False
 
         self.revision_required = set()
         self.completed_successfully = set()
+        self.metrics = SessionMetrics()
+        self.metrics.sheet_names = dictation_content.sheet_names
 
-        self.live_queue = deque(self.words_to_check.items())
-        self.revision_queue = []
+        # the rows that have to be revised are asked again a few rows later
+        self.live_queue = ReinsertionQueue(self.words_to_check.items(), *reinsertion_distance, rng=rng)
 
         self.words_generator: Generator
 
         self._current_row: RowToCheck
         self._current_word: WordToCheck
 
+    @TRACER.traced
     def run(self):
         self._dictation_running = True
         self.update_words_generator()
 
+    @TRACER.traced
     def get_word(self) -> Union[bool, Choice]:
-        try:
-            return self.get_word_data()
-        except StopIteration:
-            any_words_left = self.update_words_generator()
-            if not any_words_left:
-                self.stop()
-                return False
-            return self.get_word_data()
+        # rows with every word to check left empty give no words, so they are skipped
+        while True:
+            try:
+                word = self.get_word_data()
+                self.metrics.word_displayed()
+                return word
+            except StopIteration:
+                any_words_left = self.update_words_generator()
+                if not any_words_left:
+                    self.stop()
+                    return False
 
     def get_word_data(self) -> Choice:
         return self.words_generator.__next__()
 
     def update_words_generator(self) -> bool:
-        if self.revision_queue and not self.live_queue:
-            shuffle(self.revision_queue)
-            self.live_queue.extend(self.revision_queue)
-            self.revision_queue.clear()
         if self.live_queue:
-            current_row: [int, RowToCheck] = self.live_queue.popleft()
+            current_row: [int, RowToCheck] = self.live_queue.pop()
             self.words_generator = self.give_row_item(*current_row)
             return True
         return False
@@ -393,14 +717,41 @@ class Dictation:
             while not self._current_word.all_words_checked:
                 yield self._current_word
 
+    @TRACER.traced
     def update_statuses(self):
         self.completed_successfully = self.completed_successfully.difference(self.revision_required)
         to_update = {"NEEDS_REVISION": self.revision_required, "NORMAL": self.completed_successfully}
 
-        excel = ExcelModifier(self.scheme.sheet_name, self.scheme.status, self.path_to_vocabulary)
-        for new_status, row_indexes in to_update.items():
-            excel.modify(new_status, row_indexes)
-        excel.commit()
+        # workbook -> sheet name -> (scheme, new status -> row indexes, new status -> given rows)
+        by_workbook: dict[str, dict[str, tuple[SheetScheme, dict[str, list[int]], dict[str, list[RowToCheck]]]]] = {}
+        for new_status, keys in to_update.items():
+            for key in keys:
+                path, scheme, row = self.content.locate(key)
+                path = self.path_to_vocabulary if path is None else path
+                sheet = by_workbook.setdefault(path, {}).setdefault(
+                    scheme.sheet_name, (scheme, {i: [] for i in to_update}, {i: [] for i in to_update}))
+                sheet[1][new_status].append(row)
+                sheet[2][new_status].append(self.words_to_check[key])
+
+        # every workbook is opened and saved once, however many of its sheets the dictation took words from
+        for path, sheets in by_workbook.items():
+            excel = None
+            for sheet_name, (scheme, rows, _) in sheets.items():
+                if excel is None:
+                    excel = self.excel_modifier(sheet_name, scheme.status, path)
+                else:
+                    excel.select_sheet(sheet_name, scheme.status)
+                for new_status, row_indexes in rows.items():
+                    excel.modify(new_status, row_indexes)
+            excel.commit()
+
+        if self.scheduler is not None:
+            for path, sheets in by_workbook.items():
+                for sheet_name, (_, rows, given_rows) in sheets.items():
+                    self.scheduler.schedule(path, sheet_name, [
+                        (row, status, ExcelModifier.next_status(given.status, status), given.word)
+                        for status in rows for row, given in zip(rows[status], given_rows[status])
+                    ])
 
     def stop(self):
         """Here we should call a function to update word statuses"""
@@ -408,28 +759,42 @@ class Dictation:
             return
         try:
             self.update_statuses()
-        except pywintypes.com_error:
+        except self.excel_modifier.locked_workbook_errors():
             raise ExcelAppOpenedError()
         self._dictation_running = False
 
+    @TRACER.traced
     def show_answer(self) -> Choice:
         """Here we should return the answer and information about it, put the presently
-        questioned word in the end of the queue and add it to self.revision_required"""
-        self.revision_queue.append(self._current_row)
+        questioned word back in the queue a few words later and add it to self.revision_required"""
+        self.live_queue.reinsert(self._current_row)
         self.revision_required.add(self._current_row[0])
+        self.record(AnswerOutcome.HINT)
         cur_word = self._current_word
         self.update_words_generator()
         return cur_word
 
+    @TRACER.traced
     def check_answer(self, answer: str, affect_choice: bool = True) -> AnswerCheckedResponse:
         is_right = self._current_word.check_answer(answer, affect_choice)
+        is_almost = not is_right[0] and self.typo_tolerance > 0 and \
+            self._current_word.is_near_miss(answer, self.typo_tolerance)
         response_data = AnswerCheckedResponse(is_right[0], self._current_word.with_synonyms,
                                               self._current_word.amount_of_words_left,
-                                              is_right[1], is_right[2])
+                                              is_right[1], is_right[2], is_almost)
+        if affect_choice:
+            outcome = AnswerOutcome.RIGHT if is_right[0] else \
+                AnswerOutcome.ALMOST if is_almost else AnswerOutcome.WRONG
+            self.record(outcome)
         if is_right[0] and self._current_word.all_words_checked:
             self.count_as_right()
+            self.metrics.word_completed()
         return response_data
 
+    def record(self, outcome: int) -> None:
+        key = self._current_row[0]
+        self.metrics.record(self.content.locate(key)[2], outcome, self.content.sheet_index(key))
+
     def count_as_right(self) -> None:
         """Here we add the word to self.completed_successfully."""
         self.completed_successfully.add(self._current_row[0])
@@ -440,14 +805,18 @@ class Dictation:
 
 
 class Narrator:
+    """pygame and gtts are only imported when the first word is narrated,
+    so a dictation without narration never pays for them."""
+
     def __init__(self, narration_language: str):
         self.narration_language = narration_language
-        self.sound_narrator = pygame
-        self.sound_narrator.init()
-        self.sound_narrator.mixer.init()
+        self.sound_narrator = None
         self.connection_error = False
 
+    @TRACER.traced
     def narrate(self, text_to_narrate: str) -> None:
+        from gtts.tts import gTTSError
+
         try:
             if self.connection_error:
                 return
@@ -458,12 +827,23 @@ class Narrator:
             raise NarrationError()
 
     def create_sound(self, text_to_narrate: str) -> None:
+        from gtts import gTTS
+
         text_to_speech = gTTS(text_to_narrate, lang=self.narration_language)
         sound = BytesIO()
         text_to_speech.write_to_fp(sound)
         sound.seek(0)
         self._play_sound(sound)
 
+    def _init_sound_narrator(self) -> None:
+        import pygame
+
+        self.sound_narrator = pygame
+        self.sound_narrator.init()
+        self.sound_narrator.mixer.init()
+
     def _play_sound(self, audio: BytesIO):
+        if self.sound_narrator is None:
+            self._init_sound_narrator()
         self.sound_narrator.mixer.music.load(audio)
         self.sound_narrator.mixer.music.play()
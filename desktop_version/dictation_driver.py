@@ -0,0 +1,304 @@
+"""Runs dictations without the UI: a session is started from a scheme and a workbook, the answers are
+given by a strategy and the statuses are committed (or only counted, in a dry run).
+
+Usage (from the `desktop_version` directory):
+    python dictation_driver.py --workbook vocabulary.xlsx --scheme nouns [verbs ...] --sessions 1000 --seed 0
+                               [--strategy right | hints:0.1 | replay:answers.jsonl] [--record answers.jsonl]
+                               [--target all] [--range 2 500] [--commit] [--profile dictation.prof]
+                               [--schedule schedule.db [--due-limit 50]] [--reinsert 5 15] [--sample 200]
+                               [--typo-tolerance 1]
+"""
+import argparse
+import json
+import sys
+import time
+
+from abc import ABC, abstractmethod
+from random import Random
+from typing import Union, Iterable, Iterator
+
+from user_settings import SETTINGS
+from core import SheetScheme, SheetToSchemeCompatibilityChecker, WordsGetter, Dictation, Choice, \
+    CombinedDictationContent, SheetWords
+from excel_modifier import ExcelModifier, DryRunExcelModifier, OpenpyxlExcelModifier
+from exceptions import NoWordsMatchingSettings, SheetNotFoundError
+from bulk_loading import SHEET_CACHE, MissingSheetError
+from sheet_view import SheetView
+from tracing import TRACER
+from scheduler import ReviewScheduler
+from reinsertion_queue import ReinsertionQueue
+
+
+class AnswerAction:
+    answer = "answer"
+    hint = "hint"
+
+    def __init__(self, action: str, text: str) -> None:
+        self.action = action
+        self.text = text
+
+    def as_dict(self) -> dict[str, str]:
+        return {"action": self.action, "text": self.text}
+
+
+class AnswerStrategy(ABC):
+    """Decides how the learner answers the current word."""
+
+    @abstractmethod
+    def next_action(self, choice: Choice) -> AnswerAction:
+        """Should return what the learner does with the word: answers it or asks for a hint."""
+
+    @staticmethod
+    def right_answer(choice: Choice) -> str:
+        return choice.words[0].word_variations[0]
+
+
+class AlwaysRightStrategy(AnswerStrategy):
+    def next_action(self, choice: Choice) -> AnswerAction:
+        return AnswerAction(AnswerAction.answer, self.right_answer(choice))
+
+
+class HintRateStrategy(AnswerStrategy):
+    """Asks for the answer in `hint_rate` of the cases and answers right otherwise.
+    It has its own random generator, so the order of the words does not depend on the strategy."""
+
+    def __init__(self, hint_rate: float, seed: Union[int, None] = None) -> None:
+        self.hint_rate = hint_rate
+        self.rng = Random(seed)
+
+    def next_action(self, choice: Choice) -> AnswerAction:
+        action = AnswerAction.hint if self.rng.random() < self.hint_rate else AnswerAction.answer
+        return AnswerAction(action, self.right_answer(choice))
+
+
+class ReplayStrategy(AnswerStrategy):
+    """Gives the answers from a log recorded by `AnswerLogRecorder`, in the same order.
+    The sessions must be run with the same seed as the recorded ones."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, mode="r", encoding="utf-8") as file:
+            self.actions: Iterator[dict] = iter([json.loads(i) for i in file if i.strip()])
+
+    def next_action(self, choice: Choice) -> AnswerAction:
+        try:
+            action = next(self.actions)
+        except StopIteration:
+            raise ValueError("The answer log ended before the dictation.")
+        return AnswerAction(action["action"], action["text"])
+
+
+class AnswerLogRecorder:
+    def __init__(self, path: str) -> None:
+        self.file = open(path, mode="w", encoding="utf-8")
+
+    def record(self, action: AnswerAction) -> None:
+        self.file.write(json.dumps(action.as_dict(), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class SessionResult:
+    def __init__(self) -> None:
+        self.words = 0
+        self.answers = 0
+        self.wrong_answers = 0
+        self.hints = 0
+        self.duration = 0.0
+
+
+class HeadlessDictationDriver:
+    """Loads the sheet once and runs any amount of dictations on it. With other schemes given,
+    the dictations also take the words of their sheets (all their rows matching the target).
+    The sheets are read like the app reads them, through the sheet cache."""
+
+    def __init__(
+            self,
+            scheme: SheetScheme,
+            path_to_vocabulary: str,
+            seed: Union[int, None] = None,
+            excel_modifier: type[ExcelModifier] = DryRunExcelModifier,
+            scheduler: Union[ReviewScheduler, None] = None,
+            due_words_limit: int = 50,
+            reinsertion_distance: tuple[int, int] = ReinsertionQueue.default_distance,
+            typo_tolerance: int = 0,
+            other_schemes: Iterable[SheetScheme] = (),
+    ) -> None:
+        self.scheme = scheme
+        self.path_to_vocabulary = path_to_vocabulary
+        self.rng = Random(seed)
+        self.excel_modifier = excel_modifier
+        self.scheduler = scheduler
+        self.due_words_limit = due_words_limit
+        self.reinsertion_distance = reinsertion_distance
+        self.typo_tolerance = typo_tolerance
+
+        self.other_schemes = list(other_schemes)
+        sheets = SHEET_CACHE.load(path_to_vocabulary, [i.sheet_name for i in [scheme, *self.other_schemes]])
+        self.sheet = self.checked_sheet(sheets, scheme)
+        self.other_sheets = [self.checked_sheet(sheets, i) for i in self.other_schemes]
+
+    def checked_sheet(self, sheets: dict[str, Union[SheetView, Exception]], scheme: SheetScheme) -> SheetView:
+        sheet = sheets[scheme.sheet_name]
+        if isinstance(sheet, MissingSheetError):
+            raise SheetNotFoundError(scheme.sheet_name, self.path_to_vocabulary)
+        if isinstance(sheet, Exception):
+            raise sheet
+        SheetToSchemeCompatibilityChecker(sheet, scheme).check_compatibility()
+        return sheet
+
+    @property
+    def full_range(self) -> range:
+        return range(2, self.sheet.rows + 1)
+
+    def run_session(
+            self,
+            strategy: AnswerStrategy,
+            words_range: Union[range, None] = None,
+            target: str = "all",
+            with_shuffle: bool = True,
+            recorder: Union[AnswerLogRecorder, None] = None,
+            sample_size: Union[int, None] = None,
+    ) -> SessionResult:
+        result = SessionResult()
+        started = time.perf_counter()
+
+        words_range = self.full_range if words_range is None else words_range
+        if not self.other_schemes:
+            content = WordsGetter(self.sheet, self.scheme, words_range, target, with_shuffle, self.rng,
+                                  self.due_rows(self.sheet, self.scheme), sample_size).get_words()
+        else:
+            getters = [(self.path_to_vocabulary, WordsGetter(self.sheet, self.scheme, words_range, target, False,
+                                                             self.rng, self.due_rows(self.sheet, self.scheme)))]
+            for other_scheme, sheet in zip(self.other_schemes, self.other_sheets):
+                getters.append((self.path_to_vocabulary, WordsGetter(
+                    sheet, other_scheme, range(2, sheet.rows + 1), target, False, self.rng,
+                    self.due_rows(sheet, other_scheme)
+                )))
+            content = CombinedDictationContent.from_getters(getters, with_shuffle, self.rng, sample_size)
+        dictation = Dictation(content, self.path_to_vocabulary, self.excel_modifier, self.rng, self.scheduler,
+                              self.reinsertion_distance, self.typo_tolerance)
+        dictation.run()
+        while choice := dictation.get_word():
+            result.words += 1
+            action = strategy.next_action(choice)
+            if recorder is not None:
+                recorder.record(action)
+            if action.action == AnswerAction.hint:
+                # the same sequence of calls as in DictationRunControls: the answer is typed after it is shown
+                result.hints += 1
+                dictation.show_answer()
+                dictation.check_answer(action.text, affect_choice=False)
+                continue
+            result.answers += 1
+            if not dictation.check_answer(action.text).is_right:
+                result.wrong_answers += 1
+
+        result.duration = time.perf_counter() - started
+        return result
+
+    def due_rows(self, sheet: SheetView, scheme: SheetScheme) -> Union[list[int], None]:
+        if self.scheduler is None:
+            return None
+        return self.scheduler.most_overdue(self.path_to_vocabulary, scheme.sheet_name, self.due_words_limit,
+                                           SheetWords(sheet, scheme))
+
+    def run_sessions(self, amount: int, strategy: AnswerStrategy, **session_settings) -> list[SessionResult]:
+        return [self.run_session(strategy, **session_settings) for _ in range(amount)]
+
+
+def get_strategy(description: str, seed: Union[int, None] = None) -> AnswerStrategy:
+    name, _, parameter = description.partition(":")
+    if name == "right":
+        return AlwaysRightStrategy()
+    if name == "hints":
+        return HintRateStrategy(float(parameter), seed)
+    if name == "replay":
+        return ReplayStrategy(parameter)
+    raise ValueError(f"Unknown strategy `{description}`, use right, hints:<rate> or replay:<path>.")
+
+
+def print_summary(results: list[SessionResult]) -> None:
+    if not results:
+        print("sessions: 0")
+        return
+    duration = sum(i.duration for i in results)
+    words = sum(i.words for i in results)
+    print(f"sessions: {len(results)}, words: {words}, answers: {sum(i.answers for i in results)}, "
+          f"wrong: {sum(i.wrong_answers for i in results)}, hints: {sum(i.hints for i in results)}")
+    print(f"total {duration:.3f} s, {len(results) / duration if duration else 0:.1f} sessions/s, "
+          f"{duration * 1_000_000 / max(words, 1):.1f} us per word")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Runs dictations without the UI.")
+    parser.add_argument("--workbook", default=None, help="defaults to the vocabulary file from the settings")
+    parser.add_argument("--scheme", required=True, nargs="+",
+                        help="name of a saved scheme, the words of the other schemes given are added to the sessions")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy", default="right")
+    parser.add_argument("--record", default=None, help="file to record the answers to, for a later replay")
+    parser.add_argument("--target", default="all")
+    parser.add_argument("--range", type=int, nargs=2, default=None, metavar=("START", "END"))
+    parser.add_argument("--no-shuffle", action="store_true")
+    parser.add_argument("--sample", type=int, default=None, help="the most words a session takes, weighted by status")
+    parser.add_argument("--commit", action="store_true", help="write the statuses to the workbook")
+    parser.add_argument("--profile", default=None, help="file to save the cProfile statistics to")
+    parser.add_argument("--schedule", default=None, help="schedule database to update and to take the DUE words from")
+    parser.add_argument("--due-limit", type=int, default=50, help="the most words the DUE target gives")
+    parser.add_argument("--reinsert", type=int, nargs=2, default=ReinsertionQueue.default_distance,
+                        metavar=("MIN", "MAX"), help="how many words later a missed word is asked again")
+    parser.add_argument("--typo-tolerance", type=int, default=0, help="edits a wrong answer may be away from an "
+                                                                     "accepted one to be reported as almost right")
+    args = parser.parse_args()
+
+    for scheme_name in args.scheme:
+        if SETTINGS.schemes.get(scheme_name) is None:
+            print(f"There is no scheme `{scheme_name}`.")
+            return 1
+    schemes = [SheetScheme(SETTINGS.schemes.get(i)) for i in args.scheme]
+    driver = HeadlessDictationDriver(
+        schemes[0],
+        args.workbook or SETTINGS.path,
+        args.seed,
+        OpenpyxlExcelModifier if args.commit else DryRunExcelModifier,
+        ReviewScheduler(args.schedule) if args.schedule else None,
+        args.due_limit,
+        tuple(args.reinsert),
+        args.typo_tolerance,
+        schemes[1:],
+    )
+    strategy = get_strategy(args.strategy, args.seed)
+    recorder = AnswerLogRecorder(args.record) if args.record else None
+    session_settings = {
+        "words_range": range(*args.range) if args.range else None,
+        "target": args.target,
+        "with_shuffle": not args.no_shuffle,
+        "recorder": recorder,
+        "sample_size": args.sample,
+    }
+    # the answers recorded so far are kept even when a session fails
+    try:
+        if args.profile:
+            import cProfile
+            profile = cProfile.Profile()
+            results = profile.runcall(driver.run_sessions, args.sessions, strategy, **session_settings)
+            profile.dump_stats(args.profile)
+        else:
+            results = driver.run_sessions(args.sessions, strategy, **session_settings)
+    except NoWordsMatchingSettings as e:
+        print(e.message())
+        return 1
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+    print_summary(results)
+    if TRACER.enabled:
+        print(TRACER.summary_table())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,31 @@
+import time
+import threading
+
 from typing import Callable, Union
 from enum import Enum
 
-import pandas as pd
 import flet as ft
 
 from user_settings import SETTINGS
-from exceptions import BaseExceptionWithUIMessage, InvalidRangeOfWordsError, \
-    ExcelAppOpenedError, NarrationError
-from core import SheetScheme, ExcelParser, SheetToSchemeCompatibilityChecker, \
-    WordsGetter, Dictation, DictationContent, Choice, AnswerCheckedResponse, Narrator
+from exceptions import BaseExceptionWithUIMessage, InvalidRangeOfWordsError, InvalidSampleSizeError, \
+    ExcelAppOpenedError, NarrationError, NoWordsMatchingSettings
+from core import SheetScheme, SheetToSchemeCompatibilityChecker, \
+    WordsGetter, Dictation, DictationContent, CombinedDictationContent, Choice, AnswerCheckedResponse, Narrator, \
+    SheetWords
+from session_metrics import SessionMetricsStore
+from sheet_view import SheetView
+from scheduler import REVIEW_SCHEDULER
+from answer_matching import AnswerNormalizer, EditDistance, IncrementalAnswerChecker, TypingState
+from ui_updates import UpdateCoalescer
+from sheet_loading import SHEET_LOADER
+from scheme_validation import SCHEME_VALIDATOR, SchemeState
 
 
 class AnswerCorrectness(Enum):
     CORRECT = 1
     INCORRECT = 2
     WITH_HINT = 3
+    ALMOST = 4
 
 
 class DictationRunControls(ft.Column):
@@ -35,18 +46,32 @@ class DictationRunControls(ft.Column):
     right_prompt = "right-prompt"
     wrong_prompt = "wrong-prompt"
     answer_shown_prompt = "answer-shown-prompt"
+    almost_prompt = "almost-prompt"
+    session_metrics_template = "session-metrics-template"
+
+    typing_state_colors = {TypingState.ON_TRACK: None, TypingState.DIVERGED: "red"}
+    # the least time between two updates of the typing state, in seconds
+    typing_update_interval = 0.1
 
-    def __init__(self, page: ft.Page, exit_dictation: Callable, block_width: int):
+    def __init__(
+            self,
+            page: ft.Page,
+            exit_dictation: Callable,
+            block_width: int,
+            updates: Union[UpdateCoalescer, None] = None
+    ):
         SETTINGS.translate_widget(self.__class__)
         self.answer_correctness_relations = {
             AnswerCorrectness.CORRECT: [self.right_prompt, "green"],
             AnswerCorrectness.INCORRECT: [self.wrong_prompt, "red"],
-            AnswerCorrectness.WITH_HINT: [self.answer_shown_prompt, "yellow"]
+            AnswerCorrectness.WITH_HINT: [self.answer_shown_prompt, "yellow"],
+            AnswerCorrectness.ALMOST: [self.almost_prompt, "orange"]
         }
 
         self.page = page
         self.exit_dictation = exit_dictation
         self.block_width = block_width
+        self.updates = UpdateCoalescer(page) if updates is None else updates
 
         self.page.on_keyboard_event = self.get_hint_through_keyboard
 
@@ -74,6 +99,7 @@ class DictationRunControls(ft.Column):
 
         self.user_input = ft.TextField(
             on_submit=self.send_answer,
+            on_change=self.check_typed_answer,
         )
 
         self.answer_correctness_indicator = ft.Text(size=20)
@@ -82,6 +108,7 @@ class DictationRunControls(ft.Column):
         self.show_answer_button = ft.ElevatedButton(self.show_answer_button, on_click=self.show_answer)
 
         self.errors_label = ft.Text(color="red")
+        self.session_metrics_label = ft.Text(color=ft.colors.BLUE_GREY, size=14)
 
         self.previous_word_block_title = ft.Text(
             self.previous_word_information,
@@ -104,17 +131,23 @@ class DictationRunControls(ft.Column):
                               self.synonyms_label, self.variations_left_label,
                               self.answer_correctness_indicator,
                               self.hints_label, self.user_input, self.show_answer_button,
-                              self.stop_dictation_button, self.errors_label]
+                              self.stop_dictation_button, self.errors_label, self.session_metrics_label]
 
         self.current_word_block_annotations = [self.translation_label, self.instructions_label,
                                                self.synonyms_label, self.variations_left_label,
                                                self.answer_correctness_indicator, self.hints_label,
-                                               self.errors_label]
+                                               self.errors_label, self.session_metrics_label]
 
         self.inputs = [self.user_input, self.show_answer_button, self.stop_dictation_button]
 
         self.dictation, self.narrator = None, None
         self.awaiting_hint_typed, self.with_narration = False, False
+        self.typing_checker: Union[IncrementalAnswerChecker, None] = None
+        self.typing_state = self.latest_typing_state = TypingState.ON_TRACK
+        self.typing_state_updated = 0.0
+        # a change that came sooner than `typing_update_interval` is shown by this timer once the time has passed
+        self.typing_state_timer: Union[threading.Timer, None] = None
+        self.typing_state_lock = threading.Lock()
 
         super().__init__(self.controls_list)
         self.set_width()
@@ -128,6 +161,8 @@ class DictationRunControls(ft.Column):
             i.disabled = False
         self.dictation = None,
         self.awaiting_hint_typed = False
+        self.typing_checker = None
+        self.reset_typing_state()
 
     def set_width(self):
         for i in self.controls:
@@ -148,7 +183,10 @@ class DictationRunControls(ft.Column):
         self.with_narration = dictation_settings[0] and dictation_content.narration_possible
         if self.with_narration:
             self.narrator = Narrator(dictation_content.narration_language)
-        self.dictation = Dictation(dictation_content, SETTINGS.path)
+        self.dictation = Dictation(
+            dictation_content, SETTINGS.path, scheduler=REVIEW_SCHEDULER,
+            typo_tolerance=SETTINGS.get(EditDistance.typo_tolerance_key, EditDistance.default_typo_tolerance)
+        )
         self.dictation.run()
         self.display_current_word()
 
@@ -162,6 +200,9 @@ class DictationRunControls(ft.Column):
             self.stop_dictation(self.dictation_completed_message)
             return
         cur_word: Choice = cur_word
+        if SETTINGS.get(IncrementalAnswerChecker.check_as_you_type_key, False):
+            self.typing_checker = cur_word.typing_checker()
+        self.reset_typing_state()
         self.translation_label.value = self.translation_text_template.format(cur_word.translation)
         self.instructions_label.value = self.instructions_text_template.format(cur_word.instructions)
         self.synonyms_label.visible = False
@@ -170,27 +211,93 @@ class DictationRunControls(ft.Column):
             self.synonyms_label.visible = True
         self.variations_left_label.value = cur_word.amount_of_words_left
 
+    def reset_typing_state(self):
+        with self.typing_state_lock:
+            self.cancel_typing_state_timer()
+            self.typing_state = self.latest_typing_state = TypingState.ON_TRACK
+            self.user_input.border_color = self.typing_state_colors[TypingState.ON_TRACK]
+
+    def cancel_typing_state_timer(self):
+        if self.typing_state_timer is not None:
+            self.typing_state_timer.cancel()
+            self.typing_state_timer = None
+
+    def check_typed_answer(self, e: ft.ControlEvent):
+        """Accepts the answer as soon as it is a whole variation and marks the input once it
+        matches none of them. The input is only updated when its state changes, and not more
+        often than every `typing_update_interval` seconds: a change that comes sooner is shown
+        when the time has passed, if it is still the latest one."""
+        if self.typing_checker is None:
+            return
+        state = self.typing_checker.feed(self.user_input.value)
+        if state == TypingState.COMPLETE:
+            self.send_answer(e)
+            return
+        with self.typing_state_lock:
+            self.latest_typing_state = state
+            if state == self.typing_state:
+                self.cancel_typing_state_timer()
+                return
+            wait = self.typing_state_updated + self.typing_update_interval - time.monotonic()
+            if wait > 0:
+                if self.typing_state_timer is None:
+                    self.typing_state_timer = threading.Timer(wait, self.show_latest_typing_state)
+                    self.typing_state_timer.daemon = True
+                    self.typing_state_timer.start()
+                return
+            self.show_typing_state(state)
+        self.updates.update(self.user_input)
+
+    def show_latest_typing_state(self):
+        with self.updates.event("typing state"):
+            with self.typing_state_lock:
+                self.typing_state_timer = None
+                if self.typing_checker is None or self.latest_typing_state == self.typing_state:
+                    return
+                self.show_typing_state(self.latest_typing_state)
+            self.updates.update(self.user_input)
+
+    def show_typing_state(self, state: TypingState):
+        self.typing_state, self.typing_state_updated = state, time.monotonic()
+        self.user_input.border_color = self.typing_state_colors[state]
+
     def show_answer(self, e: ft.ControlEvent):
-        self.awaiting_hint_typed = True
-        self.clear_labels()
-        word: Choice = self.dictation.show_answer()
-        self.hints_label.value = self.answer_shown_instructions.format(word.show_all_translation())
-        self.user_input.focus()
-        self.page.update()
+        with self.updates.event("hint"):
+            self.awaiting_hint_typed = True
+            self.clear_labels()
+            word: Choice = self.dictation.show_answer()
+            self.hints_label.value = self.answer_shown_instructions.format(word.show_all_translation())
+            self.display_session_metrics()
+            self.updates.focus(self.user_input)
+            self.updates.update(self)
 
     def send_answer(self, e: ft.ControlEvent):
-        res: AnswerCheckedResponse = self.dictation.check_answer(self.user_input.value, (not self.awaiting_hint_typed))
         initial_input = self.user_input.value
+        # everything the answer changes is sent in one update, before the word is narrated
+        with self.updates.event("answer"):
+            answer_right = self.process_answer(initial_input)
+        if answer_right and self.with_narration:
+            try:
+                self.narrator.narrate(initial_input)
+            except NarrationError as e:
+                self.errors_label.value = e.message()
+                self.updates.update(self.errors_label)
+
+    def process_answer(self, initial_input: str) -> bool:
+        """Shows the result of the answer and the next word, returns whether the answer was right."""
+        res: AnswerCheckedResponse = self.dictation.check_answer(initial_input, (not self.awaiting_hint_typed))
         answer_right = False
+        self.display_session_metrics()
+        self.updates.focus(self.user_input)
+        self.updates.update(self)
         if self.awaiting_hint_typed:
             self.awaiting_hint_typed = False
             self.hints_label.value = ""
             self.display_correctness_indicator(AnswerCorrectness.WITH_HINT)
         elif not res.is_right:
-            self.display_correctness_indicator(AnswerCorrectness.INCORRECT, initial_input)
-            self.user_input.focus()
-            self.page.update()
-            return
+            state = AnswerCorrectness.ALMOST if res.is_almost else AnswerCorrectness.INCORRECT
+            self.display_correctness_indicator(state, initial_input)
+            return answer_right
         else:
             answer_right = True
             self.display_correctness_indicator(AnswerCorrectness.CORRECT)
@@ -198,13 +305,7 @@ class DictationRunControls(ft.Column):
         self.display_previous_word(res)
         self.user_input.value = ""
         self.display_current_word()
-        self.user_input.focus()
-        self.page.update()
-        if answer_right and self.with_narration:
-            try:
-                self.narrator.narrate(initial_input)
-            except NarrationError as e:
-                self.errors_label.value = e.message()
+        return answer_right
 
     def display_previous_word(self, word: AnswerCheckedResponse):
         self.variations_left_label.value = word.synonyms_left
@@ -214,6 +315,16 @@ class DictationRunControls(ft.Column):
             self.information_about_the_word_template.format(word.info_to_given_word)
         self.additional_information_label.value = information
 
+    def display_session_metrics(self):
+        metrics = self.dictation.metrics
+        percentiles = metrics.latency_percentiles()
+        self.session_metrics_label.value = self.session_metrics_template.format(
+            words_per_minute=metrics.words_per_minute,
+            median=percentiles[50],
+            p90=percentiles[90],
+            hint_rate=metrics.hint_rate,
+        )
+
     def display_correctness_indicator(self, state: AnswerCorrectness, content: Union[str, bool] = False):
         scheme = self.answer_correctness_relations.get(state)
         s = scheme[0].format(content) if content else scheme[0]
@@ -236,6 +347,8 @@ class DictationRunControls(ft.Column):
         except ExcelAppOpenedError as e:
             self.handle_excel_errors(e)
             return
+        SessionMetricsStore.save(self.dictation.metrics, workbook=SETTINGS.path,
+                                 sheet=self.dictation.content.sheet_name)
         self.clear_labels()
         self.disabled = True
         self.reload()
@@ -247,12 +360,20 @@ class SchemeChoiceControls(ft.Column):
     no_schemes_message = "no-schemes-message"
     scheme_choice_label = "scheme-choice-label"
     scheme_choice_hint_text = "scheme-choice-hint-text"
-
-    def __init__(self, scheme_chosen_function: Callable):
+    scheme_option_template = "scheme-option-template"
+    scheme_checking = "scheme-checking"
+    scheme_valid = "scheme-valid"
+    scheme_invalid_rows = "scheme-invalid-rows"
+    scheme_missing_sheet = "scheme-missing-sheet"
+    scheme_invalid_columns = "scheme-invalid-columns"
+    scheme_unreadable = "scheme-unreadable"
+
+    def __init__(self, scheme_chosen_function: Callable, updates: UpdateCoalescer):
         SETTINGS.translate_widget(self.__class__)
+        self.updates = updates
         self.schemes = SETTINGS.get(self.schemes_key)
+        self.scheme_states: dict[str, tuple[str, int]] = {}
         self.schemes_dropdown = ft.Dropdown(
-            options=[ft.dropdown.Option(i) for i in self.schemes.keys()],
             on_change=lambda x: scheme_chosen_function(x.control.value),
             autofocus=True,
 
@@ -263,6 +384,7 @@ class SchemeChoiceControls(ft.Column):
         self.no_schemes_label = ft.Text(color="red")
         self.no_schemes_label.visible = False
 
+        self.validate_schemes()
         self._check_for_schemes()
         self.controls_list = [self.schemes_dropdown, self.no_schemes_label]
         super().__init__(self.controls_list)
@@ -270,9 +392,43 @@ class SchemeChoiceControls(ft.Column):
     def reload(self):
         self.schemes = SETTINGS.get(self.schemes_key)
         self.schemes_dropdown.value = ""
-        self.schemes_dropdown.options = [ft.dropdown.Option(i) for i in self.schemes.keys()]
+        self.validate_schemes()
         self._check_for_schemes()
-        self.update()
+        self.updates.update(self)
+
+    def validate_schemes(self) -> None:
+        """Shows the states of the schemes known from the previous checks right away,
+        the other schemes are checked in the background and shown as they are checked."""
+        if SETTINGS.vocabulary_path_valid:
+            self.scheme_states = SCHEME_VALIDATOR.validate(SETTINGS.path, self.schemes, self.scheme_validated)
+        else:
+            self.scheme_states = {}
+        self.schemes_dropdown.options = [ft.dropdown.Option(key=i, text=self.option_text(i)) for i in self.schemes]
+
+    def scheme_validated(self, scheme_name: str, state: tuple[str, int]) -> None:
+        with self.updates.event("scheme validated"):
+            if scheme_name not in self.scheme_states:
+                return
+            self.scheme_states[scheme_name] = state
+            for i in self.schemes_dropdown.options:
+                if i.key == scheme_name:
+                    i.text = self.option_text(scheme_name)
+            self.updates.update(self.schemes_dropdown)
+
+    def option_text(self, scheme_name: str) -> str:
+        if scheme_name not in self.scheme_states:
+            return scheme_name
+        state, invalid_rows = self.scheme_states[scheme_name]
+        texts = {
+            SchemeState.CHECKING: self.scheme_checking,
+            SchemeState.VALID: self.scheme_valid,
+            SchemeState.INVALID_ROWS: self.scheme_invalid_rows,
+            SchemeState.MISSING_SHEET: self.scheme_missing_sheet,
+            SchemeState.INVALID_COLUMNS: self.scheme_invalid_columns,
+            SchemeState.UNREADABLE: self.scheme_unreadable,
+        }
+        return self.scheme_option_template.format(scheme=scheme_name,
+                                                  state=texts[state].format(rows=invalid_rows))
 
     def _check_for_schemes(self) -> bool:
         if self.schemes:
@@ -294,7 +450,9 @@ class SchemeChoiceControls(ft.Column):
 
 
 class DictationRunSettingsControls(ft.Column):
-    target_states = ["NEW", "NORMAL", "NEEDS_REVISION", "all"]
+    target_states = ["NEW", "NORMAL", "NEEDS_REVISION", "DELAYED", "DUE", "all"]
+    due_words_limit_key = "DUE_WORDS_LIMIT"
+    default_due_words_limit = 50
     range_choice_label = "range-choice-label"
     range_start_label = "range-start-label"
     range_end_label = "range-end-label"
@@ -303,17 +461,33 @@ class DictationRunSettingsControls(ft.Column):
     with_narration_label = "with-narration-label"
     shuffle_words_label = "shuffle-words-label"
     start_dictation_label = "start-dictation-label"
-
-    def __init__(self, page: ft.Page, start_dictation_function: Callable):
+    selection_counts_template = "selection-counts-template"
+    sample_size_label = "sample-size-label"
+    sample_size_hint_text = "sample-size-hint-text"
+    ignore_case_label = "ignore-case-label"
+    typo_hints_label = "typo-hints-label"
+    check_as_you_type_label = "check-as-you-type-label"
+    also_include_label = "also-include-label"
+    loading_other_sheets_template = "loading-other-sheets-template"
+
+    def __init__(
+            self,
+            page: ft.Page,
+            start_dictation_function: Callable,
+            updates: Union[UpdateCoalescer, None] = None
+    ):
         SETTINGS.translate_widget(self.__class__)
         self.page = page
         self.start_dictation_function = start_dictation_function
+        self.updates = UpdateCoalescer(page) if updates is None else updates
 
         self.sheet_processing_error_label = ft.Text(color="red")
 
         self.range_label = ft.Text(self.range_choice_label)
-        self.range_start = ft.TextField(label=self.range_start_label, width=page.width // 8, keyboard_type=ft.KeyboardType.NUMBER)
-        self.range_end = ft.TextField(label=self.range_end_label, width=page.width // 8, keyboard_type=ft.KeyboardType.NUMBER)
+        self.range_start = ft.TextField(label=self.range_start_label, width=page.width // 8,
+                                        keyboard_type=ft.KeyboardType.NUMBER, on_change=self.preview_selection)
+        self.range_end = ft.TextField(label=self.range_end_label, width=page.width // 8,
+                                      keyboard_type=ft.KeyboardType.NUMBER, on_change=self.preview_selection)
 
         self.range_controls = ft.Row(
             [self.range_label, self.range_start, self.range_end],
@@ -323,30 +497,61 @@ class DictationRunSettingsControls(ft.Column):
         self.target_choice = ft.Dropdown(
             options=[ft.dropdown.Option(i) for i in self.target_states],
             label=self.target_choice_label,
-            hint_text=self.target_choice_hint_text
+            hint_text=self.target_choice_hint_text,
+            on_change=self.preview_selection
         )
         self.target_choice.value = "NEW"
 
+        self.selection_counts_label = ft.Text()
+
+        self.sample_size_input = ft.TextField(label=self.sample_size_label, hint_text=self.sample_size_hint_text,
+                                              keyboard_type=ft.KeyboardType.NUMBER, on_change=self.preview_selection)
+
         self.with_narrator_checkbox = ft.Checkbox(label=self.with_narration_label)
         self.with_narrator_checkbox.value = True
 
         self.with_shuffle_checkbox = ft.Checkbox(label=self.shuffle_words_label)
         self.with_shuffle_checkbox.value = True
 
+        # unlike the other choices, these are kept in the settings
+        self.ignore_case_checkbox = ft.Checkbox(label=self.ignore_case_label, on_change=self.change_ignore_case)
+        self.ignore_case_checkbox.value = SETTINGS.get(AnswerNormalizer.ignore_case_key, False)
+        self.typo_hints_checkbox = ft.Checkbox(label=self.typo_hints_label, on_change=self.change_typo_hints)
+        self.typo_hints_checkbox.value = self.typo_tolerance > 0
+        self.check_as_you_type_checkbox = ft.Checkbox(label=self.check_as_you_type_label,
+                                                      on_change=self.change_check_as_you_type)
+        self.check_as_you_type_checkbox.value = SETTINGS.get(IncrementalAnswerChecker.check_as_you_type_key, False)
+
+        # the schemes of the other sheets, whose words matching the target can be asked in the same dictation
+        self.other_schemes_label = ft.Text(self.also_include_label, visible=False)
+        self.other_schemes_checkboxes = ft.Column()
+        # their sheets are read in the background when they are chosen, the dictation cannot start meanwhile
+        self.other_sheets_loading_label = ft.Text(visible=False)
+        self.other_sheets_loading_progress_bar = ft.ProgressBar(visible=False)
+
         self.start_dictation_button = ft.ElevatedButton(self.start_dictation_label, on_click=self.send_dictation_settings)
 
         self.error_with_chosen_settings_label = ft.Text(color="red")
 
         self.controls_list = [self.sheet_processing_error_label, self.range_controls, self.target_choice,
+                              self.selection_counts_label, self.sample_size_input,
                               self.with_narrator_checkbox, self.with_shuffle_checkbox,
+                              self.ignore_case_checkbox, self.typo_hints_checkbox, self.check_as_you_type_checkbox,
+                              self.other_schemes_label, self.other_schemes_checkboxes,
+                              self.other_sheets_loading_label, self.other_sheets_loading_progress_bar,
                               self.start_dictation_button,
                               self.error_with_chosen_settings_label]
 
-        self.user_inputs = [self.range_start, self.range_end, self.target_choice]
-        self.text_messages = [self.sheet_processing_error_label, self.error_with_chosen_settings_label]
+        self.user_inputs = [self.range_start, self.range_end, self.target_choice, self.sample_size_input]
+        self.text_messages = [self.sheet_processing_error_label, self.error_with_chosen_settings_label,
+                              self.selection_counts_label]
 
         self.allowed_range: range = range(2, 2)
         self.sheet, self.scheme = None, None
+        self.due_rows: list[int] = []
+        # the sheet, scheme and most overdue rows of each chosen other scheme, by the name of the scheme
+        self.other_sheets: dict[str, tuple[SheetView, SheetScheme, list[int]]] = {}
+        self.loading_other_sheets = False
 
         super().__init__(self.controls_list)
 
@@ -357,10 +562,18 @@ class DictationRunSettingsControls(ft.Column):
         self.target_choice.value = "NEW"
         self.with_narrator_checkbox.value = True
         self.with_shuffle_checkbox.value = True
+        self.ignore_case_checkbox.value = SETTINGS.get(AnswerNormalizer.ignore_case_key, False)
+        self.typo_hints_checkbox.value = self.typo_tolerance > 0
+        self.check_as_you_type_checkbox.value = SETTINGS.get(IncrementalAnswerChecker.check_as_you_type_key, False)
+        self.other_schemes_label.visible = False
+        self.other_schemes_checkboxes.controls = []
+        self.other_sheets = {}
+        self.show_other_sheets_loading(False)
         self.start_dictation_button.disabled = False
         for i in self.text_messages:
             i.value = ""
         self.sheet, self.scheme = None, None
+        self.due_rows = []
         self.allowed_range = range(2, 2)
 
     def set_width(self, width: int):
@@ -368,82 +581,268 @@ class DictationRunSettingsControls(ft.Column):
             i.width = width
 
     def send_dictation_settings(self, e):
-        try:
-            inputs = self.process_inputs()
-            self.start_dictation(*inputs)
-        except BaseExceptionWithUIMessage as e:
-            self.error_with_chosen_settings_label.value = e.message()
-            self.page.update()
+        with self.updates.event("dictation started"):
+            try:
+                inputs = self.process_inputs()
+                self.start_dictation(*inputs)
+            except BaseExceptionWithUIMessage as e:
+                self.error_with_chosen_settings_label.value = e.message()
+                self.updates.update(self.error_with_chosen_settings_label)
+
+    def change_ignore_case(self, e):
+        SETTINGS.change_settings(AnswerNormalizer.ignore_case_key, bool(self.ignore_case_checkbox.value))
+
+    @property
+    def typo_tolerance(self) -> int:
+        return SETTINGS.get(EditDistance.typo_tolerance_key, EditDistance.default_typo_tolerance)
+
+    def change_typo_hints(self, e):
+        tolerance = EditDistance.default_typo_tolerance if self.typo_hints_checkbox.value else 0
+        SETTINGS.change_settings(EditDistance.typo_tolerance_key, tolerance)
+
+    def change_check_as_you_type(self, e):
+        SETTINGS.change_settings(IncrementalAnswerChecker.check_as_you_type_key,
+                                 bool(self.check_as_you_type_checkbox.value))
 
-    def fill_controls(self, sheet: pd.DataFrame, scheme: SheetScheme) -> None:
+    def fill_controls(self, sheet: SheetView, scheme: SheetScheme) -> None:
         sheet_valid = self.check_sheet_validity(sheet, scheme)
         self.sheet = sheet
         self.scheme = scheme
         if not sheet_valid:
             return
+        self.due_rows = REVIEW_SCHEDULER.most_overdue(
+            SETTINGS.path, scheme.sheet_name, SETTINGS.get(self.due_words_limit_key, self.default_due_words_limit),
+            SheetWords(sheet, scheme)
+        )
         self.fill_range(sheet)
+        self.fill_other_schemes(scheme)
         self.disabled = False
         self.sheet_processing_error_label.value = ""
-        self.page.update()
+        self.show_selection_counts()
+        self.updates.update(self)
 
-    def fill_range(self, sheet: pd.DataFrame):
-        self.allowed_range = range(2, sheet.shape[0] + 1)
+    def fill_range(self, sheet: SheetView):
+        self.allowed_range = range(2, sheet.rows + 1)
         self.range_start.value = self.allowed_range.start
         self.range_end.value = self.allowed_range.stop
 
-    def check_sheet_validity(self, sheet: pd.DataFrame, scheme: SheetScheme) -> bool:
+    def fill_other_schemes(self, scheme: SheetScheme) -> None:
+        self.other_schemes_checkboxes.controls = [
+            ft.Checkbox(label=name, data=name, value=False, on_change=self.other_schemes_changed)
+            for name, parameters in SETTINGS.schemes.items()
+            if SheetScheme(parameters).sheet_name != scheme.sheet_name
+        ]
+        self.other_schemes_label.visible = bool(self.other_schemes_checkboxes.controls)
+        self.other_sheets = {}
+        self.show_other_sheets_loading(False)
+
+    @property
+    def other_schemes(self) -> list[str]:
+        return [i.data for i in self.other_schemes_checkboxes.controls if i.value]
+
+    def other_schemes_changed(self, e):
+        with self.updates.event("other schemes chosen"):
+            self.load_other_sheets()
+            self.updates.update(self)
+
+    def load_other_sheets(self) -> None:
+        """Starts reading the sheets of the chosen other schemes that were not read yet.
+        Changing the choice in the meantime cancels the reading."""
+        not_loaded = [i for i in self.other_schemes if i not in self.other_sheets]
+        if not not_loaded:
+            if self.loading_other_sheets:
+                SHEET_LOADER.cancel()
+            self.show_other_sheets_loading(False)
+            self.show_selection_counts()
+            return
+        self.show_other_sheets_loading(True)
+        self.start_dictation_button.disabled = True
+        sheet_names = dict.fromkeys(SheetScheme(SETTINGS.schemes.get(i)).sheet_name for i in not_loaded)
+        SHEET_LOADER.load_many(list(sheet_names), self.other_sheets_loaded, self.other_sheets_loading_failed,
+                               self.show_other_sheets_progress)
+
+    def show_other_sheets_loading(self, loading: bool, rows: int = 0, total: Union[int, None] = None) -> None:
+        self.loading_other_sheets = loading
+        self.other_sheets_loading_label.visible = self.other_sheets_loading_progress_bar.visible = loading
+        self.other_sheets_loading_label.value = self.loading_other_sheets_template.format(rows=rows,
+                                                                                          total=total or "?")
+        self.other_sheets_loading_progress_bar.value = min(rows / total, 1) if total else None
+
+    def show_other_sheets_progress(self, request: int, rows: int, total: Union[int, None]) -> None:
+        with self.updates.event("other sheets loading"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            self.show_other_sheets_loading(True, rows, total)
+            self.updates.update(self.other_sheets_loading_label, self.other_sheets_loading_progress_bar)
+
+    def other_sheets_loaded(self, request: int, sheets: dict[str, SheetView]) -> None:
+        with self.updates.event("other sheets loaded"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            due_words_limit = SETTINGS.get(self.due_words_limit_key, self.default_due_words_limit)
+            errors = []
+            for name in self.other_schemes:
+                scheme = SheetScheme(SETTINGS.schemes.get(name))
+                sheet = sheets.get(scheme.sheet_name)
+                if name in self.other_sheets or sheet is None:
+                    continue
+                try:
+                    SheetToSchemeCompatibilityChecker(sheet, scheme).check_compatibility()
+                except BaseExceptionWithUIMessage as e:
+                    errors.append(e.message())
+                    self.uncheck_other_scheme(name)
+                    continue
+                due_rows = REVIEW_SCHEDULER.most_overdue(SETTINGS.path, scheme.sheet_name, due_words_limit,
+                                                         SheetWords(sheet, scheme))
+                self.other_sheets[name] = (sheet, scheme, due_rows)
+            self.other_sheets_ready(errors)
+
+    def other_sheets_loading_failed(self, request: int, e: Exception) -> None:
+        with self.updates.event("other sheets loaded"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            for name in self.other_schemes:
+                if name not in self.other_sheets:
+                    self.uncheck_other_scheme(name)
+            self.other_sheets_ready([e.message() if isinstance(e, BaseExceptionWithUIMessage) else str(e)])
+
+    def uncheck_other_scheme(self, name: str) -> None:
+        for i in self.other_schemes_checkboxes.controls:
+            if i.data == name:
+                i.value = False
+
+    def other_sheets_ready(self, errors: list[str]) -> None:
+        self.show_other_sheets_loading(False)
+        self.show_selection_counts()
+        if errors:
+            self.error_with_chosen_settings_label.value = "\n".join(errors)
+        self.updates.update(self)
+
+    def preview_selection(self, e):
+        if self.sheet is None or self.scheme is None:
+            return
+        self.show_selection_counts()
+        self.updates.update(self.selection_counts_label, self.error_with_chosen_settings_label,
+                            self.start_dictation_button)
+
+    def show_selection_counts(self) -> None:
+        """Shows how many words of each status the chosen range has,
+        and does not let a dictation without words be started."""
+        self.selection_counts_label.value = ""
+        self.error_with_chosen_settings_label.value = ""
+        try:
+            words_range, target, *_ = self.process_inputs()
+        except BaseExceptionWithUIMessage as e:
+            self.error_with_chosen_settings_label.value = e.message()
+            self.start_dictation_button.disabled = True
+            return
+        words_getter = WordsGetter(self.sheet, self.scheme, words_range, target, due_rows=self.due_rows)
+        self.selection_counts_label.value = self.selection_counts_template.format(**words_getter.counts())
+        if not words_getter.count():
+            self.error_with_chosen_settings_label.value = \
+                NoWordsMatchingSettings(target, words_range.start, words_range.stop).message()
+        self.start_dictation_button.disabled = not words_getter.count() or self.loading_other_sheets
+
+    def check_sheet_validity(self, sheet: SheetView, scheme: SheetScheme) -> bool:
         try:
             SheetToSchemeCompatibilityChecker(sheet, scheme).check_compatibility()
             return True
         except Exception as e:
-            self.sheet_processing_error_label.value = e.message()
-            self.disabled = True
+            self.show_sheet_error(e)
             return False
 
-    def process_inputs(self) -> tuple[range, str, bool, bool]:
-        start, stop = int(self.range_start.value), int(self.range_end.value)
+    def show_sheet_error(self, e: Exception) -> None:
+        self.sheet_processing_error_label.value = e.message() if isinstance(e, BaseExceptionWithUIMessage) else str(e)
+        self.disabled = True
+
+    def process_inputs(self) -> tuple[range, str, bool, bool, Union[int, None]]:
+        try:
+            start, stop = int(self.range_start.value), int(self.range_end.value)
+        except (TypeError, ValueError):
+            raise InvalidRangeOfWordsError(self.allowed_range.start, self.allowed_range.stop)
         input_range = range(start, stop)
         if start > stop or start < self.allowed_range.start or stop > self.allowed_range.stop:
             raise InvalidRangeOfWordsError(self.allowed_range.start, self.allowed_range.stop)
+        # an empty sample size means all the words
+        sample_size = str(self.sample_size_input.value or "").strip() or None
+        if sample_size is not None:
+            if not sample_size.isdecimal() or int(sample_size) < 1:
+                raise InvalidSampleSizeError(sample_size)
+            sample_size = int(sample_size)
         return input_range, self.target_choice.value, \
-               self.with_narrator_checkbox.value, self.with_shuffle_checkbox.value
+               self.with_narrator_checkbox.value, self.with_shuffle_checkbox.value, sample_size
 
     def start_dictation(
             self,
             words_range: range,
             target: str,
             with_narration: bool = True,
-            with_shuffle: bool = True
+            with_shuffle: bool = True,
+            sample_size: Union[int, None] = None
     ) -> Union[None, DictationContent]:
         if not self.scheme:
             ...
         try:
-            words = WordsGetter(self.sheet, self.scheme, words_range, target, with_shuffle).get_words()
+            other_schemes = self.other_schemes
+            if not other_schemes:
+                words = WordsGetter(self.sheet, self.scheme, words_range, target, with_shuffle,
+                                    due_rows=self.due_rows, sample_size=sample_size).get_words()
+            else:
+                words = self.combine_words(other_schemes, words_range, target, with_shuffle, sample_size)
             self.error_with_chosen_settings_label.value = ""
             return self.start_dictation_function((with_narration, words))
         except BaseExceptionWithUIMessage as e:
             self.error_with_chosen_settings_label.value = e.message()
-            self.page.update()
+            self.updates.update(self.error_with_chosen_settings_label)
+
+    def combine_words(
+            self,
+            other_schemes: list[str],
+            words_range: range,
+            target: str,
+            with_shuffle: bool,
+            sample_size: Union[int, None]
+    ) -> CombinedDictationContent:
+        """The words of the chosen range, and of the whole sheets of the other schemes.
+        The sheets were read and checked when the schemes were chosen, see `load_other_sheets`."""
+        getters = [(SETTINGS.path, WordsGetter(self.sheet, self.scheme, words_range, target, False,
+                                               due_rows=self.due_rows))]
+        for name in other_schemes:
+            sheet, scheme, due_rows = self.other_sheets[name]
+            getters.append((SETTINGS.path, WordsGetter(sheet, scheme, range(2, sheet.rows + 1), target, False,
+                                                       due_rows=due_rows)))
+        # the sample is taken from the words of all the sheets together
+        return CombinedDictationContent.from_getters(getters, with_shuffle, sample_size=sample_size)
 
 
 class DictationSettingsControls(ft.Column):
     no_vocabulary_path_set_message = "no-vocabulary-path-set-message"
     statuses_updated_message = "statuses-updated-message"
     dictation_settings_label = "dictation-settings-label"
+    loading_sheet_template = "loading-sheet-template"
 
-    def __init__(self, page: ft.Page, send_words_function: Callable):
+    def __init__(
+            self,
+            page: ft.Page,
+            send_words_function: Callable,
+            updates: Union[UpdateCoalescer, None] = None
+    ):
         SETTINGS.translate_widget(self.__class__)
         width = page.window_width // 3 - 20
         self.send_words_function = send_words_function
+        self.updates = UpdateCoalescer(page) if updates is None else updates
         self.no_vocabulary_path_set_label = ft.Text(color="red")
         self.section_label = ft.Text(self.dictation_settings_label, style=ft.TextThemeStyle.TITLE_LARGE)
 
-        self.scheme_choice_controls = SchemeChoiceControls(self.fill_run_settings)
+        self.scheme_choice_controls = SchemeChoiceControls(self.fill_run_settings, self.updates)
         if not SETTINGS.vocabulary_path_valid:
             self.scheme_choice_controls.disabled = True
             self.no_vocabulary_path_set_label.value = self.no_vocabulary_path_set_message
 
-        self.dictation_run_settings_controls = DictationRunSettingsControls(page, self.start_dictation)
+        self.loading_label = ft.Text(width=width, visible=False)
+        self.loading_progress_bar = ft.ProgressBar(width=width, visible=False)
+
+        self.dictation_run_settings_controls = DictationRunSettingsControls(page, self.start_dictation, self.updates)
         self.dictation_run_settings_controls.disabled = True
         self.dictation_run_settings_controls.set_width(width)
 
@@ -454,6 +853,7 @@ class DictationSettingsControls(ft.Column):
         )
 
         self.controls_list = [self.section_label, self.no_vocabulary_path_set_label, self.scheme_choice_controls,
+                              self.loading_label, self.loading_progress_bar,
                               self.dictation_run_settings_controls, self.statues_updated_label]
 
         self.sheet, self.scheme = None, None
@@ -468,6 +868,8 @@ class DictationSettingsControls(ft.Column):
         self.statues_updated_label.visible = True
 
     def reload(self):
+        SHEET_LOADER.cancel()
+        self.show_loading(False)
         self.scheme_choice_controls.reload()
         self.dictation_run_settings_controls.reload()
 
@@ -484,11 +886,50 @@ class DictationSettingsControls(ft.Column):
         self.sheet, self.scheme = None, None
 
     def fill_run_settings(self, scheme_name: str):
-        self.scheme = SheetScheme(SETTINGS.schemes.get(scheme_name))
-        sheet_name = self.scheme.sheet_name
-        self.sheet = ExcelParser.get_sheet(sheet_name)
-        self.dictation_run_settings_controls.fill_controls(self.sheet, self.scheme)
-        self.update()
+        """Starts reading the sheet of the scheme in the background, the run settings are filled
+        once it is read. Choosing another scheme in the meantime cancels the reading."""
+        with self.updates.event("scheme chosen"):
+            self.scheme = SheetScheme(SETTINGS.schemes.get(scheme_name))
+            self.sheet = None
+            self.dictation_run_settings_controls.disabled = True
+            self.show_loading(True)
+            SHEET_LOADER.load(self.scheme.sheet_name, self.sheet_loaded, self.sheet_loading_failed,
+                              self.show_loading_progress)
+            self.updates.update(self)
+
+    def choose_scheme(self, scheme_name: str) -> None:
+        self.scheme_choice_controls.schemes_dropdown.value = scheme_name
+        self.fill_run_settings(scheme_name)
+
+    def show_loading(self, loading: bool, rows: int = 0, total: Union[int, None] = None) -> None:
+        self.loading_label.visible = self.loading_progress_bar.visible = loading
+        self.loading_label.value = self.loading_sheet_template.format(rows=rows, total=total or "?")
+        # without the amount of rows the progress bar just shows that the sheet is being read
+        self.loading_progress_bar.value = min(rows / total, 1) if total else None
+
+    def show_loading_progress(self, request: int, rows: int, total: Union[int, None]) -> None:
+        with self.updates.event("sheet loading"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            self.show_loading(True, rows, total)
+            self.updates.update(self.loading_label, self.loading_progress_bar)
+
+    def sheet_loaded(self, request: int, sheet: SheetView) -> None:
+        with self.updates.event("sheet loaded"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            self.sheet = sheet
+            self.show_loading(False)
+            self.dictation_run_settings_controls.fill_controls(self.sheet, self.scheme)
+            self.updates.update(self)
+
+    def sheet_loading_failed(self, request: int, e: Exception) -> None:
+        with self.updates.event("sheet loaded"):
+            if not SHEET_LOADER.is_latest(request):
+                return
+            self.show_loading(False)
+            self.dictation_run_settings_controls.show_sheet_error(e)
+            self.updates.update(self)
 
     def start_dictation(self, dictation_settings: tuple[bool, DictationContent]):
         self.send_words_function(dictation_settings)
@@ -502,10 +943,11 @@ class DictationControls(ft.Row):
 
     def __init__(self, page: ft.Page):
         self.page = page
+        self.updates = UpdateCoalescer(page)
 
         self.controls_list = [
-            DictationSettingsControls(page, self.start_dictation),
-            DictationRunControls(self.page, self.dictation_ended, self.page.window_width // 1.5 - 30)
+            DictationSettingsControls(page, self.start_dictation, self.updates),
+            DictationRunControls(self.page, self.dictation_ended, self.page.window_width // 1.5 - 30, self.updates)
         ]
 
         self.dictation_settings = self.controls_list[0]
@@ -524,12 +966,25 @@ class DictationControls(ft.Row):
         self.dictation.visible = True
         self.dictation.disabled = False
         self.dictation.run_dictation(dictation_settings)
-        self.update()
+        self.updates.update(self)
+
+    def finish_dictation(self) -> bool:
+        """Stops the running dictation, writing its statuses. Returns whether no dictation runs any more."""
+        run = self.dictation
+        if not isinstance(run.dictation, Dictation) or not run.dictation.is_running:
+            return True
+        with self.updates.event("dictation finished"):
+            run.stop_dictation(run.dictation_stopped_message)
+        return not run.dictation.is_running if isinstance(run.dictation, Dictation) else True
+
+    def choose_scheme(self, scheme_name: str) -> None:
+        """Chooses the scheme as if it was chosen in the dropdown, the dictation window has to be shown."""
+        self.dictation_settings.choose_scheme(scheme_name)
 
     def dictation_ended(self):
         self.reload()
         self.dictation_settings.show_statues_updated_message()
-        self.update()
+        self.updates.update(self)
 
     def reload(self, external: bool = False):
         if external:
@@ -1,7 +1,8 @@
+import os
+
 from typing import Literal, Iterable
-import pythoncom
 
-import win32com.client as win32
+from tracing import TRACER
 
 
 class StringConstants:
@@ -29,6 +30,7 @@ class ExcelModifier:
         ("NORMAL", "NORMAL"): lambda ra: ST.nmo,
     }
 
+    @TRACER.traced
     def __init__(self, worksheet_name: str, status_column_index: int, path_to_vocabulary: str) -> None:
         self.worksheet_name = worksheet_name
         self.status_column_index = status_column_index + 1
@@ -37,8 +39,18 @@ class ExcelModifier:
         self.workbook = self.excel.Workbooks.Open(path_to_vocabulary)
         self.worksheet = self.workbook.Worksheets(self.worksheet_name)
 
+    def select_sheet(self, worksheet_name: str, status_column_index: int) -> None:
+        """Makes the next modifications in another sheet of the same workbook."""
+        self.worksheet_name = worksheet_name
+        self.status_column_index = status_column_index + 1
+        self.worksheet = self.workbook.Worksheets(self.worksheet_name)
+
     @staticmethod
     def open_excel():
+        # pywin32 is only needed when statuses are written back, so it is not imported at startup
+        import pythoncom
+        import win32com.client as win32
+
         pythoncom.CoInitialize()
         try:
             app = win32.gencache.EnsureDispatch("Excel.Application")
@@ -57,6 +69,7 @@ class ExcelModifier:
             app = client.gencache.EnsureDispatch("Excel.Application")
         return app
 
+    @TRACER.traced
     def modify(
             self,
             status_to_give: Literal["NEEDS_REVISION", "NORMAL"],
@@ -66,10 +79,94 @@ class ExcelModifier:
             self.worksheet.Cells(i+2, self.status_column_index).Value = self.check_current_status(status_to_give, i)
 
     def check_current_status(self, status_to_give, row_index) -> str:
-        status = self.worksheet.Cells(row_index+2, self.status_column_index).Value.split("*")
-        new_status = self.status_changes.get((status[0], status_to_give))(int(status[1]))
-        return new_status
+        return self.next_status(self.worksheet.Cells(row_index+2, self.status_column_index).Value, status_to_give)
+
+    @classmethod
+    def next_status(cls, current_status: str, status_to_give: str) -> str:
+        status = current_status.split("*")
+        status_change = cls.status_changes.get((status[0], status_to_give))
+        # statuses without a transition (e.g. DELAYED) are kept as they are
+        return current_status if status_change is None else status_change(int(status[1]))
 
+    @staticmethod
+    def locked_workbook_errors() -> tuple[type[Exception], ...]:
+        """Errors raised when the workbook can not be written because it is opened in Excel."""
+        from pywintypes import com_error
+        return com_error,
+
+    @TRACER.traced
     def commit(self) -> None:
         self.workbook.Save()
         self.excel.Application.Quit()
+
+
+class OpenpyxlExcelModifier(ExcelModifier):
+    """Writes the statuses with openpyxl instead of the Excel application. Used by the benchmarks
+    and the headless driver, which also run where Excel can not be automated through COM;
+    the app itself writes through Excel."""
+
+    @TRACER.traced
+    def __init__(self, worksheet_name: str, status_column_index: int, path_to_vocabulary: str) -> None:
+        import openpyxl
+
+        self.worksheet_name = worksheet_name
+        self.status_column_index = status_column_index + 1
+        self.path_to_vocabulary = path_to_vocabulary
+        self.workbook = openpyxl.load_workbook(path_to_vocabulary)
+        self.worksheet = self.workbook[self.worksheet_name]
+
+    def select_sheet(self, worksheet_name: str, status_column_index: int) -> None:
+        self.worksheet_name = worksheet_name
+        self.status_column_index = status_column_index + 1
+        self.worksheet = self.workbook[self.worksheet_name]
+
+    @TRACER.traced
+    def modify(
+            self,
+            status_to_give: Literal["NEEDS_REVISION", "NORMAL"],
+            row_indexes: Iterable[int]
+    ) -> None:
+        for i in row_indexes:
+            self.worksheet.cell(i+2, self.status_column_index).value = self.check_current_status(status_to_give, i)
+
+    def check_current_status(self, status_to_give, row_index) -> str:
+        return self.next_status(self.worksheet.cell(row_index+2, self.status_column_index).value, status_to_give)
+
+    @staticmethod
+    def locked_workbook_errors() -> tuple[type[Exception], ...]:
+        return PermissionError,
+
+    @TRACER.traced
+    def commit(self) -> None:
+        # the workbook is saved next to the original and then put in its place, so it is never left half-written
+        temporary_path = self.path_to_vocabulary + ".tmp"
+        self.workbook.save(temporary_path)
+        os.replace(temporary_path, self.path_to_vocabulary)
+
+
+class DryRunExcelModifier(ExcelModifier):
+    """Does not open the workbook, only counts the statuses that would be given.
+    Used to run dictations without changing the vocabulary file."""
+
+    def __init__(self, worksheet_name: str, status_column_index: int, path_to_vocabulary: str) -> None:
+        self.worksheet_name = worksheet_name
+        self.status_column_index = status_column_index + 1
+        self.given_statuses: dict[str, int] = {}
+
+    def select_sheet(self, worksheet_name: str, status_column_index: int) -> None:
+        self.worksheet_name = worksheet_name
+        self.status_column_index = status_column_index + 1
+
+    def modify(
+            self,
+            status_to_give: Literal["NEEDS_REVISION", "NORMAL"],
+            row_indexes: Iterable[int]
+    ) -> None:
+        self.given_statuses[status_to_give] = self.given_statuses.get(status_to_give, 0) + len(list(row_indexes))
+
+    @staticmethod
+    def locked_workbook_errors() -> tuple[type[Exception], ...]:
+        return ()
+
+    def commit(self) -> None:
+        ...
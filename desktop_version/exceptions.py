@@ -87,6 +87,15 @@ class InvalidRangeOfWordsError(BaseExceptionWithUIMessage):
         return self.formatted_message
 
 
+class InvalidSampleSizeError(BaseExceptionWithUIMessage):
+    def __init__(self, sample_size: str):
+        super().__init__()
+        self.formatted_message = self.error_message.format(sample_size=sample_size)
+
+    def message(self) -> str:
+        return self.formatted_message
+
+
 class NoWordsMatchingSettings(BaseExceptionWithUIMessage):
     def __init__(self, status: str, range_start: int, range_stop: int) -> None:
         super().__init__()
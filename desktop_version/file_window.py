@@ -1,9 +1,15 @@
 import os
 import _thread
 
+from typing import Callable, Union
+
 import flet as ft
 
 from user_settings import SETTINGS
+from core import SheetScheme
+from library_index import LIBRARY_INDEX, LibraryIndex, IndexedWorkbook, IndexedSheet
+from scheme_validation import SchemeValidator, SchemeState
+from ui_updates import UpdateCoalescer
 
 
 class PathToVocabularyControls(ft.Column):
@@ -86,13 +92,185 @@ class PathToVocabularyControls(ft.Column):
         return self.check_path_to_vocabulary(self.path_to_vocabulary)
 
 
+class LibraryControls(ft.Column):
+    """The workbooks of the library directory, as they are in the library index. The index is
+    refreshed in the background every time the window is opened, only the modified workbooks are read.
+    A workbook can be used from here, and a dictation set up with any scheme that fits one of its sheets."""
+
+    library_label = "library-label"
+    library_directory_input_label = "library-directory-input-label"
+    set_library_directory_label = "set-library-directory-label"
+    invalid_directory_message = "invalid-directory"
+    no_library_message = "no-library"
+    indexing_template = "indexing-template"
+    sheet_template = "sheet-template"
+    schemes_template = "schemes-template"
+    unreadable_template = "unreadable-template"
+    use_workbook_label = "use-workbook-label"
+    workbook_in_use_label = "workbook-in-use-label"
+    practice_template = "practice-template"
+    workbook_not_changed_message = "workbook-not-changed-message"
+
+    def __init__(
+            self,
+            width: int,
+            updates: UpdateCoalescer,
+            workbook_chosen_function: Union[Callable, None] = None,
+            session_function: Union[Callable[[str, Union[str, None]], bool], None] = None
+    ):
+        SETTINGS.translate_widget(self.__class__)
+        self.updates = updates
+        self.workbook_chosen_function = workbook_chosen_function
+        # sets up the session with the workbook and the scheme, see `MainPage.session_chosen`
+        self.session_function = session_function
+
+        self.section_label = ft.Text(self.library_label, style=ft.TextThemeStyle.TITLE_LARGE)
+        self.library_directory_input = ft.TextField(label=self.library_directory_input_label)
+        self.set_library_directory_button = ft.ElevatedButton(self.set_library_directory_label,
+                                                              on_click=self.set_library_directory, width=width // 2)
+        self.library_message = ft.Text(color="red")
+        self.indexing_label = ft.Text(visible=False)
+        self.indexing_progress_bar = ft.ProgressBar(visible=False)
+        self.workbooks_list = ft.Column()
+
+        self.controls_list = [
+            self.section_label,
+            self.library_directory_input,
+            self.set_library_directory_button,
+            self.library_message,
+            self.indexing_label,
+            self.indexing_progress_bar,
+            self.workbooks_list,
+        ]
+        super().__init__(self.controls_list,
+                         alignment=ft.MainAxisAlignment.CENTER,
+                         horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                         width=width
+                         )
+
+    @property
+    def library_directory(self) -> str:
+        return SETTINGS.get(LibraryIndex.directory_key, "")
+
+    def reload(self):
+        self.library_directory_input.value = self.library_directory
+        self.library_message.value = ""
+        self.show_workbooks()
+        self.refresh()
+
+    def set_library_directory(self, e) -> None:
+        directory = self.library_directory_input.value
+        if not os.path.isdir(directory):
+            self.library_message.value = self.invalid_directory_message.format(directory)
+        else:
+            SETTINGS.change_settings(LibraryIndex.directory_key, directory)
+            self.library_message.value = ""
+            self.show_workbooks()
+            self.refresh()
+        self.updates.update(self)
+
+    def refresh(self) -> None:
+        if not os.path.isdir(self.library_directory):
+            return
+        self.show_indexing(True)
+        LIBRARY_INDEX.refresh_in_background(self.library_directory, self.library_refreshed, self.show_progress)
+
+    def show_indexing(self, indexing: bool, done: int = 0, total: int = 0) -> None:
+        self.indexing_label.visible = self.indexing_progress_bar.visible = indexing
+        self.indexing_label.value = self.indexing_template.format(done=done, total=total)
+        self.indexing_progress_bar.value = done / total if total else None
+
+    def show_progress(self, done: int, total: int) -> None:
+        with self.updates.event("library indexing"):
+            self.show_indexing(True, done, total)
+            self.updates.update(self.indexing_label, self.indexing_progress_bar)
+
+    def library_refreshed(self, changed: list[str]) -> None:
+        with self.updates.event("library indexed"):
+            self.show_indexing(False)
+            # the list is shown again even when nothing was read, the workbooks that are gone are left out of it
+            self.show_workbooks()
+            self.updates.update(self)
+
+    def show_workbooks(self) -> None:
+        directory = self.library_directory
+        if not directory:
+            self.workbooks_list.controls = [ft.Text(self.no_library_message)]
+            return
+        self.workbooks_list.controls = [self.workbook_tile(i) for i in LIBRARY_INDEX.workbooks(directory)]
+
+    def workbook_tile(self, workbook: IndexedWorkbook) -> ft.ExpansionTile:
+        in_use = LibraryIndex.workbook_key(workbook.path) == LibraryIndex.workbook_key(SETTINGS.path) \
+            if SETTINGS.path else False
+        use_button = ft.TextButton(self.workbook_in_use_label if in_use else self.use_workbook_label,
+                                   data=workbook.path, disabled=in_use, on_click=self.use_workbook)
+        lines = []
+        for sheet in workbook.sheets:
+            lines.append(ft.Text(self.sheet_text(sheet)))
+            practice_buttons = [ft.TextButton(self.practice_template.format(scheme=name), data=(workbook.path, name),
+                                              on_click=self.practice) for name in self.valid_schemes(sheet)]
+            if practice_buttons:
+                lines.append(ft.Row(practice_buttons, wrap=True))
+        if workbook.error:
+            lines.append(ft.Text(self.unreadable_template.format(error=workbook.error), color="red"))
+        return ft.ExpansionTile(
+            title=ft.Text(workbook.name),
+            subtitle=ft.Text(os.path.dirname(os.path.relpath(workbook.path, self.library_directory))),
+            trailing=use_button,
+            controls=lines,
+        )
+
+    @staticmethod
+    def sheet_schemes(sheet: IndexedSheet) -> dict[str, SheetScheme]:
+        return {name: SheetScheme(parameters) for name, parameters in SETTINGS.schemes.items()
+                if parameters.get(SheetScheme.sheet_name_key) == sheet.name}
+
+    def valid_schemes(self, sheet: IndexedSheet) -> list[str]:
+        return [name for name, scheme in self.sheet_schemes(sheet).items()
+                if SchemeValidator.check(sheet, scheme)[0] == SchemeState.VALID]
+
+    def sheet_text(self, sheet: IndexedSheet) -> str:
+        """The counts of the statuses of the sheet, in the status column of its schemes (or in its first
+        status column), and the schemes that can be used with it."""
+        schemes = self.sheet_schemes(sheet)
+        valid_schemes = self.valid_schemes(sheet)
+        status_column = next(iter(schemes.values())).status if schemes else next(iter(sheet.statuses), -1)
+        counts = sheet.status_counts(status_column)
+        text = self.sheet_template.format(sheet=sheet.name, rows=sheet.rows, **counts)
+        if valid_schemes:
+            text += "\n" + self.schemes_template.format(schemes=", ".join(valid_schemes))
+        return text
+
+    def use_workbook(self, e: ft.ControlEvent) -> None:
+        self.choose_workbook(e.control.data)
+
+    def practice(self, e: ft.ControlEvent) -> None:
+        self.choose_workbook(*e.control.data)
+
+    def choose_workbook(self, path: str, scheme_name: Union[str, None] = None) -> None:
+        """Makes the workbook the vocabulary file, and with a scheme, sets up a dictation of it."""
+        if self.session_function is None:
+            SETTINGS.change_settings(PathToVocabularyControls.vocabulary_key, path)
+        elif not self.session_function(path, scheme_name):
+            self.library_message.value = self.workbook_not_changed_message
+            self.updates.update(self.library_message)
+            return
+        self.library_message.value = ""
+        self.show_workbooks()
+        if self.workbook_chosen_function:
+            self.workbook_chosen_function()
+        self.updates.update(self)
+
+
 class AppLanguageControls(ft.Column):
     path_to_languages = "languages/"
     set_language_label = "set-language-label"
     restart_information = "restart-information"
+    dictation_not_saved_message = "dictation-not-saved-message"
 
-    def __init__(self):
+    def __init__(self, language_changed_function: Union[Callable[[str], bool], None] = None):
         SETTINGS.translate_widget(self.__class__)
+        self.language_changed_function = language_changed_function
         self.language_choice = ft.Dropdown(options=self.get_available_languages())
         self.language_choice.value = SETTINGS.app_language
         self.set_language = ft.ElevatedButton(self.set_language_label, on_click=self.apply_change)
@@ -112,15 +290,27 @@ class AppLanguageControls(ft.Column):
 
     def apply_change(self, e: ft.ControlEvent):
         new_language = self.language_choice.value
-        SETTINGS.change_settings(SETTINGS.app_language_key, new_language)
+        if not new_language or new_language == SETTINGS.app_language:
+            return
+        if self.language_changed_function is None:
+            SETTINGS.change_language(new_language)
+            return
+        # the app is rebuilt in the new language, which it refuses while a dictation cannot be ended
+        if not self.language_changed_function(new_language):
+            self.information_label.value = self.dictation_not_saved_message
+            self.update()
 
 
 class FileWindow(ft.Column):
-    def __init__(self, width: int):
+    def __init__(self, width: int, updates: UpdateCoalescer,
+                 language_changed_function: Union[Callable[[str], bool], None] = None,
+                 session_function: Union[Callable[[str, Union[str, None]], bool], None] = None):
         self.path_controls = PathToVocabularyControls(width)
-        self.language_controls = AppLanguageControls()
+        self.library_controls = LibraryControls(width // 2, updates, self.path_controls.reload, session_function)
+        self.language_controls = AppLanguageControls(language_changed_function)
         self.controls_list = [
             self.path_controls,
+            self.library_controls,
             self.language_controls
         ]
         super().__init__(
@@ -131,5 +321,6 @@ class FileWindow(ft.Column):
 
     def reload(self, external: bool = False):
         self.path_controls.reload()
+        self.library_controls.reload()
         self.visible = True
         self.update()
@@ -1,43 +1,64 @@
-import os
-
 from typing import Callable
 
 import flet as ft
 
 from user_settings import SETTINGS
+from tutorial_assets import TutorialAssetIndex, TutorialImage, ScaledImageCache
+
+
+class LazyTutorialImage(ft.Container):
+    """Takes the place of the image with its final size and only loads it when asked to.
+    An image that has to be scaled first shows a progress ring until it is scaled in the background."""
+
+    def __init__(self, image: TutorialImage, width: int) -> None:
+        self.image = image
+        self.display_width, self.display_height = image.scaled_size(width)
+        self.loaded = False
+        self.mounted = False
+        super().__init__(width=self.display_width, height=self.display_height, alignment=ft.alignment.center)
+
+    def did_mount(self) -> None:
+        self.mounted = True
+
+    def will_unmount(self) -> None:
+        self.mounted = False
+
+    def load(self) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+        path = ScaledImageCache.ready(self.image, self.display_width)
+        if path is not None:
+            self.show(path)
+            return
+        self.content = ft.ProgressRing()
+        ScaledImageCache.get_in_background(self.image, self.display_width, self.scaled)
+
+    def show(self, path: str) -> None:
+        self.content = ft.Image(path, width=self.display_width, height=self.display_height)
+
+    def scaled(self, path: str) -> None:
+        # called by the scaling thread; an image that is not on the page yet is sent with the window
+        self.show(path)
+        if self.mounted:
+            self.update()
 
 
 class TutorialWindow(ft.Column):
-    path_to_tutorials = {
-        "quick_start": "tutorials/quick_start/",
-        "statuses": "tutorials/statuses/",
-        "synonyms_and_variations": "tutorials/synonyms_and_variations/"
-    }
-    text_file_names = {
-        "quick_start": "text.txt",
-        "statuses": "text.txt",
-        "synonyms_and_variations": "text.txt"
-    }
-    blocks_separator = "AAA"
     allowed_languages = ["english", "russian"]
+    # rough size of a line of tutorial text, used to guess where the images are before they are drawn
+    text_line_height = 30
+    text_character_width = 10
+    scroll_interval = 100
 
     def __init__(self, page: ft.Page, tutorial_name: str) -> None:
         self.tutorial_name = tutorial_name
         self.language = "english" if SETTINGS.app_language not in self.allowed_languages else SETTINGS.app_language
-        self.path_to_tutorial = self.path_to_tutorials.get(tutorial_name)+self.language+"/"
-        self.text_file_name = self.text_file_names.get(tutorial_name)
+        assets = TutorialAssetIndex.get(tutorial_name, self.language)
 
-        with open(self.path_to_tutorial + self.text_file_name, mode="r", encoding="utf-8") as file:
-            self.text_blocks = [ft.Text(i, size=20, overflow=ft.TextOverflow.CLIP, selectable=True) for i in
-                                file.read().split(self.blocks_separator)]
-
-        self.image_blocks = []
-        for i in os.listdir(self.path_to_tutorial):
-            if i.rsplit(".")[-1] == "png":
-                self.image_blocks.append(ft.Image(
-                    self.path_to_tutorial + i,
-                    width=page.width // 3 * 2,
-                ))
+        self.text_blocks = [ft.Text(i, size=20, overflow=ft.TextOverflow.CLIP, selectable=True) for i in
+                            assets.text_blocks]
+        self.image_blocks = [LazyTutorialImage(i, page.width // 3 * 2) for i in assets.images]
 
         self.blocks = []
         for text, image in zip(self.text_blocks, self.image_blocks):
@@ -49,10 +70,44 @@ class TutorialWindow(ft.Column):
         super().__init__(
             scroll=ft.ScrollMode.ALWAYS,
             controls=self.blocks,
-            height=page.height - 100
+            height=page.height - 100,
+            on_scroll=self.load_visible_images,
+            on_scroll_interval=self.scroll_interval,
         )
         self.width = page.width // 3 * 2 - 40
 
+        self.image_offsets = self.estimate_image_offsets()
+        self.load_images_above(self.height * 2)
+
+    def estimate_image_offsets(self) -> list[int]:
+        """Guesses where each image starts from the length of the text above it. The guess is only
+        approximate: the real height of the text depends on the font and the wrapping of the words,
+        so the images are loaded a screen ahead of the scroll position to make up for it."""
+        offsets, offset = [], 0
+        for block in self.blocks:
+            if isinstance(block, LazyTutorialImage):
+                offsets.append(offset)
+                offset += block.display_height
+            else:
+                characters_per_line = max(1, self.width // self.text_character_width)
+                lines = sum(len(i) // characters_per_line + 1 for i in block.value.split("\n"))
+                offset += lines * self.text_line_height
+        return offsets
+
+    def load_images_above(self, offset: float) -> bool:
+        """Loads every image that starts above the given offset, returns whether any was loaded."""
+        loaded = False
+        for image, image_offset in zip(self.image_blocks, self.image_offsets):
+            if image_offset < offset and not image.loaded:
+                image.load()
+                loaded = True
+        return loaded
+
+    def load_visible_images(self, e: ft.OnScrollEvent) -> None:
+        # the images in the next screen are loaded in advance, so they are ready when scrolled to
+        if self.load_images_above(e.pixels + e.viewport_dimension * 2):
+            self.update()
+
 
 class NavigationSideBarDestination(ft.TextButton):
     def __init__(self, text: str, navigation_function: Callable, width: int) -> None:
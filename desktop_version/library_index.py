@@ -0,0 +1,265 @@
+"""The index of a library: a directory of vocabulary workbooks.
+
+For every workbook of the directory (and of its subdirectories) the index keeps its sheets, their
+sizes, and the amount of rows of every status in each of their status columns. The index is kept in
+an SQLite database and refreshed incrementally: only the workbooks that were added or modified since
+the last refresh (by their modification time and size) are read, a few of them at once, by the bulk
+loader. The workbooks can then be browsed and the schemes checked without opening any of them.
+"""
+import os
+import sqlite3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Union
+
+from sheet_view import SheetView, StatusColumn
+from bulk_loading import BULK_LOADER, BulkLoader, SheetReader
+
+
+class IndexedSheet:
+    """What the index knows of a sheet: the same `rows` and `columns` as its SheetView,
+    and the counts of the statuses by column."""
+
+    # a column is taken for a status column when one of its first cells holds a status
+    sampled_cells = 100
+
+    def __init__(self, name: str, rows: int, columns: int, statuses: dict[int, dict[str, int]]) -> None:
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        # column index -> status -> amount of rows, "invalid" for the rows without a valid status
+        self.statuses = statuses
+
+    @classmethod
+    def from_sheet(cls, name: str, sheet: SheetView) -> "IndexedSheet":
+        statuses = {}
+        for column in range(sheet.columns):
+            values = sheet.cells[:, column][~sheet.null_mask[:, column]][:cls.sampled_cells]
+            if all(StatusColumn.parse(i)[0] == StatusColumn.invalid for i in values):
+                continue
+            status_column = sheet.status_column(column)
+            counts = status_column.counts(0, sheet.rows)
+            del counts["all"]
+            counts["invalid"] = len(status_column.invalid_rows)
+            statuses[column] = counts
+        return cls(name, sheet.rows, sheet.columns, statuses)
+
+    def status_counts(self, column: int) -> dict[str, int]:
+        """The counts of the statuses in the column, all its rows are invalid if it is not a status column."""
+        counts = self.statuses.get(column)
+        if counts is None:
+            return {**{i: 0 for i in StatusColumn.statuses}, "invalid": self.rows}
+        return counts
+
+
+class IndexedWorkbook:
+    def __init__(self, path: str, sheets: list[IndexedSheet], error: str = "") -> None:
+        self.path = path
+        self.sheets = sheets
+        # why the workbook (or some of its sheets) could not be read
+        self.error = error
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def sheet(self, sheet_name: str) -> Union[IndexedSheet, None]:
+        return next((i for i in self.sheets if i.name == sheet_name), None)
+
+
+class LibraryIndex:
+    directory_key = "LIBRARY_DIRECTORY"
+    default_filename = "cache/library.db"
+    extension = ".xlsx"
+    # the files Excel makes while a workbook is open
+    lock_file_prefix = "~$"
+
+    status_columns = {"NEW": "new", "NORMAL": "normal", "NEEDS_REVISION": "needs_revision",
+                      "DELAYED": "delayed", "invalid": "invalid"}
+
+    def __init__(self, filename: str = default_filename, loader: BulkLoader = BULK_LOADER) -> None:
+        self.filename = filename
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._request = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS workbooks (workbook TEXT PRIMARY KEY, "
+                                     "path TEXT NOT NULL, directory TEXT NOT NULL, mtime INTEGER NOT NULL, "
+                                     "size INTEGER NOT NULL, error TEXT NOT NULL)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS sheets (workbook TEXT NOT NULL, "
+                                     "sheet TEXT NOT NULL, position INTEGER NOT NULL, rows INTEGER NOT NULL, "
+                                     "columns INTEGER NOT NULL, PRIMARY KEY (workbook, sheet))")
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS statuses (workbook TEXT NOT NULL, "
+                                     f"sheet TEXT NOT NULL, column INTEGER NOT NULL, "
+                                     f"{', '.join(i + ' INTEGER NOT NULL' for i in self.status_columns.values())}, "
+                                     f"PRIMARY KEY (workbook, sheet, column))")
+        return self._connection
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="library-index")
+        return self._executor
+
+    @staticmethod
+    def workbook_key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def file_state(path: str) -> tuple[int, int]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 0, 0
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def find_workbooks(cls, directory: str) -> list[str]:
+        paths = []
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, i) for i in sorted(files)
+                         if i.lower().endswith(cls.extension) and not i.startswith(cls.lock_file_prefix))
+        return paths
+
+    def refresh(self, directory: str, on_progress: Union[Callable[[int, int], None], None] = None) -> list[str]:
+        """Indexes the workbooks of the directory that changed since the last refresh and forgets
+        the ones that are not there any more. Returns the paths of the workbooks that were read.
+
+        `on_progress` is called with the amount of read workbooks and of the workbooks to read."""
+        directory_key = self.workbook_key(directory)
+        found = {self.workbook_key(i): i for i in self.find_workbooks(directory)}
+        with self._lock:
+            known = {key: (mtime, size) for key, mtime, size in self.connection.execute(
+                "SELECT workbook, mtime, size FROM workbooks WHERE directory = ?", (directory_key,))}
+            self._forget(known.keys() - found.keys())
+        changed = [path for key, path in found.items() if known.get(key) != self.file_state(path)]
+
+        # a few workbooks at a time, so the sheets are read in parallel without keeping all of them
+        batch_size = self.loader.max_workers
+        for start in range(0, len(changed), batch_size):
+            self._index(directory_key, changed[start:start + batch_size])
+            if on_progress is not None:
+                on_progress(min(start + batch_size, len(changed)), len(changed))
+        return changed
+
+    def refresh_in_background(
+            self,
+            directory: str,
+            on_refreshed: Callable[[list[str]], None],
+            on_progress: Union[Callable[[int, int], None], None] = None
+    ) -> None:
+        """Refreshes the index on another thread. The callbacks are only called as long as no
+        newer refresh was started."""
+        with self._lock:
+            self._request += 1
+            request = self._request
+
+        def refresh() -> None:
+            def progress(done: int, total: int) -> None:
+                if on_progress is not None and request == self._request:
+                    on_progress(done, total)
+
+            changed = self.refresh(directory, progress)
+            if request == self._request:
+                on_refreshed(changed)
+
+        self.executor.submit(refresh)
+
+    def _index(self, directory_key: str, paths: list[str]) -> None:
+        # taken before reading, so a modification made in the meantime is read next time
+        states = {path: self.file_state(path) for path in paths}
+        sheets: dict[str, dict[str, Union[IndexedSheet, Exception]]] = {}
+        errors: dict[str, str] = {}
+        requests = []
+        for path in paths:
+            try:
+                names = SheetReader.sheet_names(path)
+            except Exception as e:
+                errors[path] = str(e) or e.__class__.__name__
+                continue
+            sheets[path] = dict.fromkeys(names)
+            requests.extend((path, i) for i in names)
+
+        def loaded(request: tuple[str, str], sheet: Union[SheetView, Exception]) -> None:
+            path, sheet_name = request
+            sheets[path][sheet_name] = sheet if isinstance(sheet, Exception) else \
+                IndexedSheet.from_sheet(sheet_name, sheet)
+
+        self.loader.load(requests, loaded)
+        for path in paths:
+            indexed = [i for i in sheets.get(path, {}).values() if isinstance(i, IndexedSheet)]
+            error = errors.get(path) or "; ".join(f"{name}: {sheet}" for name, sheet in sheets[path].items()
+                                                  if isinstance(sheet, Exception))
+            # a workbook that could not be read is read again on the next refresh
+            mtime, size = states[path] if not error else (0, 0)
+            self._store(directory_key, IndexedWorkbook(path, indexed, error), mtime, size)
+
+    def _store(self, directory_key: str, workbook: IndexedWorkbook, mtime: int, size: int) -> None:
+        key = self.workbook_key(workbook.path)
+        with self._lock:
+            self.connection.execute("BEGIN")
+            try:
+                self._forget([key])
+                self.connection.execute("INSERT INTO workbooks VALUES (?, ?, ?, ?, ?, ?)",
+                                        (key, workbook.path, directory_key, mtime, size, workbook.error))
+                self.connection.executemany("INSERT INTO sheets VALUES (?, ?, ?, ?, ?)", [
+                    (key, sheet.name, position, sheet.rows, sheet.columns)
+                    for position, sheet in enumerate(workbook.sheets)
+                ])
+                self.connection.executemany(f"INSERT INTO statuses VALUES "
+                                            f"(?, ?, ?, {', '.join('?' * len(self.status_columns))})", [
+                    (key, sheet.name, column, *(counts[i] for i in self.status_columns))
+                    for sheet in workbook.sheets for column, counts in sheet.statuses.items()
+                ])
+                self.connection.execute("COMMIT")
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def _forget(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            for table in ("workbooks", "sheets", "statuses"):
+                self.connection.execute(f"DELETE FROM {table} WHERE workbook = ?", (key,))
+
+    def workbooks(self, directory: str) -> list[IndexedWorkbook]:
+        """The indexed workbooks of the directory, by path."""
+        with self._lock:
+            rows = self.connection.execute("SELECT workbook, path, error FROM workbooks WHERE directory = ? "
+                                           "ORDER BY path", (self.workbook_key(directory),)).fetchall()
+        return [IndexedWorkbook(path, self._sheets(key), error) for key, path, error in rows]
+
+    def workbook(self, path: str) -> Union[IndexedWorkbook, None]:
+        """The workbook as it was indexed, None if it was not or if it was modified since."""
+        if self._connection is None and not os.path.exists(self.filename):
+            return None
+        key = self.workbook_key(path)
+        with self._lock:
+            row = self.connection.execute("SELECT path, mtime, size, error FROM workbooks WHERE workbook = ?",
+                                          (key,)).fetchone()
+        if row is None or (row[1], row[2]) != self.file_state(path):
+            return None
+        return IndexedWorkbook(row[0], self._sheets(key), row[3])
+
+    def _sheets(self, key: str) -> list[IndexedSheet]:
+        with self._lock:
+            sheets = self.connection.execute("SELECT sheet, rows, columns FROM sheets WHERE workbook = ? "
+                                             "ORDER BY position", (key,)).fetchall()
+            statuses = self.connection.execute(f"SELECT sheet, column, {', '.join(self.status_columns.values())} "
+                                               f"FROM statuses WHERE workbook = ?", (key,)).fetchall()
+        by_sheet: dict[str, dict[int, dict[str, int]]] = {}
+        for sheet_name, column, *counts in statuses:
+            by_sheet.setdefault(sheet_name, {})[column] = dict(zip(self.status_columns, counts))
+        return [IndexedSheet(name, rows, columns, by_sheet.get(name, {})) for name, rows, columns in sheets]
+
+
+LIBRARY_INDEX = LibraryIndex()
@@ -3,10 +3,6 @@ from typing import Callable, Union
 import flet as ft
 
 from user_settings import SETTINGS
-from dictation_window import DictationControls
-from file_window import FileWindow
-from scheme_managing_window import SchemeManagingControls
-from help_window import HelpWindow
 
 
 class NavigationBarLabel(ft.Text):
@@ -37,6 +33,7 @@ class MenuBar(ft.Row):
     scheme_creation_label = "scheme-creation-label"
     scheme_deletion_label = "scheme-deletion-label"
     file_label = "file-label"
+    search_label = "search-label"
     help_label = "help-label"
 
     def __init__(self, navigation_function: Callable):
@@ -74,13 +71,18 @@ class MenuBar(ft.Row):
             lambda: navigation_function("file")
         )
 
+        self.search_window_button = NavigationBarLabel(
+            self.search_label,
+            lambda: navigation_function("search")
+        )
+
         self.help_window_button=NavigationBarLabel(
             self.help_label,
             lambda: navigation_function("help")
         )
 
         self.controls_list = [self.vocabulary_path_window_button, self.dictation_window_button,
-                              self.scheme_managing_popup, self.help_window_button]
+                              self.scheme_managing_popup, self.search_window_button, self.help_window_button]
 
         super().__init__(self.controls_list)
         self.alignment = ft.alignment.center_left
@@ -105,21 +107,22 @@ class MainPage:
 
         self.page_menu = MenuBar(self.window_changed)
 
-        self.dictation_controls = DictationControls(self.page)
-        self.schemes = SchemeManagingControls(self.page)
-        self.vocabulary_path_controls = FileWindow(self.page.window_width)
-
-        self.dictation_controls.visible = True
-        self.schemes.visible = False
-        self.vocabulary_path_controls.visible = False
-        self.help = HelpWindow(self.page)
-        self.help.visible = False
+        # windows are built on the first navigation to them and kept afterwards
+        self.window_factories = {
+            "file": self.create_file_window,
+            "dictation": self.create_dictation_window,
+            "scheme": self.create_scheme_window,
+            "search": self.create_search_window,
+            "help": self.create_help_window,
+        }
+        self.windows: dict[str, ft.Control] = {}
 
         self.navigation_routes = {
-            "file": (self.vocabulary_path_controls, lambda x: ...),
-            "dictation": (self.dictation_controls, lambda x: ...),
-            "scheme": (self.schemes, lambda x: (self.schemes.go_to(x))),
-            "help": (self.help, lambda x: ...)
+            "file": lambda x: ...,
+            "dictation": lambda x: ...,
+            "scheme": lambda x: (self.windows["scheme"].go_to(x)),
+            "search": lambda x: ...,
+            "help": lambda x: ...
         }
 
         self.current_page_name = ft.Text("Dictation", size=30)
@@ -132,24 +135,87 @@ class MainPage:
             padding=10,
         )
 
-        self.controls_list = ft.Column([
-            self.bar,
-            self.dictation_controls,
-            self.schemes,
-            self.vocabulary_path_controls,
-            self.help
-        ], )
+        self.controls_list = ft.Column([self.bar], )
+        self.get_window("dictation")
 
         page.add(self.controls_list)
         self.page.update()
 
+    def create_file_window(self) -> ft.Control:
+        from file_window import FileWindow
+        from ui_updates import UpdateCoalescer
+        return FileWindow(self.page.window_width, UpdateCoalescer(self.page), self.language_changed,
+                          self.session_chosen)
+
+    def create_dictation_window(self) -> ft.Control:
+        from dictation_window import DictationControls
+        return DictationControls(self.page)
+
+    def create_scheme_window(self) -> ft.Control:
+        from scheme_managing_window import SchemeManagingControls
+        return SchemeManagingControls(self.page)
+
+    def create_search_window(self) -> ft.Control:
+        from search_window import SearchWindow
+        return SearchWindow(self.page)
+
+    def create_help_window(self) -> ft.Control:
+        from help_window import HelpWindow
+        return HelpWindow(self.page)
+
+    def get_window(self, name: str) -> tuple[ft.Control, bool]:
+        """Returns the window and whether it has just been created."""
+        window = self.windows.get(name)
+        if window is not None:
+            return window, False
+        window = self.window_factories[name]()
+        self.windows[name] = window
+        self.controls_list.controls.append(window)
+        return window, True
+
+    def language_changed(self, new_language: str) -> bool:
+        """Translates the widget classes, and builds the menu and the windows again in the new language.
+        The windows other than the file window are built on the next navigation.
+
+        A running dictation is stopped first, so its statuses are written; if they cannot be written
+        (the workbook is open in Excel), the language is not changed and False is returned."""
+        dictation_window = self.windows.get("dictation")
+        if dictation_window is not None and not dictation_window.finish_dictation():
+            return False
+        SETTINGS.change_language(new_language)
+        for i in self.windows.values():
+            self.controls_list.controls.remove(i)
+        self.windows.clear()
+        self.page_menu = MenuBar(self.window_changed)
+        self.bar.content.controls[1] = self.page_menu
+        self.window_changed("file")
+        return True
+
+    def session_chosen(self, path: str, scheme_name: Union[str, None] = None) -> bool:
+        """Makes the workbook the vocabulary file and, with a scheme, opens the dictation window with it chosen.
+
+        A running dictation is stopped first, so its statuses are written to the previous workbook; if they
+        cannot be written, nothing is changed and False is returned."""
+        dictation_window = self.windows.get("dictation")
+        if dictation_window is not None and not dictation_window.finish_dictation():
+            return False
+        SETTINGS.change_settings(SETTINGS.vocabulary_key, path)
+        if scheme_name is not None:
+            self.window_changed("dictation")
+            self.windows["dictation"].choose_scheme(scheme_name)
+        return True
+
     def window_changed(self, destination: str):
         general_destination = destination.split("_")[0]
-        for i in self.navigation_routes.values():
-            i[0].visible = False
-        destination_object = self.navigation_routes.get(general_destination)
-        destination_object[0].reload(external=True)
-        destination_object[1](destination)
+        for i in self.windows.values():
+            i.visible = False
+        window, created = self.get_window(general_destination)
+        window.visible = True
+        if created:
+            # a control can only update itself after it has been sent to the page
+            self.page.update()
+        window.reload(external=True)
+        self.navigation_routes.get(general_destination)(destination)
         self.page.update()
 
 
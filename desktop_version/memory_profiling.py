@@ -0,0 +1,92 @@
+"""Memory accounting of the dictation pipeline with tracemalloc.
+
+Each stage of the pipeline is run inside `MemoryProfiler.stage`, which records the peak of the memory
+allocated during the stage and the memory the stage left allocated after it ended (retained), and takes
+a snapshot to show where the retained memory was allocated.
+"""
+import tracemalloc
+
+from contextlib import contextmanager
+from typing import Union
+
+
+class StageMemory:
+    def __init__(self, name: str, peak: int, retained: int, total_retained: int,
+                 top_allocations: list[tuple[str, int]]) -> None:
+        self.name = name
+        # memory allocated at the peak of the stage, on top of what was allocated when it started
+        self.peak = peak
+        # memory the stage left allocated
+        self.retained = retained
+        # memory allocated after the stage, since the profiler was started
+        self.total_retained = total_retained
+        self.top_allocations = top_allocations
+
+
+class MemoryProfiler:
+    def __init__(self, top_allocations: int = 3, frames: int = 1) -> None:
+        self.top_allocations = top_allocations
+        self.frames = frames
+        self.stages: list[StageMemory] = []
+        self._started_with = 0
+        self._snapshot: Union[tracemalloc.Snapshot, None] = None
+
+    def start(self) -> None:
+        tracemalloc.start(self.frames)
+        self._started_with = tracemalloc.get_traced_memory()[0]
+        self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._snapshot = None
+
+    @contextmanager
+    def stage(self, name: str):
+        tracemalloc.reset_peak()
+        started_with = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            statistics = snapshot.compare_to(self._snapshot, "lineno")[:self.top_allocations]
+            self._snapshot = snapshot
+            self.stages.append(StageMemory(
+                name,
+                peak - started_with,
+                current - started_with,
+                current - self._started_with,
+                [(str(i.traceback[0]), i.size_diff) for i in statistics],
+            ))
+
+    def as_metrics(self, words: int = 0) -> dict[str, float]:
+        """Flat metrics for the benchmark report: peak and retained bytes per stage,
+        and per word when the amount of words is given."""
+        metrics = {}
+        for i in self.stages:
+            metrics[f"{i.name}_peak_bytes"] = i.peak
+            metrics[f"{i.name}_retained_bytes"] = i.retained
+            if words:
+                metrics[f"{i.name}_peak_bytes_per_word"] = i.peak / words
+        if words and self.stages:
+            metrics["total_retained_bytes_per_word"] = self.stages[-1].total_retained / words
+        return metrics
+
+    def check_budgets(self, budgets: dict[str, int]) -> list[str]:
+        """Returns the descriptions of the stages whose peak exceeded the budget (in bytes)."""
+        exceeded = []
+        for i in self.stages:
+            budget = budgets.get(i.name)
+            if budget is not None and i.peak > budget:
+                exceeded.append(f"{i.name}: peak {i.peak / 2**20:.1f} MiB, budget {budget / 2**20:.1f} MiB")
+        return exceeded
+
+    def report(self, words: int = 0) -> str:
+        lines = [f"{'stage':<24} {'peak MiB':>10} {'retained MiB':>13} {'total MiB':>10} {'bytes/word':>11}"]
+        for i in self.stages:
+            per_word = f"{i.total_retained / words:>11.0f}" if words else f"{'-':>11}"
+            lines.append(f"{i.name:<24} {i.peak / 2**20:>10.2f} {i.retained / 2**20:>13.2f} "
+                         f"{i.total_retained / 2**20:>10.2f} {per_word}")
+            for location, size in i.top_allocations:
+                lines.append(f"    {size / 2**20:>+9.2f} MiB  {location}")
+        return "\n".join(lines)
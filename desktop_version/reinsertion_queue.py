@@ -0,0 +1,62 @@
+from collections import deque
+from random import Random
+from typing import Any, Iterable, Union
+
+
+class ReinsertionQueue:
+    """The rows of a dictation in the order they are asked.
+
+    A row that has to be revised is put back a few rows later (between `min_distance` and
+    `max_distance` rows, chosen by the random generator) instead of after all the other rows.
+    The rows put back wait in a ring of slots, one slot per position ahead; when the position of a
+    slot is reached, its rows are asked before the next new row. Every operation takes constant time."""
+
+    default_distance = (5, 15)
+
+    def __init__(
+            self,
+            items: Iterable[Any],
+            min_distance: int = default_distance[0],
+            max_distance: int = default_distance[1],
+            rng: Union[Random, None] = None,
+    ) -> None:
+        if not 0 <= min_distance <= max_distance:
+            raise ValueError(f"Invalid reinsertion distance: [{min_distance}, {max_distance}].")
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.rng = Random() if rng is None else rng
+
+        self.new_items = deque(items)
+        self.ready_items = deque()
+        self.slots: list[deque] = [deque() for _ in range(max_distance + 1)]
+        self.position = 0
+        self.waiting = 0
+
+    def __len__(self) -> int:
+        return len(self.new_items) + len(self.ready_items) + self.waiting
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def reinsert(self, item: Any) -> None:
+        """Puts the item back so that between `min_distance` and `max_distance` items are asked before it."""
+        distance = self.rng.randint(self.min_distance, self.max_distance)
+        self.slots[(self.position + distance) % len(self.slots)].append(item)
+        self.waiting += 1
+
+    def pop(self) -> Any:
+        if not self:
+            raise IndexError("pop from an empty ReinsertionQueue")
+        if not self.ready_items and not self.new_items:
+            # only the reinserted items are left, there is nothing to ask in between
+            while not self.slots[self.position % len(self.slots)]:
+                self.position += 1
+        self._release_slot()
+        self.position += 1
+        return self.ready_items.popleft() if self.ready_items else self.new_items.popleft()
+
+    def _release_slot(self) -> None:
+        slot = self.slots[self.position % len(self.slots)]
+        self.waiting -= len(slot)
+        self.ready_items.extend(slot)
+        slot.clear()
@@ -0,0 +1,241 @@
+"""Due dates of the words.
+
+Every time the statuses of a dictation are written, each row that got a status is given an interval
+and the moment it is due again, derived from its status transition: a word that had to be revised
+comes back soon, a word that still has repetitions left comes back the next day, and the interval
+of a learned word grows with every right answer. DELAYED words are not scheduled. A word no dictation
+has written a status of yet has no due date, so it is never DUE; such words are found by their status.
+
+The due dates are kept in an SQLite database, by row, together with the word of the row (its
+translation and spellings). When the words the scheduler gives are not in their rows any more (rows
+were inserted or deleted), the schedule of the sheet is moved to the rows that hold the words now,
+and the words that are gone are forgotten. The rows of a sheet are also kept in a binary heap
+ordered by the due date, so the N most overdue words are found without looking at the others.
+"""
+import os
+import time
+import sqlite3
+import threading
+
+from heapq import heapify, heappush, heappop
+from typing import Iterable, Sequence, Union
+
+
+class DueIndex:
+    """The due dates of the rows of one sheet in a binary heap.
+
+    A row that is rescheduled gets a new entry, its old one is left in the heap and skipped when it
+    is reached; the heap is rebuilt once the old entries make up half of it."""
+
+    def __init__(self, entries: Iterable[tuple[float, int]]) -> None:
+        self.heap: list[tuple[float, int]] = list(entries)
+        heapify(self.heap)
+        self.due: dict[int, float] = {row: due for due, row in self.heap}
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def update(self, row: int, due: float) -> None:
+        self.due[row] = due
+        heappush(self.heap, (due, row))
+        if len(self.heap) > 2 * len(self.due):
+            self.heap = [(due, row) for row, due in self.due.items()]
+            heapify(self.heap)
+
+    def remove(self, row: int) -> None:
+        self.due.pop(row, None)
+
+    def most_overdue(self, amount: int, now: float) -> list[int]:
+        """The rows due at `now`, the most overdue first, at most `amount` of them.
+
+        The heap is walked from its root keeping the entries that may come next in a second, small
+        heap, so only the entries that are returned (and their children) are looked at."""
+        rows = []
+        seen = set()
+        frontier = [(self.heap[0][0], 0)] if self.heap else []
+        while frontier and len(rows) < amount:
+            due, index = heappop(frontier)
+            if due > now:
+                break
+            row = self.heap[index][1]
+            if self.due.get(row) == due and row not in seen:
+                seen.add(row)
+                rows.append(row)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self.heap):
+                    heappush(frontier, (self.heap[child][0], child))
+        return rows
+
+
+class ReviewScheduler:
+    minute = 60
+    day = 24 * 60 * minute
+
+    # a word that was answered wrong or shown as a hint
+    relearn_interval = 10 * minute
+    # a word that was answered right but still has repetitions left (NEW*n or NEEDS_REVISION*n)
+    learning_interval = day
+    # a word that has just been learned (NORMAL*1)
+    first_interval = day
+    growth = 2.5
+    max_interval = 365 * day
+
+    default_filename = "statistics/schedule.db"
+    query_rows = 500
+
+    def __init__(self, filename: str = default_filename) -> None:
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._indexes: dict[tuple[str, str], DueIndex] = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # the database is only created once something is scheduled or asked for
+        if self._connection is None:
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS schedule (workbook TEXT NOT NULL, "
+                                     "sheet TEXT NOT NULL, row INTEGER NOT NULL, due REAL NOT NULL, "
+                                     "interval REAL NOT NULL, word TEXT NOT NULL DEFAULT '', "
+                                     "PRIMARY KEY (workbook, sheet, row))")
+            columns = [i[1] for i in self._connection.execute("PRAGMA table_info(schedule)")]
+            if "word" not in columns:
+                # scheduled before the words were kept, their rows are taken as they are
+                self._connection.execute("ALTER TABLE schedule ADD COLUMN word TEXT NOT NULL DEFAULT ''")
+        return self._connection
+
+    @staticmethod
+    def workbook_key(path_to_vocabulary: str) -> str:
+        return os.path.normcase(os.path.abspath(path_to_vocabulary))
+
+    @classmethod
+    def next_interval(cls, previous_interval: Union[float, None], given_status: str, new_status: str) -> float:
+        if given_status == "NEEDS_REVISION":
+            return cls.relearn_interval
+        if new_status.split("*")[0] != "NORMAL":
+            return cls.learning_interval
+        if not previous_interval or previous_interval < cls.first_interval:
+            return cls.first_interval
+        return min(previous_interval * cls.growth, cls.max_interval)
+
+    def get_index(self, path_to_vocabulary: str, sheet_name: str) -> DueIndex:
+        key = (self.workbook_key(path_to_vocabulary), sheet_name)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                rows = self.connection.execute("SELECT due, row FROM schedule WHERE workbook = ? AND sheet = ?",
+                                               key).fetchall()
+                index = self._indexes[key] = DueIndex(rows)
+        return index
+
+    def schedule(
+            self,
+            path_to_vocabulary: str,
+            sheet_name: str,
+            transitions: Iterable[tuple[int, str, str, str]],
+            now: Union[float, None] = None,
+    ) -> None:
+        """Schedules the rows from their (row index, given status, new status, word) transitions,
+        all of them in one transaction."""
+        now = time.time() if now is None else now
+        workbook = self.workbook_key(path_to_vocabulary)
+        index = self.get_index(path_to_vocabulary, sheet_name)
+        with self._lock:
+            intervals = dict(self.connection.execute(
+                "SELECT row, interval FROM schedule WHERE workbook = ? AND sheet = ?", (workbook, sheet_name)
+            ).fetchall())
+            scheduled, delayed = [], []
+            for row, given_status, new_status, word in transitions:
+                if new_status.split("*")[0] == "DELAYED":
+                    delayed.append((workbook, sheet_name, row))
+                    continue
+                interval = self.next_interval(intervals.get(row), given_status, new_status)
+                scheduled.append((workbook, sheet_name, row, now + interval, interval, word))
+
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany("INSERT OR REPLACE INTO schedule (workbook, sheet, row, due, interval, "
+                                            "word) VALUES (?, ?, ?, ?, ?, ?)", scheduled)
+                self.connection.executemany("DELETE FROM schedule WHERE workbook = ? AND sheet = ? AND row = ?",
+                                            delayed)
+                self.connection.execute("COMMIT")
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+            for _, _, row, due, _, _ in scheduled:
+                index.update(row, due)
+            for _, _, row in delayed:
+                index.remove(row)
+
+    def most_overdue(
+            self,
+            path_to_vocabulary: str,
+            sheet_name: str,
+            amount: int,
+            words: Union[Sequence[str], None] = None,
+            now: Union[float, None] = None,
+    ) -> list[int]:
+        """The rows due at `now`, the most overdue first. `words` are the words of the rows of the sheet
+        as it is now, by row index; when given, the rows are only taken if they still hold their words."""
+        now = time.time() if now is None else now
+        rows = self.get_index(path_to_vocabulary, sheet_name).most_overdue(amount, now)
+        if words is None or not rows or not self._moved(path_to_vocabulary, sheet_name, rows, words):
+            return rows
+        self.relocate(path_to_vocabulary, sheet_name, words)
+        return self.get_index(path_to_vocabulary, sheet_name).most_overdue(amount, now)
+
+    def _moved(self, path_to_vocabulary: str, sheet_name: str, rows: list[int], words: Sequence[str]) -> bool:
+        """Whether a word of the rows is not in its row any more."""
+        recorded = []
+        with self._lock:
+            # in parts, since the amount of parameters of a query is limited
+            for start in range(0, len(rows), self.query_rows):
+                part = rows[start:start + self.query_rows]
+                recorded.extend(self.connection.execute(
+                    f"SELECT row, word FROM schedule WHERE workbook = ? AND sheet = ? "
+                    f"AND row IN ({', '.join('?' * len(part))})",
+                    (self.workbook_key(path_to_vocabulary), sheet_name, *part)
+                ).fetchall())
+        return any(word and (row >= len(words) or words[row] != word) for row, word in recorded)
+
+    def relocate(self, path_to_vocabulary: str, sheet_name: str, words: Sequence[str]) -> None:
+        """Moves the due dates of the sheet to the rows that hold their words now. A word that is in its
+        row stays there, the others go to the first free row holding them; the words found nowhere
+        are forgotten, as are the rows without a word that are past the end of the sheet."""
+        workbook = self.workbook_key(path_to_vocabulary)
+        with self._lock:
+            entries = self.connection.execute("SELECT row, due, interval, word FROM schedule "
+                                              "WHERE workbook = ? AND sheet = ?", (workbook, sheet_name)).fetchall()
+            kept, moved, taken = [], [], set()
+            for row, due, interval, word in entries:
+                if row < len(words) and (not word or words[row] == word):
+                    kept.append((workbook, sheet_name, row, due, interval, word))
+                    taken.add(row)
+                elif word:
+                    moved.append((due, interval, word))
+            if moved:
+                wanted = {word for _, _, word in moved}
+                free: dict[str, list[int]] = {}
+                for row, word in enumerate(words):
+                    if word in wanted and row not in taken:
+                        free.setdefault(word, []).append(row)
+                for due, interval, word in moved:
+                    if free.get(word):
+                        kept.append((workbook, sheet_name, free[word].pop(0), due, interval, word))
+
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.execute("DELETE FROM schedule WHERE workbook = ? AND sheet = ?", (workbook, sheet_name))
+                self.connection.executemany("INSERT INTO schedule (workbook, sheet, row, due, interval, word) "
+                                            "VALUES (?, ?, ?, ?, ?, ?)", kept)
+                self.connection.execute("COMMIT")
+            except sqlite3.Error:
+                self.connection.execute("ROLLBACK")
+                raise
+            self._indexes[(workbook, sheet_name)] = DueIndex((due, row) for _, _, row, due, _, _ in kept)
+
+
+REVIEW_SCHEDULER = ReviewScheduler()
@@ -1,14 +1,17 @@
-from typing import Union, Callable
+import os
+
+from typing import Union, Callable, TYPE_CHECKING
 from copy import deepcopy
 
-import pandas as pd
 import flet as ft
-from gtts.lang import tts_langs
 
 from user_settings import SETTINGS
 from exceptions import SchemeExistsError, InvalidIndexesError
 from core import SheetScheme
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def event_with_page_update(func: Callable) -> Callable:
     def wrapper(*args, **kwargs):
@@ -24,21 +27,30 @@ def schemes_as_options():
 
 
 class AllowedNarrationLanguages:
-    languages = tts_langs()
+    _languages: Union[dict[str, str], None] = None
 
     no_narration = "no-narration"
 
     def __init__(self):
         SETTINGS.translate_widget(self.__class__)
 
+    @classmethod
+    def languages(cls) -> dict[str, str]:
+        """gtts is imported on the first request for the list of languages, not at startup."""
+        if cls._languages is None:
+            from gtts.lang import tts_langs
+            cls._languages = tts_langs()
+        return cls._languages
+
     @classmethod
     def is_allowed(cls, abbreviation: str) -> bool:
-        return cls.languages.get(abbreviation, False) is not False
+        return cls.languages().get(abbreviation, False) is not False
 
     @classmethod
     def as_options(cls) -> list[ft.dropdown.Option]:
+        SETTINGS.translate_widget(cls)
         options = [ft.dropdown.Option(key=False, text=cls.no_narration)]
-        options += [ft.dropdown.Option(key=i[0], text=i[1] + f" ({i[0]})") for i in cls.languages.items()]
+        options += [ft.dropdown.Option(key=i[0], text=i[1] + f" ({i[0]})") for i in cls.languages().items()]
         return options
 
 
@@ -157,8 +169,7 @@ class SchemeDeletionControls(ft.Column):
             self._error_label.value = self.choose_scheme
             return
 
-        SETTINGS.schemes.pop(scheme_name)
-        SETTINGS.change_settings("schemes", SETTINGS.schemes)
+        SETTINGS.delete_scheme(scheme_name)
 
         self._scheme_deleted(scheme_name)
 
@@ -194,6 +205,7 @@ class SchemeCreationControls(ft.Column):
         SETTINGS.translate_widget(self.__class__)
         self.overall_width = overall_width
         self._file, self._sheets = None, None
+        self._file_version: Union[tuple[str, float], None] = None
 
         self._title = ft.Text(value=self.top_title_text, style=ft.TextThemeStyle.TITLE_LARGE)
 
@@ -291,8 +303,6 @@ class SchemeCreationControls(ft.Column):
 
         super().__init__(controls)
 
-        if SETTINGS.vocabulary_path_valid:
-            self._fill_sheet_choice_options()
         self.alignment = ft.MainAxisAlignment.CENTER
         self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
         for i in self._inputs:
@@ -362,11 +372,9 @@ class SchemeCreationControls(ft.Column):
 
     @staticmethod
     def _write_scheme(name: str, scheme: dict[str, Union[int, str, list[dict[str, Union[str, int]]]]]):
-        schemes: dict = SETTINGS.get("schemes")
-        if schemes.get(name, None):
+        if SETTINGS.schemes.get(name, None):
             raise SchemeExistsError(name)
-        schemes[name] = scheme
-        SETTINGS.change_settings("schemes", schemes)
+        SETTINGS.add_scheme(name, scheme)
 
     @event_with_page_update
     def _add_test_block(self, e: ft.ControlEvent):
@@ -406,7 +414,8 @@ class SchemeCreationControls(ft.Column):
 
     def _get_columns(self) -> list[ft.dropdown.Option]:
         sheet_name = self._sheet_choice.value
-        sheet: pd.DataFrame = self._file.parse(sheet_name)
+        # only the header row is needed to list the columns
+        sheet: "pd.DataFrame" = self._file.parse(sheet_name, nrows=0)
         return [ft.dropdown.Option(key=int(index), text=f"{index} - {name}") for index, name in
                 enumerate(sheet.columns, start=1)]
 
@@ -415,10 +424,16 @@ class SchemeCreationControls(ft.Column):
         self._sheet_choice.options = [ft.dropdown.Option(i) for i in self._sheets]
         self._sheet_choice.disabled = False
 
-    @staticmethod
-    def _parse_excel(path: str) -> tuple[pd.ExcelFile, list]:
+    def _parse_excel(self, path: str) -> tuple["pd.ExcelFile", list]:
+        """The workbook is only opened again when the path or the file itself has changed."""
+        import pandas as pd
+
+        file_version = (path, os.path.getmtime(path))
+        if self._file is not None and self._file_version == file_version:
+            return self._file, self._sheets
         file = pd.ExcelFile(path)
         sheets = file.sheet_names
+        self._file_version = file_version
         return file, sheets
 
 
@@ -449,10 +464,10 @@ class SchemeManagingControls(ft.Column):
         self.no_vocabulary_file_label.value = "" if SETTINGS.vocabulary_path_valid else self.no_vocabulary_file_message
 
     def reload(self, external: bool = False):
+        """Only the label is refreshed here: `go_to` reloads the block that is actually shown,
+        so the workbook is not read for a block that stays hidden."""
         if external:
             self.visible = True
-        self.scheme_deletion.reload()
-        self.scheme_creation.reload()
         self.set_vocabulary_file_label()
 
     def go_to(self, destination: str):
@@ -0,0 +1,190 @@
+"""Checking of all the saved schemes against the workbook.
+
+The sheets are read together by the bulk loader, each sheet once for all the schemes that use it,
+and are kept in the sheet cache, so choosing a scheme afterwards does not read its sheet again. The results
+are cached by the workbook, the time it was last modified and the parameters of the scheme, and the
+cache is kept on disk, so the states of the schemes are known as soon as the app starts, and only
+change after the workbook or the scheme did. A workbook of the library is not read at all while
+its index is up to date, the schemes are checked against the index.
+"""
+import os
+import json
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+from core import SheetScheme, SheetToSchemeCompatibilityChecker
+from exceptions import InvalidSchemeError
+from sheet_view import SheetView
+from bulk_loading import SHEET_CACHE, MissingSheetError
+from library_index import LIBRARY_INDEX, IndexedSheet
+
+
+class SchemeState:
+    CHECKING = "checking"
+    VALID = "valid"
+    INVALID_ROWS = "invalid-rows"
+    MISSING_SHEET = "missing-sheet"
+    INVALID_COLUMNS = "invalid-columns"
+    # the workbook could not be read
+    UNREADABLE = "unreadable"
+
+
+class SchemeValidator:
+    default_filename = "cache/scheme_validation.json"
+
+    def __init__(self, filename: str = default_filename) -> None:
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._request = 0
+        # workbook -> (modification time, scheme parameters -> (state, invalid rows))
+        self._cache: Union[dict[str, tuple[int, dict[str, tuple[str, int]]]], None] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # one validation at a time, its sheets are read in parallel by the bulk loader
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scheme-validator")
+        return self._executor
+
+    @property
+    def cache(self) -> dict[str, tuple[int, dict[str, tuple[str, int]]]]:
+        if self._cache is None:
+            try:
+                with open(self.filename, mode="r", encoding="utf-8") as file:
+                    self._cache = {path: (mtime, {k: tuple(v) for k, v in states.items()})
+                                   for path, (mtime, states) in json.load(file).items()}
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    @staticmethod
+    def workbook_key(path_to_vocabulary: str) -> str:
+        return os.path.normcase(os.path.abspath(path_to_vocabulary))
+
+    @staticmethod
+    def scheme_key(parameters: dict) -> str:
+        return json.dumps(parameters, sort_keys=True, ensure_ascii=False)
+
+    @staticmethod
+    def modification_time(path_to_vocabulary: str) -> int:
+        try:
+            return os.stat(path_to_vocabulary).st_mtime_ns
+        except OSError:
+            return 0
+
+    def cached(self, path_to_vocabulary: str, schemes: dict[str, dict]) -> dict[str, tuple[str, int]]:
+        """The states of the schemes known for the workbook as it is now, without reading it;
+        the schemes that were not checked yet are CHECKING."""
+        mtime = self.modification_time(path_to_vocabulary)
+        with self._lock:
+            cached_mtime, states = self.cache.get(self.workbook_key(path_to_vocabulary), (None, {}))
+        if cached_mtime != mtime:
+            states = {}
+        return {name: states.get(self.scheme_key(parameters), (SchemeState.CHECKING, 0))
+                for name, parameters in schemes.items()}
+
+    def validate(
+            self,
+            path_to_vocabulary: str,
+            schemes: dict[str, dict],
+            on_validated: Callable[[str, tuple[str, int]], None]
+    ) -> dict[str, tuple[str, int]]:
+        """Returns the cached states and checks the other schemes in the background. `on_validated`
+        is called with the name and the state of every scheme checked, as long as no newer
+        validation was started."""
+        states = self.cached(path_to_vocabulary, schemes)
+        with self._lock:
+            self._request += 1
+            request = self._request
+        checking = {name: parameters for name, parameters in schemes.items()
+                    if states[name][0] == SchemeState.CHECKING}
+        indexed = LIBRARY_INDEX.workbook(path_to_vocabulary) if checking else None
+        if indexed is not None and not indexed.error:
+            checked = {}
+            for name, parameters in checking.items():
+                scheme = SheetScheme(parameters)
+                sheet = indexed.sheet(scheme.sheet_name)
+                states[name] = self.check(sheet, scheme) if sheet is not None else (SchemeState.MISSING_SHEET, 0)
+                checked[self.scheme_key(parameters)] = states[name]
+            self._remember(path_to_vocabulary, self.modification_time(path_to_vocabulary), checked)
+            self._save()
+            return states
+        by_sheet: dict[str, dict[str, dict]] = {}
+        for name, parameters in checking.items():
+            by_sheet.setdefault(SheetScheme(parameters).sheet_name, {})[name] = parameters
+        if by_sheet:
+            self.executor.submit(self._validate, request, path_to_vocabulary, by_sheet, on_validated)
+        return states
+
+    @staticmethod
+    def check(sheet: Union[SheetView, IndexedSheet], scheme: SheetScheme) -> tuple[str, int]:
+        try:
+            # the indexes are only checked against the size of the sheet, which the index knows as well
+            SheetToSchemeCompatibilityChecker(sheet, scheme).check_indexes()
+        except InvalidSchemeError:
+            return SchemeState.INVALID_COLUMNS, 0
+        if isinstance(sheet, IndexedSheet):
+            invalid_rows = sheet.status_counts(scheme.status)["invalid"]
+        else:
+            invalid_rows = len(sheet.status_column(scheme.status).invalid_rows)
+        return (SchemeState.INVALID_ROWS, invalid_rows) if invalid_rows else (SchemeState.VALID, 0)
+
+    def _validate(
+            self,
+            request: int,
+            path_to_vocabulary: str,
+            by_sheet: dict[str, dict[str, dict]],
+            on_validated: Callable[[str, tuple[str, int]], None]
+    ) -> None:
+        mtime = self.modification_time(path_to_vocabulary)
+
+        def sheet_loaded(sheet_name: str, sheet: Union[SheetView, Exception]) -> None:
+            schemes = by_sheet[sheet_name]
+            if isinstance(sheet, SheetView):
+                states = {name: self.check(sheet, SheetScheme(parameters)) for name, parameters in schemes.items()}
+            else:
+                state = SchemeState.MISSING_SHEET if isinstance(sheet, MissingSheetError) else SchemeState.UNREADABLE
+                states = {name: (state, 0) for name in schemes}
+            # a workbook that could not be read (opened elsewhere, for example) is read again next time
+            if not isinstance(sheet, Exception) or isinstance(sheet, MissingSheetError):
+                self._remember(path_to_vocabulary, mtime, {self.scheme_key(schemes[name]): state
+                                                           for name, state in states.items()})
+            if request != self._request:
+                return
+            for name, state in states.items():
+                on_validated(name, state)
+
+        SHEET_CACHE.load(path_to_vocabulary, by_sheet, sheet_loaded)
+        self._save()
+
+    def _remember(self, path_to_vocabulary: str, mtime: int, states: dict[str, tuple[str, int]]) -> None:
+        key = self.workbook_key(path_to_vocabulary)
+        with self._lock:
+            cached_mtime, cached_states = self.cache.get(key, (None, {}))
+            if cached_mtime != mtime:
+                cached_states = {}
+            cached_states.update(states)
+            self.cache[key] = (mtime, cached_states)
+
+    def _save(self) -> None:
+        """Writes the cache once per validation, to a temporary file that then replaces the old one,
+        so the cache on disk is never left half written."""
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            descriptor, temporary = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, mode="w", encoding="utf-8") as file:
+                    json.dump(self.cache, file, ensure_ascii=False)
+                os.replace(temporary, self.filename)
+            except BaseException:
+                os.remove(temporary)
+                raise
+
+
+SCHEME_VALIDATOR = SchemeValidator()
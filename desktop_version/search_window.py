@@ -0,0 +1,72 @@
+import flet as ft
+
+from user_settings import SETTINGS
+from ui_updates import UpdateCoalescer
+from vocabulary_search import VOCABULARY_SEARCH, SearchResult
+
+
+class SearchWindow(ft.Column):
+    """Finds the words of the vocabulary while the query is typed. The vocabulary is indexed again
+    every time the window is opened, only the sheets that changed are read."""
+
+    search_input_label = "search-input-label"
+    search_hint_text = "search-hint-text"
+    indexing_message = "indexing-message"
+    no_vocabulary_message = "no-vocabulary-message"
+    no_results_message = "no-results-message"
+    result_template = "result-template"
+
+    def __init__(self, page: ft.Page) -> None:
+        SETTINGS.translate_widget(self.__class__)
+        self.updates = UpdateCoalescer(page)
+        self.indexing = False
+
+        self.search_input = ft.TextField(label=self.search_input_label, hint_text=self.search_hint_text,
+                                         on_change=self.search)
+        self.message_label = ft.Text()
+        self.results_list = ft.ListView(height=page.height - 250, spacing=4)
+
+        super().__init__(
+            [self.search_input, self.message_label, self.results_list],
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            width=page.width // 2,
+        )
+
+    def reload(self, external: bool = False):
+        self.results_list.controls = []
+        if not SETTINGS.vocabulary_path_valid:
+            self.search_input.disabled = True
+            self.message_label.value = self.no_vocabulary_message
+            return
+        self.search_input.disabled = False
+        self.indexing = True
+        self.message_label.value = self.indexing_message
+        VOCABULARY_SEARCH.refresh_in_background(SETTINGS.path, dict(SETTINGS.schemes), self.vocabulary_indexed)
+
+    def vocabulary_indexed(self, rebuilt: list[str]) -> None:
+        with self.updates.event("vocabulary indexed"):
+            self.indexing = False
+            self.show_results()
+            self.updates.update(self.message_label, self.results_list)
+
+    def search(self, e: ft.ControlEvent) -> None:
+        with self.updates.event("search"):
+            self.show_results()
+            self.updates.update(self.message_label, self.results_list)
+
+    def show_results(self) -> None:
+        query = self.search_input.value or ""
+        results = VOCABULARY_SEARCH.search(query)
+        self.results_list.controls = [self.result_tile(i) for i in results]
+        if self.indexing:
+            self.message_label.value = self.indexing_message
+        else:
+            self.message_label.value = self.no_results_message if query.strip() and not results else ""
+
+    def result_tile(self, result: SearchResult) -> ft.ListTile:
+        place = self.result_template.format(sheet=result.sheet_name, line=result.line, status=result.status)
+        return ft.ListTile(
+            title=ft.Text(result.translation),
+            subtitle=ft.Text("; ".join(result.spellings) + "\n" + place),
+            is_three_line=True,
+        )
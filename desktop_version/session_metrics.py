@@ -0,0 +1,136 @@
+import os
+import json
+import time
+
+from array import array
+from datetime import datetime
+from typing import Union
+
+
+class AnswerOutcome:
+    RIGHT = 0
+    WRONG = 1
+    HINT = 2
+    ALMOST = 3
+
+    letters = "RWHA"
+
+
+class SessionMetrics:
+    """Records when and how every answer of a dictation was given.
+
+    The log is kept in arrays of numbers rather than in lists of objects: the time the answer took
+    (from the moment the word was displayed, or from the previous answer to the same word),
+    its outcome and the index of the row it was given to. In a dictation of several sheets the index
+    of the sheet (in `sheet_names`) is kept as well."""
+
+    percentiles = (50, 90, 99)
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._started_monotonic = time.monotonic()
+        self._displayed_at: Union[float, None] = None
+
+        self.latencies = array("f")
+        self.outcomes = array("b")
+        self.rows = array("q")
+        self.sheets = array("h")
+        # the words answered right with all their synonyms, a synonym is an answer of its own
+        self.completed_words = 0
+        # set in the dictations of several sheets
+        self.sheet_names: list[str] = []
+
+    def word_displayed(self) -> None:
+        self._displayed_at = time.monotonic()
+
+    def record(self, row_index: int, outcome: int, sheet_index: int = 0) -> None:
+        now = time.monotonic()
+        displayed_at = self._started_monotonic if self._displayed_at is None else self._displayed_at
+        self.latencies.append(now - displayed_at)
+        self.outcomes.append(outcome)
+        self.rows.append(row_index)
+        self.sheets.append(sheet_index)
+        self._displayed_at = now
+
+    def word_completed(self) -> None:
+        self.completed_words += 1
+
+    @property
+    def duration(self) -> float:
+        return time.monotonic() - self._started_monotonic
+
+    @property
+    def answers(self) -> int:
+        return len(self.outcomes)
+
+    def count(self, outcome: int) -> int:
+        return self.outcomes.count(outcome)
+
+    @property
+    def hint_rate(self) -> float:
+        return self.count(AnswerOutcome.HINT) / self.answers if self.answers else 0.0
+
+    @property
+    def words_per_minute(self) -> float:
+        """The completed words per minute, not the right answers: a word with synonyms counts once."""
+        minutes = self.duration / 60
+        return self.completed_words / minutes if minutes else 0.0
+
+    def latency_percentiles(self) -> dict[int, float]:
+        """Nearest-rank percentiles of the answer times, in seconds."""
+        if not self.latencies:
+            return {i: 0.0 for i in self.percentiles}
+        ordered = sorted(self.latencies)
+        return {i: ordered[min(len(ordered) - 1, max(0, round(i / 100 * len(ordered)) - 1))]
+                for i in self.percentiles}
+
+    def slowest_rows(self, amount: int = 10) -> list[tuple[Union[int, tuple[int, int]], float]]:
+        """The rows (or the (sheet index, row) pairs, with several sheets) that took the longest to answer,
+        with their total answer time."""
+        totals: dict[Union[int, tuple[int, int]], float] = {}
+        keys = zip(self.sheets, self.rows) if self.sheet_names else self.rows
+        for row, latency in zip(keys, self.latencies):
+            totals[row] = totals.get(row, 0.0) + latency
+        return sorted(totals.items(), key=lambda x: x[1], reverse=True)[:amount]
+
+    def as_dict(self) -> dict:
+        percentiles = self.latency_percentiles()
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration": round(self.duration, 3),
+            "answers": self.answers,
+            "right": self.count(AnswerOutcome.RIGHT),
+            "wrong": self.count(AnswerOutcome.WRONG),
+            "hints": self.count(AnswerOutcome.HINT),
+            "almost": self.count(AnswerOutcome.ALMOST),
+            "completed_words": self.completed_words,
+            "words_per_minute": round(self.words_per_minute, 2),
+            **{f"p{i}": round(value, 3) for i, value in percentiles.items()},
+            "slowest_rows": [row for row, _ in self.slowest_rows()],
+            # the full log, kept compact: milliseconds, one letter per outcome and the row indexes
+            "latencies_ms": [round(i * 1000) for i in self.latencies],
+            "outcomes": "".join(AnswerOutcome.letters[i] for i in self.outcomes),
+            "rows": list(self.rows),
+            **({"sheet_names": self.sheet_names, "sheets": list(self.sheets)} if self.sheet_names else {}),
+        }
+
+
+class SessionMetricsStore:
+    """Appends the metrics of every finished dictation to a JSON lines file."""
+
+    path_to_statistics = "statistics/sessions.jsonl"
+
+    @classmethod
+    def save(cls, metrics: SessionMetrics, **session_information) -> None:
+        if not metrics.answers:
+            return
+        os.makedirs(os.path.dirname(cls.path_to_statistics), exist_ok=True)
+        with open(cls.path_to_statistics, mode="a", encoding="utf-8") as file:
+            file.write(json.dumps({**session_information, **metrics.as_dict()}, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls) -> list[dict]:
+        if not os.path.exists(cls.path_to_statistics):
+            return []
+        with open(cls.path_to_statistics, mode="r", encoding="utf-8") as file:
+            return [json.loads(i) for i in file if i.strip()]
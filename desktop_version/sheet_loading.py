@@ -0,0 +1,112 @@
+"""Reading of the sheets away from the UI.
+
+A sheet is read on a background thread, row by row, reporting how many rows were read. Only the
+latest request matters: when another sheet is asked for, the previous reading stops at its next
+progress report, and a result that is not the latest one any more is never delivered.
+A sheet that is in the sheet cache (read by the scheme validation, for example) is not read again.
+Several sheets can be asked for in one request, they are then read one after the other.
+"""
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+from core import ExcelParser
+from sheet_view import SheetView
+from bulk_loading import SHEET_CACHE, SheetCache
+
+
+class LoadingCancelled(Exception):
+    pass
+
+
+class SheetLoader:
+    def __init__(self) -> None:
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._lock = threading.Lock()
+        self._request = 0
+        self._cancelled = threading.Event()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # a single thread, so a cancelled reading ends before the next one starts on the same file
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheet-loader")
+        return self._executor
+
+    def load(
+            self,
+            sheet_name: str,
+            on_loaded: Callable[[int, SheetView], None],
+            on_failed: Callable[[int, Exception], None],
+            on_progress: Union[Callable[[int, int, Union[int, None]], None], None] = None,
+            path: Union[str, None] = None,
+    ) -> int:
+        """Starts reading the sheet and cancels the previous reading. The callbacks are given the
+        number of the request and are called on the background thread, only while it is the latest."""
+        return self.load_many([sheet_name], lambda request, sheets: on_loaded(request, sheets[sheet_name]),
+                              on_failed, on_progress, path)
+
+    def load_many(
+            self,
+            sheet_names: list[str],
+            on_loaded: Callable[[int, dict[str, SheetView]], None],
+            on_failed: Callable[[int, Exception], None],
+            on_progress: Union[Callable[[int, int, Union[int, None]], None], None] = None,
+            path: Union[str, None] = None,
+    ) -> int:
+        """Like `load`, for several sheets. `on_loaded` is given all of them by name,
+        `on_failed` is given the first error, and the progress is reported for each sheet."""
+        with self._lock:
+            self._cancelled.set()
+            self._cancelled = cancelled = threading.Event()
+            self._request += 1
+            request = self._request
+        self.executor.submit(self._load, request, cancelled, list(sheet_names), path, on_loaded, on_failed, on_progress)
+        return request
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled.set()
+            self._request += 1
+
+    def is_latest(self, request: int) -> bool:
+        return request == self._request
+
+    def _load(
+            self,
+            request: int,
+            cancelled: threading.Event,
+            sheet_names: list[str],
+            path: Union[str, None],
+            on_loaded: Callable[[int, dict[str, SheetView]], None],
+            on_failed: Callable[[int, Exception], None],
+            on_progress: Union[Callable[[int, int, Union[int, None]], None], None],
+    ) -> None:
+        def progress(rows: int, total: Union[int, None]) -> None:
+            if cancelled.is_set():
+                raise LoadingCancelled()
+            if on_progress is not None:
+                on_progress(request, rows, total)
+
+        try:
+            path = ExcelParser.vocabulary_path(path)
+            sheets = {}
+            for sheet_name in sheet_names:
+                sheet = SHEET_CACHE.get(path, sheet_name)
+                if sheet is None:
+                    mtime = SheetCache.modification_time(path)
+                    sheet = ExcelParser.read_sheet_view(sheet_name, path, progress)
+                    SHEET_CACHE.put(path, sheet_name, sheet, mtime)
+                sheets[sheet_name] = sheet
+        except LoadingCancelled:
+            return
+        except Exception as e:
+            if self.is_latest(request):
+                on_failed(request, e)
+            return
+        if self.is_latest(request):
+            on_loaded(request, sheets)
+
+
+SHEET_LOADER = SheetLoader()
@@ -0,0 +1,159 @@
+from typing import Any, Iterable, Sequence, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+class StatusColumn:
+    """The statuses of a column, coded as numbers: the index of the status name in `statuses`
+    (-1 when the cell does not hold a valid status) and its multiplier (0 when invalid).
+
+    The running counts of every status are kept as well, so the amount of rows with a status
+    in any range is found with two lookups."""
+
+    statuses = ["NEW", "NORMAL", "NEEDS_REVISION", "DELAYED"]
+    invalid = -1
+    max_multiplier = 50
+
+    def __init__(self, column: "np.ndarray") -> None:
+        import numpy as np
+
+        # a sheet holds few distinct statuses, so each of them is only parsed once
+        parsed: dict[Any, tuple[int, int]] = {}
+        codes = np.empty(len(column), dtype=np.int8)
+        multipliers = np.empty(len(column), dtype=np.int16)
+        for index, value in enumerate(column):
+            status = parsed.get(value)
+            if status is None:
+                status = parsed[value] = self.parse(value)
+            codes[index], multipliers[index] = status
+        codes.flags.writeable = False
+        multipliers.flags.writeable = False
+        self.codes = codes
+        self.multipliers = multipliers
+
+        # prefix_counts[code, i] is the amount of rows with the status before the row i
+        prefix_counts = np.zeros((len(self.statuses), len(column) + 1), dtype=np.int32)
+        for code in range(len(self.statuses)):
+            np.cumsum(codes == code, out=prefix_counts[code, 1:])
+        prefix_counts.flags.writeable = False
+        self.prefix_counts = prefix_counts
+
+    @classmethod
+    def parse(cls, value: Any) -> tuple[int, int]:
+        if not isinstance(value, str):
+            return cls.invalid, 0
+        try:
+            name, multiplier = value.split("*")
+            multiplier = int(multiplier)
+        except ValueError:
+            return cls.invalid, 0
+        if name not in cls.statuses or not 1 <= multiplier <= cls.max_multiplier:
+            return cls.invalid, 0
+        return cls.statuses.index(name), multiplier
+
+    @classmethod
+    def code(cls, status_name: str) -> int:
+        return cls.statuses.index(status_name)
+
+    def count(self, status_name: str, start: int, stop: int) -> int:
+        """The amount of rows with the status among the rows [start, stop)."""
+        start, stop, _ = slice(start, stop).indices(len(self.codes))
+        if start >= stop:
+            return 0
+        code = self.code(status_name)
+        return int(self.prefix_counts[code, stop] - self.prefix_counts[code, start])
+
+    def counts(self, start: int, stop: int) -> dict[str, int]:
+        """The amount of rows with each status among the rows [start, stop), and of all of them."""
+        start, stop, _ = slice(start, stop).indices(len(self.codes))
+        counts = {i: self.count(i, start, stop) for i in self.statuses}
+        counts["all"] = max(stop - start, 0)
+        return counts
+
+    @property
+    def invalid_rows(self) -> "np.ndarray":
+        return (self.codes == self.invalid).nonzero()[0]
+
+
+class SheetView:
+    """A read-only representation of a loaded sheet, shared by everything that reads it.
+
+    The cells are kept once, as they were read, in an object array; the empty cells are marked
+    in a separate mask instead of being turned into strings. The statuses of a column are coded
+    as numbers the first time they are asked for."""
+
+    empty_cell = "nan"
+
+    def __init__(self, cells: "np.ndarray", null_mask: "np.ndarray") -> None:
+        cells.flags.writeable = False
+        null_mask.flags.writeable = False
+        self.cells = cells
+        self.null_mask = null_mask
+        self._status_columns: dict[int, StatusColumn] = {}
+
+    @classmethod
+    def from_dataframe(cls, sheet: "pd.DataFrame") -> "SheetView":
+        return cls(sheet.to_numpy(dtype=object), sheet.isna().to_numpy())
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]], columns: int = 0) -> "SheetView":
+        """Makes the view from the values of the rows under the header, None standing for an empty cell.
+
+        Like pandas does, the empty rows at the end are left out and the sheet is as wide as its
+        widest row (or as `columns`, the width of the header)."""
+        import numpy as np
+
+        kept: list[Sequence[Any]] = []
+        filled_rows = 0
+        for row in rows:
+            row = cls.trim_row(row)
+            kept.append(row)
+            if row:
+                filled_rows = len(kept)
+                columns = max(columns, len(row))
+        del kept[filled_rows:]
+
+        cells = np.full((len(kept), columns), None, dtype=object)
+        for index, row in enumerate(kept):
+            cells[index, :len(row)] = row
+        return cls(cells, np.equal(cells, None))
+
+    @staticmethod
+    def trim_row(row: Sequence[Any]) -> Sequence[Any]:
+        """The row without its empty cells at the end."""
+        end = len(row)
+        while end and row[end - 1] is None:
+            end -= 1
+        return row[:end]
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.cells.shape
+
+    @property
+    def rows(self) -> int:
+        return self.cells.shape[0]
+
+    @property
+    def columns(self) -> int:
+        return self.cells.shape[1]
+
+    def status_column(self, column_index: int) -> StatusColumn:
+        status_column = self._status_columns.get(column_index)
+        if status_column is None:
+            status_column = self._status_columns[column_index] = StatusColumn(self.cells[:, column_index])
+        return status_column
+
+    def cell(self, row_index: int, column_index: int) -> str:
+        """The cell as a string, the empty cells are given as `empty_cell`."""
+        if self.null_mask[row_index, column_index]:
+            return self.empty_cell
+        value = self.cells[row_index, column_index]
+        return value if isinstance(value, str) else str(value)
+
+    def row(self, row_index: int, column_indexes: Union[list[int], None] = None) -> dict[int, str]:
+        """The given cells of a row (all of them by default) as strings, by column index."""
+        column_indexes = range(self.columns) if column_indexes is None else column_indexes
+        return {i: self.cell(row_index, i) for i in column_indexes}
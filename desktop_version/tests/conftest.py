@@ -0,0 +1,13 @@
+import os
+import sys
+import shutil
+import tempfile
+
+DESKTOP_VERSION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DESKTOP_VERSION)
+
+# the settings database is created in the working directory as soon as the modules of the app are
+# imported, so the tests run in a directory of their own, holding a copy of the translations
+_working_directory = tempfile.mkdtemp(prefix="dictation-manager-tests-")
+shutil.copytree(os.path.join(DESKTOP_VERSION, "languages"), os.path.join(_working_directory, "languages"))
+os.chdir(_working_directory)
@@ -0,0 +1,57 @@
+from answer_matching import AnswerNormalizer, EditDistance, AnswerTrie, IncrementalAnswerChecker, TypingState
+
+
+def test_normalize_composes_and_collapses_whitespace():
+    normalizer = AnswerNormalizer()
+    assert normalizer.normalize("  café   au  lait ") == "café au lait"
+
+
+def test_normalize_applies_common_and_language_rules():
+    assert AnswerNormalizer().normalize("it’s „so“") == "it's \"so\""
+    assert AnswerNormalizer("de").normalize("Straße") == "Strasse"
+    assert AnswerNormalizer("ru").normalize("ёж") == "еж"
+
+
+def test_normalize_folds_the_case_only_when_asked():
+    assert AnswerNormalizer().normalize("Haus") == "Haus"
+    assert AnswerNormalizer(ignore_case=True).normalize("Haus") == "haus"
+
+
+def test_get_shares_the_normalizer_of_a_language():
+    assert AnswerNormalizer.get("de-DE") is AnswerNormalizer.get("de")
+    assert AnswerNormalizer.get("de", ignore_case=True) is not AnswerNormalizer.get("de")
+
+
+def test_bounded_distance():
+    assert EditDistance.bounded("haus", "haus", 1) == 0
+    assert EditDistance.bounded("haus", "hause", 1) == 1
+    assert EditDistance.bounded("haus", "hasu", 2) == 2
+    assert EditDistance.bounded("kitten", "sitting", 3) == 3
+
+
+def test_bounded_distance_over_the_limit():
+    assert EditDistance.bounded("haus", "hasu", 1) == 2
+    assert EditDistance.bounded("a", "abcd", 2) == 3
+    assert EditDistance.bounded("kitten", "sitting", 2) == 3
+
+
+def checker(*variations: str) -> IncrementalAnswerChecker:
+    normalizer = AnswerNormalizer(ignore_case=True)
+    return IncrementalAnswerChecker(AnswerTrie(normalizer.normalize(i) for i in variations), normalizer)
+
+
+def test_typing_states():
+    typing = checker("Haus", "Hause")
+    assert typing.feed("") == TypingState.ON_TRACK
+    assert typing.feed("ha") == TypingState.ON_TRACK
+    # another variation continues it
+    assert typing.feed("haus") == TypingState.ON_TRACK
+    assert typing.feed("hause") == TypingState.COMPLETE
+    assert typing.feed("hausex") == TypingState.DIVERGED
+
+
+def test_typing_edited_before_the_end():
+    typing = checker("Haus")
+    assert typing.feed("hx") == TypingState.DIVERGED
+    assert typing.feed("ha") == TypingState.ON_TRACK
+    assert typing.feed("HAUS") == TypingState.COMPLETE
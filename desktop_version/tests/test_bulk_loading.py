@@ -0,0 +1,52 @@
+import openpyxl
+import pytest
+
+from sheet_view import SheetView
+from bulk_loading import SheetReader, MissingSheetError
+
+
+def test_pack_and_unpack():
+    sheet = SheetView.from_rows([("Haus", "house", "NEW*1"), ("Baum", None, 3), (None, "tree", "NORMAL*2")])
+    unpacked = SheetReader.unpack(SheetReader.pack(sheet))
+    assert unpacked.shape == sheet.shape
+    assert unpacked.null_mask.tolist() == sheet.null_mask.tolist()
+    # the cells come back as the strings the app reads them as
+    for row in range(sheet.rows):
+        assert unpacked.row(row) == sheet.row(row)
+    assert unpacked.cells[1, 1] is None
+
+
+def test_pack_and_unpack_an_empty_sheet():
+    unpacked = SheetReader.unpack(SheetReader.pack(SheetView.from_rows([], columns=3)))
+    assert unpacked.shape == (0, 3)
+
+
+@pytest.fixture
+def workbook(tmp_path) -> str:
+    path = str(tmp_path / "vocabulary.xlsx")
+    book = openpyxl.Workbook()
+    nouns = book.active
+    nouns.title = "nouns"
+    for row in (("translation", "word", "status"), ("house", "Haus", "NEW*1"), ("tree", 2.0, "NORMAL*1")):
+        nouns.append(row)
+    book.create_sheet("verbs").append(("translation",))
+    book.save(path)
+    return path
+
+
+def test_sheet_names(workbook):
+    assert SheetReader.sheet_names(workbook) == ["nouns", "verbs"]
+
+
+def test_read(workbook):
+    sheet = SheetReader.read(workbook, "nouns")
+    assert sheet.shape == (2, 3)
+    # the whole numbers are read as integers, as pandas reads them
+    assert sheet.row(1) == {0: "tree", 1: "2", 2: "NORMAL*1"}
+    assert SheetReader.read(workbook, "verbs").shape == (0, 1)
+
+
+def test_read_many_gives_the_errors(workbook):
+    sheets = SheetReader.read_many(workbook, ["nouns", "adjectives"])
+    assert isinstance(sheets["nouns"], SheetView)
+    assert isinstance(sheets["adjectives"], MissingSheetError)
@@ -0,0 +1,120 @@
+import time
+from random import Random
+
+import openpyxl
+import pytest
+
+from bulk_loading import SheetReader
+from core import SheetScheme, WordsGetter, CombinedDictationContent, Dictation
+from excel_modifier import OpenpyxlExcelModifier, DryRunExcelModifier
+from scheduler import ReviewScheduler
+from session_metrics import AnswerOutcome
+from sheet_view import SheetView
+
+WORDS = {"nouns": [("house", "Haus"), ("tree", "Baum"), ("street", "Straße")],
+         "verbs": [("to go", "gehen"), ("to see", "sehen")]}
+
+
+class CountingExcelModifier(OpenpyxlExcelModifier):
+    """Counts how many times the workbook is opened and saved."""
+
+    opened = 0
+    committed = 0
+
+    def __init__(self, worksheet_name: str, status_column_index: int, path_to_vocabulary: str) -> None:
+        CountingExcelModifier.opened += 1
+        super().__init__(worksheet_name, status_column_index, path_to_vocabulary)
+
+    def commit(self) -> None:
+        CountingExcelModifier.committed += 1
+        super().commit()
+
+
+@pytest.fixture
+def workbook(tmp_path) -> str:
+    path = str(tmp_path / "vocabulary.xlsx")
+    book = openpyxl.Workbook()
+    book.remove(book.active)
+    for sheet_name, words in WORDS.items():
+        sheet = book.create_sheet(sheet_name)
+        sheet.append(("translation", "word", "status"))
+        for translation, word in words:
+            sheet.append((translation, word, "NEW*1"))
+    book.save(path)
+    CountingExcelModifier.opened = CountingExcelModifier.committed = 0
+    return path
+
+
+def dictation_of(workbook: str, scheduler: ReviewScheduler, typo_tolerance: int = 0) -> Dictation:
+    getters = []
+    for sheet_name in WORDS:
+        scheme = SheetScheme({"sheet_name": sheet_name, "translation_column_index": 0, "status_column_index": 2,
+                              "narration_language": "de", "to_check": [{"spelling": 1, "info": None}]})
+        sheet = SheetReader.read(workbook, sheet_name)
+        getters.append((workbook, WordsGetter(sheet, scheme, range(2, sheet.rows + 1), with_shuffle=False)))
+    content = CombinedDictationContent.from_getters(getters, with_shuffle=False)
+    return Dictation(content, workbook, CountingExcelModifier, Random(0), scheduler,
+                     reinsertion_distance=(2, 2), typo_tolerance=typo_tolerance)
+
+
+def statuses(workbook: str) -> dict[str, list[str]]:
+    book = openpyxl.load_workbook(workbook)
+    return {name: [row[2] for row in book[name].iter_rows(min_row=2, values_only=True)] for name in WORDS}
+
+
+def test_hinted_word_is_asked_again_and_written_to_be_revised(workbook, tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "schedule.db"))
+    dictation = dictation_of(workbook, scheduler)
+    dictation.run()
+    asked = []
+    while (word := dictation.get_word()) is not False:
+        asked.append(word.words[0].word_variations[0])
+        if len(asked) == 1:
+            dictation.show_answer()
+        else:
+            dictation.check_answer(word.words[0].word_variations[0])
+
+    # the hinted word comes back after two other words
+    assert asked == ["Haus", "Baum", "Straße", "Haus", "gehen", "sehen"]
+    assert not dictation.is_running
+    # both sheets are written in one opening and saving of the workbook
+    assert (CountingExcelModifier.opened, CountingExcelModifier.committed) == (1, 1)
+    assert statuses(workbook) == {"nouns": ["NEW*2", "NORMAL*1", "NORMAL*1"], "verbs": ["NORMAL*1", "NORMAL*1"]}
+
+    # the word to revise is due again soon, the others only the next day
+    soon = time.time() + ReviewScheduler.relearn_interval + 1
+    assert scheduler.most_overdue(workbook, "nouns", 10, now=soon) == [0]
+    assert scheduler.most_overdue(workbook, "verbs", 10, now=soon) == []
+    tomorrow = time.time() + ReviewScheduler.day + 1
+    assert sorted(scheduler.most_overdue(workbook, "nouns", 10, now=tomorrow)) == [0, 1, 2]
+    assert sorted(scheduler.most_overdue(workbook, "verbs", 10, now=tomorrow)) == [0, 1]
+
+
+def test_almost_right_answer_does_not_require_revision(workbook, tmp_path):
+    dictation = dictation_of(workbook, ReviewScheduler(str(tmp_path / "schedule.db")), typo_tolerance=1)
+    dictation.run()
+    word = dictation.get_word()
+    response = dictation.check_answer("Hauz")
+    assert not response.is_right and response.is_almost
+    assert not dictation.check_answer("Hxyz").is_almost
+    # the word is still asked until it is given right, and then counts as right
+    assert dictation.check_answer(word.words[0].word_variations[0]).is_right
+    while (word := dictation.get_word()) is not False:
+        dictation.check_answer(word.words[0].word_variations[0])
+    assert statuses(workbook)["nouns"] == ["NORMAL*1", "NORMAL*1", "NORMAL*1"]
+
+
+def test_words_per_minute_counts_the_completed_words():
+    sheet = SheetView.from_rows([("house", "Haus|Heim", "NEW*1"), ("tree", "Baum", "NEW*1")])
+    scheme = SheetScheme({"sheet_name": "nouns", "translation_column_index": 0, "status_column_index": 2,
+                          "narration_language": "de", "to_check": [{"spelling": 1, "info": None}]})
+    content = WordsGetter(sheet, scheme, range(2, 4), with_shuffle=False).get_words()
+    dictation = Dictation(content, "vocabulary.xlsx", DryRunExcelModifier, Random(0))
+    dictation.run()
+    for answer in ("Haus", "Heim", "Baum"):
+        dictation.get_word()
+        assert dictation.check_answer(answer).is_right
+    assert dictation.metrics.count(AnswerOutcome.RIGHT) == 3
+    # the two synonyms of the first word complete one word
+    assert dictation.metrics.completed_words == 2
+    assert dictation.metrics.as_dict()["completed_words"] == 2
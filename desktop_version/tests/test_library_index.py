@@ -0,0 +1,78 @@
+import os
+
+import openpyxl
+import pytest
+
+from bulk_loading import BulkLoader
+from library_index import LibraryIndex
+
+
+def save_workbook(path: str, statuses: list[str]) -> str:
+    book = openpyxl.Workbook()
+    nouns = book.active
+    nouns.title = "nouns"
+    nouns.append(("translation", "word", "status"))
+    for i, status in enumerate(statuses):
+        nouns.append((f"word {i}", f"Wort {i}", status))
+    book.save(path)
+    return path
+
+
+@pytest.fixture
+def library(tmp_path) -> str:
+    directory = tmp_path / "library"
+    (directory / "verbs").mkdir(parents=True)
+    save_workbook(str(directory / "a.xlsx"), ["NEW*1", "NORMAL*2", "NEW*1"])
+    save_workbook(str(directory / "verbs" / "b.xlsx"), ["NEEDS_REVISION*1", "broken"])
+    # neither of them is a workbook of the library
+    (directory / "~$a.xlsx").write_bytes(b"")
+    (directory / "notes.txt").write_text("notes")
+    return str(directory)
+
+
+@pytest.fixture
+def index(tmp_path) -> LibraryIndex:
+    return LibraryIndex(str(tmp_path / "library.db"), BulkLoader(max_workers=1))
+
+
+def test_workbooks_are_indexed(library, index):
+    progress = []
+    changed = index.refresh(library, lambda done, total: progress.append((done, total)))
+    assert sorted(os.path.basename(i) for i in changed) == ["a.xlsx", "b.xlsx"]
+    assert progress == [(1, 2), (2, 2)]
+    a, b = index.workbooks(library)
+    assert (a.name, b.name) == ("a.xlsx", "b.xlsx")
+    nouns = a.sheet("nouns")
+    assert (nouns.rows, nouns.columns) == (3, 3)
+    assert nouns.status_counts(2) == {"NEW": 2, "NORMAL": 1, "NEEDS_REVISION": 0, "DELAYED": 0, "invalid": 0}
+    assert b.sheet("nouns").status_counts(2)["invalid"] == 1
+    # a column without statuses
+    assert nouns.status_counts(0)["invalid"] == 3
+
+
+def test_only_the_modified_workbooks_are_read_again(library, index):
+    index.refresh(library)
+    assert index.refresh(library) == []
+    path = save_workbook(os.path.join(library, "a.xlsx"), ["NEW*1"])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert index.workbook(path) is None
+    assert index.refresh(library) == [path]
+    assert index.workbook(path).sheet("nouns").rows == 1
+
+
+def test_removed_workbooks_are_forgotten(library, index):
+    index.refresh(library)
+    os.remove(os.path.join(library, "verbs", "b.xlsx"))
+    assert index.refresh(library) == []
+    assert [i.name for i in index.workbooks(library)] == ["a.xlsx"]
+
+
+def test_unreadable_workbook_is_read_again(library, index):
+    path = os.path.join(library, "broken.xlsx")
+    with open(path, mode="wb") as file:
+        file.write(b"not a workbook")
+    index.refresh(library)
+    broken = next(i for i in index.workbooks(library) if i.name == "broken.xlsx")
+    assert broken.error and not broken.sheets
+    assert index.refresh(library) == [path]
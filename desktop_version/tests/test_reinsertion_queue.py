@@ -0,0 +1,49 @@
+from random import Random
+
+import pytest
+
+from reinsertion_queue import ReinsertionQueue
+
+
+def pop_all(queue: ReinsertionQueue) -> list:
+    return [queue.pop() for _ in range(len(queue))]
+
+
+def test_items_are_asked_in_order():
+    assert pop_all(ReinsertionQueue("abc", rng=Random(0))) == ["a", "b", "c"]
+
+
+def test_reinserted_item_comes_back_after_the_distance():
+    queue = ReinsertionQueue("abcde", 2, 2, Random(0))
+    item = queue.pop()
+    queue.reinsert(item)
+    assert len(queue) == 5
+    assert pop_all(queue) == ["b", "c", "a", "d", "e"]
+
+
+def test_reinsertion_distance_stays_in_bounds():
+    rng = Random(3)
+    for _ in range(50):
+        queue = ReinsertionQueue(range(100), 3, 7, rng)
+        queue.reinsert(queue.pop())
+        order = pop_all(queue)
+        assert 3 <= order.index(0) <= 7
+
+
+def test_only_reinserted_items_left():
+    queue = ReinsertionQueue("a", 5, 10, Random(0))
+    queue.reinsert(queue.pop())
+    assert queue
+    assert queue.pop() == "a"
+    assert not queue
+
+
+def test_empty_queue():
+    queue = ReinsertionQueue([])
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_invalid_distance():
+    with pytest.raises(ValueError):
+        ReinsertionQueue("abc", 5, 2)
@@ -0,0 +1,91 @@
+from random import Random
+
+import pytest
+
+from core import SheetScheme, WordsGetter, CombinedDictationContent
+from exceptions import NoWordsMatchingSettings
+from sheet_view import SheetView
+
+
+def scheme_of(sheet_name: str) -> SheetScheme:
+    return SheetScheme({"sheet_name": sheet_name, "translation_column_index": 0, "status_column_index": 2,
+                        "narration_language": "de", "to_check": [{"spelling": 1, "info": None}]})
+
+
+SCHEME = scheme_of("nouns")
+
+
+def sheet_of(statuses: list[str]) -> SheetView:
+    return SheetView.from_rows([(f"word {i}", f"Wort {i}", status) for i, status in enumerate(statuses)])
+
+
+def getter(sheet: SheetView, target: str = "all", sample_size=None, seed: int = 0,
+           scheme: SheetScheme = SCHEME) -> WordsGetter:
+    return WordsGetter(sheet, scheme, range(2, sheet.rows + 1), target, rng=Random(seed), sample_size=sample_size)
+
+
+def test_all_the_matching_rows_without_a_sample_size():
+    sheet = sheet_of(["NEW*1", "NORMAL*1", "NEW*1", "DELAYED*1"])
+    assert getter(sheet, "NEW").sample_rows().tolist() == [0, 2]
+    assert getter(sheet, "NEW", sample_size=5).sample_rows().tolist() == [0, 2]
+
+
+def test_sample_of_the_matching_rows():
+    sheet = sheet_of(["NEW*1", "NORMAL*1"] * 50)
+    rows = getter(sheet, "NEW", sample_size=10).sample_rows().tolist()
+    assert len(set(rows)) == 10
+    assert rows == sorted(rows)
+    assert all(i % 2 == 0 for i in rows)
+    # the same random generator takes the same sample
+    assert getter(sheet, "NEW", sample_size=10).sample_rows().tolist() == rows
+
+
+def test_sample_is_taken_in_blocks_of_the_status_column():
+    sheet = sheet_of(["NEW*1", "NORMAL*1", "DELAYED*1"] * 20)
+    sampler = getter(sheet, sample_size=7)
+    sampler.block_rows = 4
+    rows = sampler.sample_rows().tolist()
+    assert len(set(rows)) == 7 and all(0 <= i < 60 for i in rows)
+
+
+def test_sample_prefers_the_words_to_revise():
+    sheet = sheet_of(["NEEDS_REVISION*1", "DELAYED*1"])
+    taken = [getter(sheet, sample_size=1, seed=seed).sample_rows()[0] for seed in range(400)]
+    # weighted 2 against 0.25, the word to revise is taken 8 times out of 9
+    assert taken.count(0) > 300
+
+
+def test_words_of_a_sample():
+    sheet = sheet_of(["NEW*1"] * 30)
+    words = getter(sheet, sample_size=4).get_words()
+    assert len(words.words) == 4
+
+
+def combined(sheets: dict[str, SheetView], target: str = "all", sample_size=None, seed: int = 0):
+    getters = [("book.xlsx", getter(sheet, target, seed=seed + index, scheme=scheme_of(name)))
+               for index, (name, sheet) in enumerate(sheets.items())]
+    return CombinedDictationContent.from_getters(getters, rng=Random(seed), sample_size=sample_size)
+
+
+def test_combined_words_of_all_the_sheets():
+    content = combined({"nouns": sheet_of(["NEW*1"] * 3), "verbs": sheet_of(["NORMAL*1", "NEW*1"])}, "NEW")
+    assert sorted(content.words) == [("book.xlsx", "nouns", 0), ("book.xlsx", "nouns", 1),
+                                     ("book.xlsx", "nouns", 2), ("book.xlsx", "verbs", 1)]
+
+
+def test_sheets_without_matching_words_are_left_out():
+    content = combined({"nouns": sheet_of(["NORMAL*1"]), "verbs": sheet_of(["NEW*1"])}, "NEW")
+    assert content.sheet_names == ["verbs"]
+    with pytest.raises(NoWordsMatchingSettings):
+        combined({"nouns": sheet_of(["NORMAL*1"]), "verbs": sheet_of(["NORMAL*1"])}, "NEW")
+
+
+def test_sample_is_taken_from_all_the_sheets_together():
+    sheets = {"nouns": sheet_of(["NEW*1"] * 90), "verbs": sheet_of(["NEW*1"] * 10)}
+    taken_verbs = 0
+    for seed in range(50):
+        content = combined(sheets, sample_size=20, seed=seed)
+        assert len(content.words) == 20
+        taken_verbs += sum(sheet_name == "verbs" for _, sheet_name, _ in content.words)
+    # each sheet gives words in proportion to its rows: 2 of the 20 on average
+    assert 50 <= taken_verbs <= 150
@@ -0,0 +1,60 @@
+from scheduler import DueIndex, ReviewScheduler
+
+
+def test_most_overdue_first():
+    index = DueIndex([(30.0, 3), (10.0, 1), (20.0, 2), (40.0, 4)])
+    assert index.most_overdue(10, now=35) == [1, 2, 3]
+    assert index.most_overdue(2, now=35) == [1, 2]
+    assert index.most_overdue(10, now=5) == []
+
+
+def test_rescheduled_and_removed_rows():
+    index = DueIndex([(10.0, 1), (20.0, 2), (30.0, 3)])
+    index.update(1, 50.0)
+    index.remove(2)
+    assert len(index) == 2
+    assert index.most_overdue(10, now=100) == [3, 1]
+
+
+def test_heap_is_rebuilt_without_the_old_entries():
+    index = DueIndex([(float(i), i) for i in range(4)])
+    for due in range(10, 20):
+        index.update(0, float(due))
+    assert len(index.heap) <= 2 * len(index.due)
+    assert index.most_overdue(10, now=100) == [1, 2, 3, 0]
+
+
+def test_next_interval():
+    day = ReviewScheduler.day
+    assert ReviewScheduler.next_interval(None, "NEEDS_REVISION", "NEEDS_REVISION*1") == ReviewScheduler.relearn_interval
+    assert ReviewScheduler.next_interval(None, "NEW", "NEW*2") == ReviewScheduler.learning_interval
+    assert ReviewScheduler.next_interval(None, "NORMAL", "NORMAL*1") == ReviewScheduler.first_interval
+    assert ReviewScheduler.next_interval(2 * day, "NORMAL", "NORMAL*1") == 2 * day * ReviewScheduler.growth
+    assert ReviewScheduler.next_interval(300 * day, "NORMAL", "NORMAL*1") == ReviewScheduler.max_interval
+
+
+def test_schedule_and_delay(tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "schedule.db"))
+    scheduler.schedule("book.xlsx", "nouns", [
+        (0, "NEEDS_REVISION", "NEEDS_REVISION*1", "a"),
+        (1, "NEW", "NEW*1", "b"),
+        (2, "NORMAL", "NORMAL*1", "c"),
+    ], now=0)
+    assert scheduler.most_overdue("book.xlsx", "nouns", 10, now=ReviewScheduler.day) == [0, 1, 2]
+    scheduler.schedule("book.xlsx", "nouns", [(1, "NEW", "DELAYED*1", "b")], now=0)
+    # read again from the database
+    reopened = ReviewScheduler(str(tmp_path / "schedule.db"))
+    assert reopened.most_overdue("book.xlsx", "nouns", 10, now=ReviewScheduler.day) == [0, 2]
+    assert reopened.most_overdue("book.xlsx", "verbs", 10, now=ReviewScheduler.day) == []
+
+
+def test_schedule_follows_the_words_when_rows_move(tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "schedule.db"))
+    scheduler.schedule("book.xlsx", "nouns", [(1, "NEW", "NEW*1", "w1"), (3, "NEW", "NEW*1", "w3")], now=0)
+    inserted = ["new", "w0", "w1", "w2", "w3", "w4"]
+    assert scheduler.most_overdue("book.xlsx", "nouns", 10, inserted, now=ReviewScheduler.day) == [2, 4]
+    # the word that is gone is forgotten
+    deleted = ["w0", "w2", "w3", "w4"]
+    assert scheduler.most_overdue("book.xlsx", "nouns", 10, deleted, now=ReviewScheduler.day) == [2]
+    assert ReviewScheduler(str(tmp_path / "schedule.db")).most_overdue(
+        "book.xlsx", "nouns", 10, deleted, now=ReviewScheduler.day) == [2]
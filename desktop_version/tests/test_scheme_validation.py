@@ -0,0 +1,76 @@
+import os
+
+import openpyxl
+import pytest
+
+import scheme_validation
+from bulk_loading import BulkLoader, SheetCache
+from library_index import LibraryIndex
+from scheme_validation import SchemeValidator, SchemeState
+
+
+def scheme(sheet_name: str = "nouns", status: int = 2) -> dict:
+    return {"sheet_name": sheet_name, "translation_column_index": 0, "status_column_index": status,
+            "narration_language": "de", "to_check": [{"spelling": 1, "info": None}]}
+
+
+SCHEMES = {"valid": scheme(), "rows": scheme(status=1), "columns": scheme(status=9), "missing": scheme("verbs")}
+EXPECTED = {"valid": (SchemeState.VALID, 0), "rows": (SchemeState.INVALID_ROWS, 2),
+            "columns": (SchemeState.INVALID_COLUMNS, 0), "missing": (SchemeState.MISSING_SHEET, 0)}
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch) -> str:
+    directory = tmp_path / "library"
+    directory.mkdir()
+    path = str(directory / "vocabulary.xlsx")
+    book = openpyxl.Workbook()
+    nouns = book.active
+    nouns.title = "nouns"
+    for row in (("translation", "word", "status"), ("house", "Haus", "NEW*1"), ("tree", "Baum", "NORMAL*1")):
+        nouns.append(row)
+    book.save(path)
+    # the sheets are read in this process, and the workbook is not in the index of the app
+    monkeypatch.setattr(scheme_validation, "SHEET_CACHE", SheetCache(BulkLoader(max_workers=1)))
+    monkeypatch.setattr(scheme_validation, "LIBRARY_INDEX", LibraryIndex(str(tmp_path / "library.db")))
+    return path
+
+
+def validate(validator: SchemeValidator, path: str) -> dict[str, tuple[str, int]]:
+    validated = {}
+    states = validator.validate(path, SCHEMES, lambda name, state: validated.__setitem__(name, state))
+    # the validation is done by the single thread of the validator
+    validator.executor.submit(lambda: None).result()
+    return {**states, **validated}
+
+
+def test_states_are_checked_and_kept_on_disk(workbook, tmp_path):
+    filename = str(tmp_path / "cache" / "validation.json")
+    validator = SchemeValidator(filename)
+    assert set(validator.cached(workbook, SCHEMES).values()) == {(SchemeState.CHECKING, 0)}
+    assert validate(validator, workbook) == EXPECTED
+    assert os.listdir(os.path.dirname(filename)) == ["validation.json"]
+    # known as soon as the app starts again
+    assert SchemeValidator(filename).cached(workbook, SCHEMES) == EXPECTED
+
+
+def test_states_are_forgotten_once_the_workbook_is_modified(workbook, tmp_path):
+    validator = SchemeValidator(str(tmp_path / "validation.json"))
+    validate(validator, workbook)
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert validator.cached(workbook, SCHEMES)["valid"] == (SchemeState.CHECKING, 0)
+    # a changed scheme is checked again as well
+    assert validator.cached(workbook, {"valid": scheme(status=1)})["valid"] == (SchemeState.CHECKING, 0)
+
+
+def test_indexed_workbook_is_not_read(workbook, tmp_path, monkeypatch):
+    scheme_validation.LIBRARY_INDEX.refresh(os.path.dirname(workbook))
+
+    class NoSheetCache:
+        def load(self, *args, **kwargs):
+            raise AssertionError("the workbook was read")
+
+    monkeypatch.setattr(scheme_validation, "SHEET_CACHE", NoSheetCache())
+    validator = SchemeValidator(str(tmp_path / "validation.json"))
+    assert validator.validate(workbook, SCHEMES, lambda name, state: None) == EXPECTED
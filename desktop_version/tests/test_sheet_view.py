@@ -0,0 +1,40 @@
+import numpy as np
+
+from sheet_view import SheetView, StatusColumn
+
+
+def test_parse_status():
+    assert StatusColumn.parse("NEW*1") == (StatusColumn.code("NEW"), 1)
+    assert StatusColumn.parse("NEEDS_REVISION*3") == (StatusColumn.code("NEEDS_REVISION"), 3)
+    for invalid in ("NEW", "NEW*0", "NEW*51", "OLD*1", "NEW*x", None, 5):
+        assert StatusColumn.parse(invalid) == (StatusColumn.invalid, 0)
+
+
+def test_status_counts_in_a_range():
+    column = StatusColumn(np.array(["NEW*1", "NORMAL*2", "NEW*1", "broken", "DELAYED*1"], dtype=object))
+    assert column.counts(0, 5) == {"NEW": 2, "NORMAL": 1, "NEEDS_REVISION": 0, "DELAYED": 1, "all": 5}
+    assert column.count("NEW", 1, 3) == 1
+    assert column.count("NEW", 3, 1) == 0
+    assert column.invalid_rows.tolist() == [3]
+
+
+def test_from_rows_trims_the_empty_rows_at_the_end():
+    sheet = SheetView.from_rows([("a", 1, None), (), ("b", None, "x", None), (None, None), ()], columns=2)
+    assert sheet.shape == (3, 3)
+    assert sheet.null_mask[1].all()
+    assert sheet.cell(0, 0) == "a"
+    assert sheet.cell(0, 1) == "1"
+    assert sheet.cell(0, 2) == SheetView.empty_cell
+    assert sheet.row(2, [0, 2]) == {0: "b", 2: "x"}
+
+
+def test_sheet_is_read_only():
+    sheet = SheetView.from_rows([("a", "NEW*1")])
+    assert not sheet.cells.flags.writeable
+    assert not sheet.null_mask.flags.writeable
+
+
+def test_status_column_is_parsed_once():
+    sheet = SheetView.from_rows([("a", "NEW*1"), ("b", "NORMAL*1")])
+    assert sheet.status_column(1) is sheet.status_column(1)
+    assert sheet.status_column(1).counts(0, 2)["NORMAL"] == 1
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+
+import pytest
+
+from user_settings import Settings, SettingsStore
+
+
+@pytest.fixture
+def store(tmp_path) -> SettingsStore:
+    store = SettingsStore(str(tmp_path / "settings.db"))
+    # the changes are only written by the explicit flushes of the tests
+    store.flush_delay = 60
+    return store
+
+
+def test_changes_are_written_once_flushed(store):
+    store.put(store.settings_table, "LANGUAGE", "german")
+    store.put(store.settings_table, "LANGUAGE", "russian")
+    store.put(store.schemes_table, "nouns", {"sheet_name": "nouns"})
+    assert store.empty
+    store.flush()
+    assert store.load(store.settings_table) == {"LANGUAGE": "russian"}
+    store.delete(store.schemes_table, "nouns")
+    store.flush()
+    assert store.load(store.schemes_table) == {}
+
+
+def test_changes_that_could_not_be_written_stay_pending(store):
+    store.put("missing", "key", 1)
+    store.put(store.settings_table, "LANGUAGE", "german")
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    # nothing of the failed transaction is written
+    assert store.empty
+    store.put(store.settings_table, "LANGUAGE", "russian")
+    store._connection.execute("CREATE TABLE missing (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    store.flush()
+    assert store.load(store.settings_table) == {"LANGUAGE": "russian"}
+    assert store.load("missing") == {"key": 1}
+
+
+def test_legacy_settings_are_migrated(tmp_path, monkeypatch):
+    languages = os.path.abspath(Settings.path_to_languages)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / Settings.legacy_settings_filename).write_text(
+        str({"PATH_TO_VOCABULARY": "book.xlsx", "schemes": {"nouns": {"sheet_name": "nouns"}}}), encoding="utf-8")
+    monkeypatch.setattr(Settings, "path_to_languages", languages)
+
+    settings = Settings()
+    assert settings.path == "book.xlsx"
+    assert settings.schemes == {"nouns": {"sheet_name": "nouns"}}
+    # the database is used from now on, the old file is not read again
+    settings.change_settings("PATH_TO_VOCABULARY", "other.xlsx")
+    settings.store.flush()
+    (tmp_path / Settings.legacy_settings_filename).write_text("{}", encoding="utf-8")
+    assert Settings().path == "other.xlsx"
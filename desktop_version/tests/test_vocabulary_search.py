@@ -0,0 +1,77 @@
+from sheet_view import SheetView
+from answer_matching import AnswerNormalizer
+from vocabulary_search import SheetSearchIndex, VocabularySearch
+
+NOUNS = SheetView.from_rows([
+    ("house", "Haus", "NEW*1"),
+    ("tree", "Baum|Gehölz", "NORMAL*1"),
+    ("big house", "Gebäude/Bau", "NEEDS_REVISION*2"),
+    ("street", "Straße", "NEW*1"),
+])
+
+
+def scheme(sheet_name: str = "nouns") -> dict:
+    return {"sheet_name": sheet_name, "translation_column_index": 0, "status_column_index": 2,
+            "narration_language": "de", "to_check": [{"spelling": 1, "info": None}]}
+
+
+class FakeCache:
+    """Gives the sheets without reading a workbook, counting how many were asked for."""
+
+    def __init__(self, sheets: dict[str, SheetView]) -> None:
+        self.sheets = sheets
+        self.loaded: list[str] = []
+
+    def load(self, path: str, sheet_names) -> dict:
+        sheet_names = list(sheet_names)
+        self.loaded.extend(sheet_names)
+        return {i: self.sheets[i] for i in sheet_names if i in self.sheets}
+
+
+def search(sheets: dict[str, SheetView], schemes: dict[str, dict]) -> VocabularySearch:
+    vocabulary_search = VocabularySearch(FakeCache(sheets))
+    vocabulary_search.refresh("vocabulary.xlsx", schemes)
+    return vocabulary_search
+
+
+def test_terms_of_a_cell():
+    normalizer = AnswerNormalizer(ignore_case=True)
+    assert SheetSearchIndex.terms_of("Big House|Gebäude / Bau", normalizer) == \
+        {"big house", "big", "house", "gebäude", "bau"}
+    assert SheetSearchIndex.terms_of(SheetView.empty_cell, normalizer) == set()
+
+
+def test_search_by_prefix():
+    vocabulary_search = search({"nouns": NOUNS}, {"nouns": scheme()})
+    assert [i.translation for i in vocabulary_search.search("hou")] == ["house", "big house"]
+    assert [i.translation for i in vocabulary_search.search("GEH")] == ["tree"]
+    assert vocabulary_search.search("zebra") == []
+    assert vocabulary_search.search("   ") == []
+
+
+def test_search_result():
+    result = search({"nouns": NOUNS}, {"nouns": scheme()}).search("baum")[0]
+    assert (result.sheet_name, result.row_index, result.line, result.status) == ("nouns", 1, 3, "NORMAL*1")
+    assert result.spellings == ["Baum|Gehölz"]
+
+
+def test_search_limit_and_rows_of_two_schemes_of_a_sheet():
+    vocabulary_search = search({"nouns": NOUNS}, {"nouns": scheme(), "again": scheme()})
+    assert len(vocabulary_search.search("h")) == 2
+    assert len(vocabulary_search.search("h", limit=1)) == 1
+
+
+def test_index_is_kept_while_the_workbook_and_scheme_stay_the_same():
+    cache = FakeCache({"nouns": NOUNS})
+    vocabulary_search = VocabularySearch(cache)
+    assert vocabulary_search.refresh("vocabulary.xlsx", {"nouns": scheme()}) == ["nouns"]
+    assert vocabulary_search.refresh("vocabulary.xlsx", {"nouns": scheme()}) == []
+    assert cache.loaded == ["nouns"]
+    changed = {**scheme(), "to_check": []}
+    assert vocabulary_search.refresh("vocabulary.xlsx", {"nouns": changed}) == ["nouns"]
+
+
+def test_schemes_that_do_not_fit_are_left_out():
+    vocabulary_search = search({"nouns": NOUNS}, {"missing": scheme("verbs"),
+                                                  "columns": {**scheme(), "status_column_index": 9}})
+    assert vocabulary_search.terms == 0
@@ -0,0 +1,132 @@
+"""Opt-in timing of the main steps of the app.
+
+Tracing is turned on with the `DICTATION_TRACE` environment variable (`1`, or the directory to save the
+traces to) or the `TRACING` setting. When it is on, the spans are saved at exit as a Chrome trace-event
+file (open it in chrome://tracing or https://ui.perfetto.dev) and as a summary table.
+
+When tracing is off, `traced` returns the decorated function itself, so it costs nothing.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Union
+
+from user_settings import SETTINGS
+
+
+class Tracer:
+    environment_variable = "DICTATION_TRACE"
+    settings_key = "TRACING"
+    default_directory = "cache/traces/"
+
+    def __init__(self) -> None:
+        value = os.environ.get(self.environment_variable, "")
+        self.enabled = bool(value and value != "0") or bool(SETTINGS.get(self.settings_key, False))
+        self.directory = value if value and value not in ("0", "1") else self.default_directory
+
+        self.events: list[dict] = []
+        # more tables of the summary, made by the parts of the app that keep statistics of their own
+        self.summaries: list[Callable[[], str]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        if self.enabled:
+            atexit.register(self.save)
+
+    def traced(self, function: Callable) -> Callable:
+        """Wraps every call of the function in a span named after it."""
+        if not self.enabled:
+            return function
+
+        name = function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def span(self, name: str, **arguments):
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, arguments)
+
+    @contextmanager
+    def _span(self, name: str, arguments: dict):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (started - self._started) * 1_000_000,
+                "dur": (finished - started) * 1_000_000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+            if arguments:
+                event["args"] = arguments
+            with self._lock:
+                self.events.append(event)
+
+    def counter(self, name: str, **values: float) -> None:
+        """Records the values at this moment, they are shown as a graph in the trace viewer."""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "ph": "C",
+            "ts": (time.perf_counter() - self._started) * 1_000_000,
+            "pid": os.getpid(),
+            "args": values,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def add_summary(self, summary_table: Callable[[], str]) -> None:
+        if self.enabled:
+            self.summaries.append(summary_table)
+
+    def summary(self) -> list[tuple[str, int, float, float, float]]:
+        """Returns (name, calls, total ms, mean ms, max ms) per span name, slowest in total first."""
+        durations: dict[str, list[float]] = {}
+        with self._lock:
+            for i in self.events:
+                if i["ph"] != "X":
+                    continue
+                durations.setdefault(i["name"], []).append(i["dur"] / 1000)
+        rows = [(name, len(i), sum(i), sum(i) / len(i), max(i)) for name, i in durations.items()]
+        return sorted(rows, key=lambda x: x[2], reverse=True)
+
+    def summary_table(self) -> str:
+        lines = [f"{'span':<56} {'calls':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10}"]
+        for name, calls, total, mean, maximum in self.summary():
+            lines.append(f"{name:<56} {calls:>8} {total:>12.2f} {mean:>10.3f} {maximum:>10.3f}")
+        return "\n".join(lines)
+
+    def save(self) -> Union[str, None]:
+        """Saves the trace and the summary, returns the path to the trace."""
+        if not self.events:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        filename = os.path.join(self.directory, datetime.now().strftime("trace-%Y%m%d-%H%M%S"))
+        with self._lock:
+            events = list(self.events)
+        with open(filename + ".json", mode="w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        with open(filename + ".txt", mode="w", encoding="utf-8") as file:
+            file.write(self.summary_table() + "\n")
+            for summary_table in self.summaries:
+                file.write("\n" + summary_table() + "\n")
+        return filename + ".json"
+
+
+TRACER = Tracer()
@@ -0,0 +1,135 @@
+import os
+import struct
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+
+class TutorialImage:
+    png_signature = b"\x89PNG\r\n\x1a\n"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.width, self.height = self.read_size(path)
+
+    @classmethod
+    def read_size(cls, path: str) -> tuple[int, int]:
+        """Reads the size from the IHDR chunk, so the image itself is not decoded."""
+        with open(path, mode="rb") as file:
+            header = file.read(24)
+        if header[:8] != cls.png_signature:
+            raise ValueError(f"`{path}` is not a png image.")
+        return struct.unpack(">II", header[16:24])
+
+    def scaled_size(self, width: int) -> tuple[int, int]:
+        """Images are scaled down to the given width, but never scaled up."""
+        width = int(width)
+        if self.width <= width:
+            return self.width, self.height
+        return width, max(1, round(self.height * width / self.width))
+
+
+class TutorialAssets:
+    def __init__(self, text_blocks: list[str], images: list[TutorialImage]) -> None:
+        self.text_blocks = text_blocks
+        self.images = images
+
+
+class TutorialAssetIndex:
+    """Keeps the text blocks, the order and the sizes of the images of every tutorial,
+    so each tutorial directory is only read once."""
+
+    path_to_tutorials = {
+        "quick_start": "tutorials/quick_start/",
+        "statuses": "tutorials/statuses/",
+        "synonyms_and_variations": "tutorials/synonyms_and_variations/"
+    }
+    text_file_names = {
+        "quick_start": "text.txt",
+        "statuses": "text.txt",
+        "synonyms_and_variations": "text.txt"
+    }
+    blocks_separator = "AAA"
+    image_extension = "png"
+
+    _assets: dict[tuple[str, str], TutorialAssets] = {}
+
+    @classmethod
+    def get(cls, tutorial_name: str, language: str) -> TutorialAssets:
+        key = (tutorial_name, language)
+        if key not in cls._assets:
+            cls._assets[key] = cls._build(tutorial_name, language)
+        return cls._assets[key]
+
+    @classmethod
+    def _build(cls, tutorial_name: str, language: str) -> TutorialAssets:
+        path_to_tutorial = cls.path_to_tutorials.get(tutorial_name) + language + "/"
+        with open(path_to_tutorial + cls.text_file_names.get(tutorial_name), mode="r", encoding="utf-8") as file:
+            text_blocks = file.read().split(cls.blocks_separator)
+
+        # file names are numbered, the order of os.listdir is not guaranteed
+        images = [TutorialImage(path_to_tutorial + i) for i in sorted(os.listdir(path_to_tutorial))
+                  if i.rsplit(".")[-1] == cls.image_extension]
+        return TutorialAssets(text_blocks, images)
+
+
+class ScaledImageCache:
+    """Stores copies of the tutorial images scaled down to the width they are displayed with."""
+
+    path_to_cache = "cache/scaled/"
+
+    _executor: Union[ThreadPoolExecutor, None] = None
+
+    @classmethod
+    def get(cls, image: TutorialImage, width: int) -> str:
+        """Returns the path to the image scaled to the given width, creating it if needed.
+        The original image is returned when it is not wider than `width` or can not be scaled."""
+        return cls.ready(image, width) or cls._scale_to(image, width)
+
+    @classmethod
+    def ready(cls, image: TutorialImage, width: int) -> Union[str, None]:
+        """Returns the path to the image to display with the given width if it needs no scaling, None otherwise."""
+        scaled_width, _ = image.scaled_size(width)
+        if scaled_width == image.width:
+            return image.path
+
+        scaled_path = cls._scaled_path(image, scaled_width)
+        if os.path.exists(scaled_path) and os.path.getmtime(scaled_path) >= os.path.getmtime(image.path):
+            return scaled_path
+        return None
+
+    @classmethod
+    def get_in_background(cls, image: TutorialImage, width: int, on_scaled: Callable[[str], None]) -> None:
+        """Scales the image on a background thread and passes the path to the image to display to `on_scaled`."""
+        # a single thread, the images are scaled one after the other in the order they were asked for
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-scaler")
+        cls._executor.submit(lambda: on_scaled(cls.get(image, width)))
+
+    @classmethod
+    def _scaled_path(cls, image: TutorialImage, scaled_width: int) -> str:
+        return os.path.join(cls.path_to_cache, str(scaled_width), image.path)
+
+    @classmethod
+    def _scale_to(cls, image: TutorialImage, width: int) -> str:
+        scaled_width, scaled_height = image.scaled_size(width)
+        scaled_path = cls._scaled_path(image, scaled_width)
+        return cls._scale(image.path, scaled_path, (scaled_width, scaled_height)) or image.path
+
+    @staticmethod
+    def _scale(source_path: str, scaled_path: str, size: tuple[int, int]) -> Union[str, None]:
+        try:
+            import pygame
+        except ImportError:
+            return None
+
+        try:
+            surface = pygame.transform.smoothscale(pygame.image.load(source_path), size)
+            os.makedirs(os.path.dirname(scaled_path), exist_ok=True)
+            # saved under a temporary name first, so an interrupted save never leaves a broken image
+            temporary_path = scaled_path + ".tmp.png"
+            pygame.image.save(surface, temporary_path)
+            os.replace(temporary_path, scaled_path)
+        except (pygame.error, OSError):
+            return None
+        return scaled_path
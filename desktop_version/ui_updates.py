@@ -0,0 +1,159 @@
+"""Batching of the updates sent to the Flet client.
+
+Every `page.update` is a diff of the given controls (and of everything under them) serialized to
+the client, so an event handler that updates several times, or updates a whole page to change a
+few labels, costs several round trips and large diffs. Inside `UpdateCoalescer.event` the updates
+are only collected; when the event ends, the collected controls are sent in a single update, leaving
+out the controls that are inside another collected control.
+
+Only the public API of Flet is used: the controls inside another one are found through the `controls`
+and `content` of the layout controls, which is how the controls of this app are nested. A control nested
+in some other way is just sent again, Flet then finds nothing left to change in it.
+"""
+import threading
+
+from contextlib import contextmanager
+from typing import Union, TYPE_CHECKING
+
+from tracing import TRACER
+
+if TYPE_CHECKING:
+    import flet as ft
+
+
+class UpdateStatistics:
+    """What the updates made during the events cost, per event name: the calls of `page.update`
+    and the controls in the updated subtrees, each of which Flet compares with its previous state.
+    The compared controls stand for the size of the diff sent to the client, they are not its size in bytes."""
+
+    fields = ("events", "updates", "compared")
+
+    def __init__(self) -> None:
+        self.totals: dict[str, list[int]] = {}
+
+    def record(self, event: str, updates: int, compared: int) -> None:
+        totals = self.totals.setdefault(event, [0] * len(self.fields))
+        for index, value in enumerate((1, updates, compared)):
+            totals[index] += value
+
+    def averages(self, event: str) -> dict[str, float]:
+        """The cost of one event on average."""
+        events, *totals = self.totals.get(event, [0] * len(self.fields))
+        return {name: value / events if events else 0.0 for name, value in zip(self.fields[1:], totals)}
+
+    def summary_table(self) -> str:
+        lines = [f"{'event':<24} {'events':>8} {'updates':>9} {'compared controls':>18}   (per event)"]
+        for event, (events, *_) in sorted(self.totals.items()):
+            averages = self.averages(event)
+            lines.append(f"{event:<24} {events:>8} {averages['updates']:>9.2f} {averages['compared']:>18.1f}")
+        return "\n".join(lines)
+
+
+class UpdateCoalescer:
+    """Sends the updates of the controls, at most one per event.
+
+    When statistics are given (or tracing is on), the cost of the updates of every event is recorded.
+    The events of every thread (the background loading, for example) are collected separately, only
+    sending their updates is done by one thread at a time."""
+
+    outside_events = "update"
+
+    def __init__(self, page: "ft.Page", statistics: Union[UpdateStatistics, None] = None) -> None:
+        self.page = page
+        self.statistics = statistics
+        if statistics is None and TRACER.enabled:
+            self.statistics = UpdateStatistics()
+            TRACER.add_summary(self.statistics.summary_table)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _state(self) -> threading.local:
+        """The events of the current thread and the updates collected in them."""
+        state = self._local
+        if not hasattr(state, "events"):
+            state.events = []
+            state.pending = {}
+            state.page_pending = False
+            state.focused = None
+        return state
+
+    @contextmanager
+    def event(self, name: str):
+        """Collects the updates made inside, and sends them once the outermost event ends."""
+        state = self._state
+        state.events.append(name)
+        try:
+            yield self
+        finally:
+            state.events.pop()
+            if not state.events:
+                self.flush(name)
+
+    def update(self, *controls: "ft.Control") -> None:
+        """Updates the controls (the whole page when none are given), at the end of the event if there is one."""
+        state = self._state
+        if not controls:
+            state.page_pending = True
+        for i in controls:
+            state.pending[id(i)] = i
+        if not state.events:
+            self.flush(self.outside_events)
+
+    def focus(self, control: "ft.TextField") -> None:
+        """Focuses the control once the updates of the event are sent, so it is focused as it is shown."""
+        state = self._state
+        state.focused = control
+        if not state.events:
+            self.flush(self.outside_events)
+
+    def flush(self, event: str = outside_events) -> None:
+        state = self._state
+        pending, state.pending = state.pending, {}
+        page_pending, state.page_pending = state.page_pending, False
+        focused, state.focused = state.focused, None
+        with self._lock:
+            # the controls that are not on the page yet are sent with the control they are added to
+            controls = [] if page_pending else self.outermost([i for i in pending.values() if i.page is not None])
+            updates = controls_compared = 0
+            if page_pending or controls:
+                updates = 1
+                if self.statistics is not None:
+                    controls_compared = sum(self.subtree_size(i) for i in (controls or [self.page]))
+                self.page.update(*controls)
+            if focused is not None and focused.page is not None:
+                updates += 1
+                focused.focus()
+            if self.statistics is not None:
+                self.statistics.record(event, updates, controls_compared)
+                TRACER.counter(f"ui {event}", updates=updates, compared=controls_compared)
+
+    @classmethod
+    def outermost(cls, controls: list["ft.Control"]) -> list["ft.Control"]:
+        """Leaves out the controls that are inside another one of them, they are updated with it."""
+        if len(controls) < 2:
+            return controls
+        inner = set()
+        for i in controls:
+            inner.update(id(j) for j in cls.descendants(i))
+        return [i for i in controls if id(i) not in inner]
+
+    @classmethod
+    def children(cls, control: "ft.Control") -> list["ft.Control"]:
+        """The controls of a layout control (a row, a column, a container and the like)."""
+        children = list(getattr(control, "controls", None) or [])
+        content = getattr(control, "content", None)
+        if content is not None and not isinstance(content, str):
+            children.append(content)
+        return children
+
+    @classmethod
+    def descendants(cls, control: "ft.Control"):
+        for i in cls.children(control):
+            yield i
+            yield from cls.descendants(i)
+
+    @classmethod
+    def subtree_size(cls, control) -> int:
+        return 1 + sum(1 for _ in cls.descendants(control))
@@ -1,39 +1,224 @@
 import os
+import atexit
+import sqlite3
+import threading
 
 from ast import literal_eval
-from json import loads
+from json import loads, dumps
+from typing import Any, Union
+
+
+class SettingsStore:
+    """Keeps the settings in an SQLite database, one row per key and one row per scheme,
+    so a change only rewrites the row it concerns.
+
+    Writes are not made immediately: they are collected and written together in a single
+    transaction once no other change has been made for `flush_delay` seconds. Several changes
+    of the same key are written once, with the last value."""
+
+    flush_delay = 0.5
+
+    settings_table = "settings"
+    schemes_table = "schemes"
+
+    _deleted = object()
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self._pending: dict[tuple[str, str], Any] = {}
+        self._timer: Union[threading.Timer, None] = None
+
+        with self._lock:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {self.settings_table} "
+                                     f"(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {self.schemes_table} "
+                                     f"(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        atexit.register(self.flush)
+
+    @property
+    def empty(self) -> bool:
+        with self._lock:
+            return not any(self._connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                           for table in (self.settings_table, self.schemes_table))
+
+    def load(self, table: str) -> dict[str, Any]:
+        with self._lock:
+            rows = self._connection.execute(f"SELECT key, value FROM {table}").fetchall()
+        return {key: loads(value) for key, value in rows}
+
+    def put(self, table: str, key: str, value: Any) -> None:
+        self._add_pending(table, key, value)
+
+    def delete(self, table: str, key: str) -> None:
+        self._add_pending(table, key, self._deleted)
+
+    def _add_pending(self, table: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._pending[(table, key)] = value
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Writes all pending changes in one transaction, so either all of them are saved or none.
+        When they cannot be written, they stay pending and are written by the next flush."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            try:
+                self._connection.execute("BEGIN")
+                for (table, key), value in pending.items():
+                    if value is self._deleted:
+                        self._connection.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                    else:
+                        self._connection.execute(f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)",
+                                                 (key, dumps(value, ensure_ascii=False)))
+                self._connection.execute("COMMIT")
+            except sqlite3.Error:
+                if self._connection.in_transaction:
+                    self._connection.execute("ROLLBACK")
+                # the changes made since are newer than the ones that were not written
+                self._pending = {**pending, **self._pending}
+                raise
+
+
+class TranslationTables:
+    """Translates the text attributes of the widget classes.
+
+    The first time a class is translated, its attributes holding translation keys are recorded,
+    so the class can be translated again into another language after its attributes were replaced.
+    A table of `attribute -> text` is compiled once per class and language, applying it only
+    sets the attributes it contains."""
+
+    default_language = "english"
+
+    def __init__(self, path_to_languages: str) -> None:
+        self.path_to_languages = path_to_languages
+        self._texts: dict[str, dict] = {}
+        self._keys: dict[type, dict[str, str]] = {}
+        self._tables: dict[tuple[type, str], dict[str, Any]] = {}
+        self._applied: dict[type, str] = {}
+
+    def get_texts(self, language: str) -> dict:
+        if language not in self._texts:
+            filename = os.path.join(self.path_to_languages, language + ".json")
+            if not os.path.exists(filename):
+                raise FileNotFoundError(filename)
+            with open(filename, mode="r", encoding="utf-8") as file:
+                self._texts[language] = loads(file.read())
+        return self._texts[language]
+
+    def get_text(self, language: str, class_key: str, message_key: str) -> Any:
+        for i in (language, self.default_language):
+            section = self.get_texts(i).get(class_key, {})
+            if message_key in section:
+                return section[message_key]
+        return message_key
+
+    def get_keys(self, widget: type) -> dict[str, str]:
+        if widget not in self._keys:
+            known_keys = self.get_texts(self.default_language).get(widget.__name__, {}).keys()
+            keys = {}
+            for i in dir(widget):
+                t = getattr(widget, i)
+                if isinstance(t, str) and not i.startswith("__") and t in known_keys:
+                    keys[i] = t
+            self._keys[widget] = keys
+        return self._keys[widget]
+
+    def get_table(self, widget: type, language: str) -> dict[str, Any]:
+        table = self._tables.get((widget, language))
+        if table is None:
+            table = {attribute: self.get_text(language, widget.__name__, key)
+                     for attribute, key in self.get_keys(widget).items()}
+            self._tables[(widget, language)] = table
+        return table
+
+    def apply(self, widget: type, language: str) -> None:
+        if self._applied.get(widget) == language:
+            return
+        for attribute, text in self.get_table(widget, language).items():
+            setattr(widget, attribute, text)
+        self._applied[widget] = language
+
+    def reapply(self, language: str) -> None:
+        """Translates every class translated so far into the given language."""
+        for widget in list(self._applied):
+            self.apply(widget, language)
 
 
 class Settings(dict):
-    settings_filename = "settings.txt"
+    settings_filename = "settings.db"
+    legacy_settings_filename = "settings.txt"
     vocabulary_key = "PATH_TO_VOCABULARY"
     schemes_key = "schemes"
     app_language_key = "APP_LANGUAGE"
     path_to_languages = "languages/"
 
     def __init__(self):
-        with open(self.settings_filename, mode="r", encoding="utf-8") as file:
-            settings_dict = literal_eval(file.read())
+        self.store = SettingsStore(self.settings_filename)
+        if self.store.empty and os.path.exists(self.legacy_settings_filename):
+            self.migrate_legacy_settings()
+
+        settings_dict = self.store.load(self.store.settings_table)
+        settings_dict[self.schemes_key] = self.store.load(self.store.schemes_table)
         super().__init__(settings_dict)
+        self.translation_tables = TranslationTables(self.path_to_languages)
         self.app_language = self.get(self.app_language_key, "english")
         self.app_text = self.get_app_text(self.app_language)
 
+    def migrate_legacy_settings(self) -> None:
+        """Moves the settings from `settings.txt`, used by the previous versions, to the database.
+        Done as long as the database holds nothing, the old file is left as it is. All the settings
+        are written in one transaction, so a migration that failed is made again on the next start."""
+        try:
+            with open(self.legacy_settings_filename, mode="r", encoding="utf-8") as file:
+                settings_dict = literal_eval(file.read())
+        except (OSError, ValueError, SyntaxError):
+            return
+        if not isinstance(settings_dict, dict):
+            return
+        for name, scheme in settings_dict.pop(self.schemes_key, {}).items():
+            self.store.put(self.store.schemes_table, name, scheme)
+        for key, value in settings_dict.items():
+            self.store.put(self.store.settings_table, key, value)
+        self.store.flush()
+
     def get_app_text(self, app_language: str) -> dict:
-        filename = os.path.join(self.path_to_languages, app_language+".json")
-        if not os.path.exists(filename):
-            raise
+        return self.translation_tables.get_texts(app_language)
 
-        with open(filename, mode="r", encoding="utf-8") as file:
-            return loads(file.read())
+    def change_language(self, app_language: str) -> None:
+        """Switches the language of the app. The widget classes are translated again right away,
+        the widgets that are already built keep their text until they are built again."""
+        self.app_text = self.get_app_text(app_language)
+        self.app_language = app_language
+        self.change_settings(self.app_language_key, app_language)
+        self.translation_tables.reapply(app_language)
 
     def change_settings(self, key, value) -> None:
         self[key] = value
-        with open(self.settings_filename, mode="w", encoding="utf-8") as file:
-            file.write(str(self))
+        self.store.put(self.store.settings_table, key, value)
+
+    def add_scheme(self, name: str, scheme: dict) -> None:
+        self.schemes[name] = scheme
+        self.store.put(self.store.schemes_table, name, scheme)
+
+    def delete_scheme(self, name: str) -> None:
+        self.schemes.pop(name, None)
+        self.store.delete(self.store.schemes_table, name)
 
     @property
     def schemes(self) -> dict:
-        return self.get(self.schemes_key, {})
+        return self.setdefault(self.schemes_key, {})
 
     @property
     def path(self) -> str:
@@ -47,13 +232,10 @@ class Settings(dict):
         return False
 
     def get_text(self, class_key: str, message_key: str) -> str:
-        return self.app_text.get(class_key, {message_key: message_key}).get(message_key, message_key)
+        return self.translation_tables.get_text(self.app_language, class_key, message_key)
 
     def translate_widget(self, widget) -> None:
-        for i in dir(widget):
-            t = getattr(widget, i)
-            if isinstance(t, str) and i != "__module__":
-                setattr(widget, i, self.get_text(widget.__name__, t))
+        self.translation_tables.apply(widget, self.app_language)
 
 
 SETTINGS = Settings()
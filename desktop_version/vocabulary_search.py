@@ -0,0 +1,201 @@
+"""Search of the words of the vocabulary.
+
+The sheet of every saved scheme is indexed: the translation of every row and every synonym (`|`) and
+variation (`/`) of its spellings, split the way the dictation splits them. The terms (each translation
+or variation as a whole, and each of its words) are normalized, with the case folded, and kept sorted
+in one list; the rows of every term are kept one after the other in a single array, in the order of
+the terms. All the terms starting with what was typed are then found with two binary searches, and
+their rows lie next to each other, so a search does not depend on the size of the vocabulary.
+
+The index of a sheet is kept for as long as the workbook is not modified and its scheme stays the same,
+without reading the sheet again; the sheets that have to be indexed again are taken from the sheet cache.
+"""
+import threading
+
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+from core import SheetScheme, CellFillers, SheetToSchemeCompatibilityChecker
+from exceptions import InvalidSchemeError
+from answer_matching import AnswerNormalizer
+from sheet_view import SheetView
+from bulk_loading import SHEET_CACHE, SheetCache
+
+
+class SearchResult:
+    def __init__(self, path: str, sheet_name: str, row_index: int, status: str, translation: str,
+                 spellings: list[str]) -> None:
+        self.path = path
+        self.sheet_name = sheet_name
+        self.row_index = row_index
+        self.status = status
+        self.translation = translation
+        self.spellings = spellings
+
+    @property
+    def line(self) -> int:
+        """The number of the row in Excel."""
+        return self.row_index + 2
+
+
+class SheetSearchIndex:
+    # sorts after every character, so `prefix + last` is past all the terms starting with the prefix
+    last = chr(0x10FFFF)
+
+    def __init__(self, sheet: SheetView, scheme: SheetScheme, parameters: dict,
+                 normalizer: AnswerNormalizer, mtime: int = 0) -> None:
+        self.sheet = sheet
+        self.scheme = scheme
+        self.parameters = parameters
+        # the modification time of the workbook the sheet was read from
+        self.mtime = mtime
+        self.spelling_columns = [i.get("spelling", 0) for i in scheme.to_check]
+
+        postings: dict[str, list[int]] = {}
+        for column in [scheme.translation, *self.spelling_columns]:
+            cells = sheet.cells[:, column].tolist()
+            empty = sheet.null_mask[:, column].tolist()
+            for row, (value, is_empty) in enumerate(zip(cells, empty)):
+                if is_empty:
+                    continue
+                for term in self.terms_of(value if isinstance(value, str) else str(value), normalizer):
+                    rows = postings.setdefault(term, [])
+                    # a term found twice in a row is kept once
+                    if not rows or rows[-1] != row:
+                        rows.append(row)
+
+        self.terms = sorted(postings)
+        # the rows of self.terms[i] are self.rows[self.starts[i]:self.starts[i + 1]]
+        self.rows = array("i")
+        self.starts = array("q", [0])
+        for term in self.terms:
+            self.rows.extend(postings[term])
+            self.starts.append(len(self.rows))
+
+    @staticmethod
+    def terms_of(cell: str, normalizer: AnswerNormalizer) -> set[str]:
+        if cell in CellFillers():
+            return set()
+        terms = set()
+        # the separators are left as they are by the normalization, so the cell is normalized at once
+        for synonym in normalizer.normalize(cell).split("|"):
+            for variation in synonym.split("/"):
+                variation = variation.strip()
+                if variation:
+                    terms.add(variation)
+                    terms.update(variation.split(" "))
+        return terms
+
+    def matching_rows(self, prefix: str) -> memoryview:
+        """The rows of all the terms starting with the prefix (those of the prefix itself first),
+        without copying them."""
+        start = bisect_left(self.terms, prefix)
+        stop = bisect_left(self.terms, prefix + self.last, start)
+        return memoryview(self.rows)[self.starts[start]:self.starts[stop]]
+
+    def result(self, path: str, row: int) -> SearchResult:
+        return SearchResult(
+            path,
+            self.scheme.sheet_name,
+            row,
+            self.sheet.cell(row, self.scheme.status),
+            self.sheet.cell(row, self.scheme.translation),
+            [i for i in (self.sheet.cell(row, column) for column in self.spelling_columns) if i not in CellFillers()],
+        )
+
+
+class VocabularySearch:
+    default_limit = 50
+
+    def __init__(self, cache: SheetCache = SHEET_CACHE) -> None:
+        self.cache = cache
+        self.normalizer = AnswerNormalizer.get(ignore_case=True)
+        self.path = ""
+        self._indexes: dict[str, SheetSearchIndex] = {}
+        self._lock = threading.Lock()
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._request = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vocabulary-search")
+        return self._executor
+
+    def refresh(self, path: str, schemes: dict[str, dict]) -> list[str]:
+        """Indexes the sheets of the schemes in the workbook, returns the names of the schemes whose
+        sheets were indexed again. The schemes whose sheet could not be read are left out."""
+        schemes = {name: (SheetScheme(parameters), parameters) for name, parameters in schemes.items()}
+        same_workbook = SheetCache.key(path, "") == SheetCache.key(self.path, "")
+        indexes = dict(self._indexes) if same_workbook else {}
+        # taken before reading, so a modification made in the meantime is indexed next time
+        mtime = SheetCache.modification_time(path)
+        # the indexes of the workbook as it is now are kept without even looking at their sheets
+        outdated = {name: (scheme, parameters) for name, (scheme, parameters) in schemes.items()
+                    if name not in indexes or indexes[name].mtime != mtime or indexes[name].parameters != parameters}
+        sheets = self.cache.load(path, [scheme.sheet_name for scheme, _ in outdated.values()]) if outdated else {}
+        rebuilt = []
+        for name, (scheme, parameters) in outdated.items():
+            indexes.pop(name, None)
+            sheet = sheets.get(scheme.sheet_name)
+            if not isinstance(sheet, SheetView):
+                continue
+            try:
+                SheetToSchemeCompatibilityChecker(sheet, scheme).check_indexes()
+            except InvalidSchemeError:
+                continue
+            indexes[name] = SheetSearchIndex(sheet, scheme, parameters, self.normalizer, mtime)
+            rebuilt.append(name)
+        with self._lock:
+            self.path = path
+            self._indexes = {name: indexes[name] for name in schemes if name in indexes}
+        return rebuilt
+
+    def refresh_in_background(self, path: str, schemes: dict[str, dict],
+                              on_refreshed: Callable[[list[str]], None]) -> None:
+        """`on_refreshed` is only called as long as no newer refresh was started."""
+        with self._lock:
+            self._request += 1
+            request = self._request
+
+        def refresh() -> None:
+            rebuilt = self.refresh(path, schemes)
+            if request == self._request:
+                on_refreshed(rebuilt)
+
+        self.executor.submit(refresh)
+
+    def search(self, query: str, limit: int = default_limit) -> list[SearchResult]:
+        """The rows with a translation or a spelling (or one of their words) starting with the query,
+        every row once, the rows of the schemes in their order."""
+        prefix = self.normalizer.normalize(query)
+        if not prefix:
+            return []
+        with self._lock:
+            path, indexes = self.path, list(self._indexes.values())
+        results = []
+        seen = set()
+        for index in indexes:
+            for row in index.matching_rows(prefix):
+                # two schemes of one sheet give the same rows
+                key = (index.scheme.sheet_name, row)
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(index.result(path, row))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    @property
+    def terms(self) -> int:
+        return sum(len(i.terms) for i in self._indexes.values())
+
+    @property
+    def entries(self) -> int:
+        return sum(len(i.rows) for i in self._indexes.values())
+
+
+VOCABULARY_SEARCH = VocabularySearch()